@@ -1,6 +1,11 @@
-from .routes import app
+# gunicorn app:app and gunicorn 'app:create_app()' both work. Nothing is
+# imported until one of them is used, so importing app.encryption and
+# friends never needs the web stack or the Airtable environment.
+__all__ = ['app', 'create_app']
 
-# to use gunicorn app:app, create app/__init__.py 
-# Make the app available when importing the app package
-__all__ = ['app']
 
+def __getattr__(name):
+    if name in __all__:
+        from . import routes
+        return getattr(routes, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,72 @@
 import os
+import copy
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
 from pyairtable import Api  
-from .encryption import DataEncryptor
+from pyairtable.formulas import match, OR
+from pyairtable.api.retrying import Retry, DEFAULT_BACKOFF_FACTOR, DEFAULT_MAX_RETRIES
+from requests.exceptions import HTTPError
+from .encryption import DataEncryptor, envelope_etag
+from .batch import BatchProcessor
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .write_behind import WriteBehindQueue
+from .blind_index import BlindIndexer, AIRTABLE_FIELD_PREFIX
+from .metrics import AIRTABLE_REQUEST_SECONDS, AIRTABLE_ERRORS, AIRTABLE_RATE_LIMITED, AIRTABLE_RETRIES
+
+# Airtable accepts at most 10 records per batch write
+AIRTABLE_BATCH_SIZE = 10
+# Keys per OR(...) lookup formula, to keep query URLs short
+LOOKUP_CHUNK_SIZE = 50
+# Airtable returns at most 100 records per page
+MAX_PAGE_SIZE = 100
+
+def _is_not_found(error):
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code == 404
+
+
+@contextmanager
+def _airtable_call(operation):
+    """Time one Airtable operation and count it if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        AIRTABLE_ERRORS.labels(operation).inc()
+        raise
+    finally:
+        AIRTABLE_REQUEST_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+
+def _timed_pages(operation, pages):
+    """Yield from a paginated iterator, timing each page fetch"""
+    pages = iter(pages)
+    while True:
+        with _airtable_call(operation):
+            page = next(pages, None)
+        if page is None:
+            return
+        yield page
+
+
+class _CountingRetry(Retry):
+    """pyairtable's default 429 retry policy, counting 429s and retries"""
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and response.status == 429:
+            AIRTABLE_RATE_LIMITED.inc()
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        AIRTABLE_RETRIES.inc()
+        return retry
+
 
 class AirtableManager:
-    def __init__(self):
+    def __init__(self, cache_size=None, cache_ttl=None, cache_ciphertext_only=None,
+                 write_behind=None, journal_path=None, write_rate=None, crypto=None,
+                 blind_index_fields=None):
         self.api_key = os.environ.get('AIRTABLE_KEY')
         self.base_id = os.environ.get('AIRTABLE_BASE_ID')
         #https://airtable.com/appML0B7u16CqUuk1/pagHObhsuSP8nLfRx/preview?app_preview=true
@@ -27,7 +90,16 @@ class AirtableManager:
             return
         
         try:
-            self.api = Api(self.api_key)
+            self.api = Api(
+                self.api_key,
+                endpoint_url=os.environ.get('AIRTABLE_ENDPOINT_URL', 'https://api.airtable.com'),
+                retry_strategy=_CountingRetry(
+                    total=DEFAULT_MAX_RETRIES,
+                    backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                    status_forcelist=(429,),
+                    allowed_methods=None
+                )
+            )
             self.table = self.api.table(self.base_id, 'site_data')
             self.demo_mode = False
             print("✅ Airtable connected successfully")
@@ -37,69 +109,552 @@ class AirtableManager:
             self.demo_data = {}
         
         self.encryptor = DataEncryptor()
+        self.batch_processor = BatchProcessor(self.encryptor)
+        # Single-record encrypt/decrypt; the routes pass a bounded CryptoPool
+        self.crypto = crypto or self.encryptor
+        # Keyed equality tokens for BLIND_INDEX_FIELDS, one bidx_<path> column each
+        self.blind_index = BlindIndexer(self.encryptor, blind_index_fields)
+
+        # key -> Airtable record id, filled by one paginated scan on first use
+        self._index = None
+        self._index_lock = threading.Lock()
+
+        # Read-through cache of get_data results; ciphertext-only mode keeps
+        # plaintext out of memory at the cost of a decrypt per hit
+        if cache_size is None:
+            cache_size = int(os.environ.get('AIRTABLE_CACHE_SIZE', 256))
+        if cache_ttl is None:
+            cache_ttl = float(os.environ.get('AIRTABLE_CACHE_TTL', 60))
+        if cache_ciphertext_only is None:
+            cache_ciphertext_only = os.environ.get('AIRTABLE_CACHE_CIPHERTEXT_ONLY', '').lower() in ('1', 'true', 'yes')
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.cache_ciphertext_only = cache_ciphertext_only
+        # ETag per key, kept longer than cached values so conditional GETs
+        # can answer 304 without a fetch or decrypt; writes by other
+        # processes are seen once an entry expires
+        self.validators = TTLCache(
+            max_size=int(os.environ.get('AIRTABLE_ETAG_CACHE_SIZE', 4096)),
+            ttl=float(os.environ.get('AIRTABLE_ETAG_CACHE_TTL', 300))
+        )
+        # Per-key write counter: a read only fills the cache and validator
+        # if no write or delete of its key happened while it was fetching
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+        # Concurrent cache misses for one key share a single fetch; those
+        # that need the data share a single decrypt of each envelope
+        self.reads = SingleFlight('airtable')
+        self.decrypts = SingleFlight('airtable_decrypt')
+
+        # Optional write-behind: writes are acknowledged once journaled and
+        # drained to Airtable in the background under a rate limit
+        if write_behind is None:
+            write_behind = os.environ.get('AIRTABLE_WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+        self.write_queue = None
+        if write_behind:
+            self.write_queue = WriteBehindQueue(
+                self._apply_write_batch,
+                journal_path or os.environ.get('AIRTABLE_JOURNAL_PATH', 'site/journal/airtable_writes.jsonl'),
+                rate=write_rate or float(os.environ.get('AIRTABLE_WRITE_RATE', 5))
+            )
+
+    def _invalidate(self, key):
+        """Drop the cached value and validator for a key that was written or deleted"""
+        with self._versions_lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self.cache.invalidate(key)
+            self.validators.invalidate(key)
+        self.reads.forget(key)
+
+    def _cache_version(self, key):
+        with self._versions_lock:
+            return self._versions.get(key, 0)
+
+    def _fill_cache(self, key, version, value, etag):
+        """Cache a fetched value (if any) and its etag unless key was written since version"""
+        with self._versions_lock:
+            if self._versions.get(key, 0) != version:
+                return False
+            self.validators.set(key, etag)
+            if value is not None:
+                self.cache.set(key, (value, etag))
+            return True
+
+    def _blind_index_fields(self, data):
+        """Airtable columns holding data's blind-index tokens; None clears a column"""
+        return {
+            AIRTABLE_FIELD_PREFIX + field: token
+            for field, token in self.blind_index.tokens(data).items()
+        }
+
+    def load_index(self):
+        """Build the key -> record id index from one paginated scan"""
+        index = {}
+        for page in _timed_pages('list', self.table.iterate(fields=['key'])):  # ← USES pyairtable
+            for record in page:
+                key = record['fields'].get('key')
+                if key is not None:
+                    index[key] = record['id']
+        with self._index_lock:
+            self._index = index
+        return len(index)
+
+    def _ensure_index(self):
+        if self._index is None:
+            self.load_index()
+
+    def _index_get(self, key):
+        self._ensure_index()
+        with self._index_lock:
+            return self._index.get(key)
+
+    def _index_set(self, key, record_id):
+        self._ensure_index()
+        with self._index_lock:
+            self._index[key] = record_id
+
+    def _index_pop(self, key):
+        self._ensure_index()
+        with self._index_lock:
+            return self._index.pop(key, None)
+
+    def _lookup_record_id(self, key):
+        """Resolve a key to a record id, querying Airtable only on an index miss"""
+        record_id = self._index_get(key)
+        if record_id is not None:
+            return record_id
+
+        # Another worker may have created the key since the index was loaded
+        with _airtable_call('lookup'):
+            records = self.table.all(formula=match({'key': key}), fields=['key'])  # ← USES pyairtable
+        if not records:
+            return None
+        record_id = records[0]['id']
+        self._index_set(key, record_id)
+        return record_id
 
-    
     def store_data(self, key, data, data_type='content'):
         """Store encrypted data in Airtable"""
-        encrypted_value = self.encryptor.encrypt_data(data)
-        
-        # Check if record exists
-        existing_records = self.table.all(formula=f"{{key}} = '{key}'")  # ← USES pyairtable
-        
-        if existing_records:
-            # Update existing record
-            record_id = existing_records[0]['id']
-            self.table.update(record_id, {  # ← USES pyairtable
-                'encrypted_value': encrypted_value,
-                'data_type': data_type
-            })
-        else:
-            # Create new record
-            self.table.create({  # ← USES pyairtable
-                'key': key,
-                'encrypted_value': encrypted_value,
-                'data_type': data_type
-            })
+        encrypted_value = self.crypto.encrypt_data(data)
+        self.store_encrypted(key, encrypted_value, data_type, self._blind_index_fields(data))
+
+    def store_encrypted(self, key, encrypted_value, data_type='content', index_fields=None):
+        """Store an envelope as is; returns the Airtable record, or None when queued"""
+        index_fields = index_fields or {}
+        if self.write_queue is not None:
+            self.write_queue.enqueue_store(key, encrypted_value, data_type, index_fields)
+            self._invalidate(key)
+            return None
+
+        fields = {
+            'encrypted_value': encrypted_value,
+            'data_type': data_type,
+            **index_fields
+        }
+
+        record_id = self._lookup_record_id(key)
+        if record_id is not None:
+            try:
+                # Update existing record
+                with _airtable_call('update'):
+                    record = self.table.update(record_id, fields)  # ← USES pyairtable
+                self._invalidate(key)
+                return record
+            except HTTPError as e:
+                if not _is_not_found(e):
+                    raise
+                # Record was deleted elsewhere; fall through and recreate it
+                self._index_pop(key)
+
+        # Create new record
+        with _airtable_call('create'):
+            record = self.table.create(dict(fields, key=key))  # ← USES pyairtable
+        self._index_set(key, record['id'])
+        self._invalidate(key)
+        return record
     
+    def _lookup_record_ids(self, keys):
+        """Resolve many keys to record ids, querying Airtable once per chunk of index misses"""
+        found = {}
+        missing = []
+        for key in keys:
+            record_id = self._index_get(key)
+            if record_id is not None:
+                found[key] = record_id
+            else:
+                missing.append(key)
+
+        for i in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            chunk = missing[i:i + LOOKUP_CHUNK_SIZE]
+            formula = OR(*[match({'key': key}) for key in chunk])
+            with _airtable_call('lookup'):
+                records = self.table.all(formula=formula, fields=['key'])  # ← USES pyairtable
+            for record in records:
+                key = record['fields']['key']
+                found[key] = record['id']
+                self._index_set(key, record['id'])
+        return found
+
+    def store_many(self, items):
+        """Encrypt a batch in parallel and upsert it 10 records per request
+
+        items is a list of dicts with 'key', 'data' and optional 'data_type'.
+        """
+        # Last write wins for keys repeated within the batch
+        latest = {}
+        for item in items:
+            latest[item['key']] = item
+        items = list(latest.values())
+
+        encrypted = self.batch_processor.encrypt_many([item['data'] for item in items])
+        records = []
+        errors = {}
+        for item, result in zip(items, encrypted):
+            if 'error' in result:
+                errors[item['key']] = result['error']
+                continue
+            records.append({
+                'fields': {
+                    'key': item['key'],
+                    'encrypted_value': result['encrypted_data'],
+                    'data_type': item.get('data_type', 'content'),
+                    **self._blind_index_fields(item['data'])
+                }
+            })
+
+        if self.write_queue is not None:
+            for record in records:
+                fields = record['fields']
+                self.write_queue.enqueue_store(
+                    fields['key'], fields['encrypted_value'], fields['data_type'],
+                    {name: value for name, value in fields.items() if name.startswith(AIRTABLE_FIELD_PREFIX)}
+                )
+                self._invalidate(fields['key'])
+            return {"queued": [record['fields']['key'] for record in records], "errors": errors}
+
+        created, updated = self._upsert_records(records)
+        return {"created": created, "updated": updated, "errors": errors}
+
+    def _upsert_records(self, records):
+        """Upsert records on the key field, 10 per request"""
+        created = []
+        updated = []
+        for i in range(0, len(records), AIRTABLE_BATCH_SIZE):
+            chunk = records[i:i + AIRTABLE_BATCH_SIZE]
+            # Upsert on the key field so create vs update needs no lookup
+            with _airtable_call('batch_upsert'):
+                response = self.table.batch_upsert(chunk, key_fields=['key'])  # ← USES pyairtable
+            created_ids = set(response.get('createdRecords', []))
+            for record in response['records']:
+                key = record['fields']['key']
+                self._index_set(key, record['id'])
+                self._invalidate(key)
+                (created if record['id'] in created_ids else updated).append(key)
+        return created, updated
+
+    def delete_many(self, keys):
+        """Delete many keys using 10-record batch deletes"""
+        if self.write_queue is not None:
+            for key in dict.fromkeys(keys):
+                self.write_queue.enqueue_delete(key)
+                self._invalidate(key)
+            return {"queued": list(dict.fromkeys(keys))}
+
+        return self._delete_keys(keys)
+
+    def _delete_keys(self, keys):
+        """Delete records by key, 10 per request"""
+        record_ids = self._lookup_record_ids(list(dict.fromkeys(keys)))
+        deleted = []
+        items = list(record_ids.items())
+        for i in range(0, len(items), AIRTABLE_BATCH_SIZE):
+            chunk = items[i:i + AIRTABLE_BATCH_SIZE]
+            with _airtable_call('batch_delete'):
+                self.table.batch_delete([record_id for _, record_id in chunk])  # ← USES pyairtable
+            for key, _ in chunk:
+                self._index_pop(key)
+                self._invalidate(key)
+                deleted.append(key)
+
+        missing = [key for key in keys if key not in record_ids]
+        return {"deleted": deleted, "missing": missing}
+
     def get_data(self, key):
-        """Retrieve and decrypt data from Airtable"""
-        records = self.table.all(formula=f"{{key}} = '{key}'")  # ← USES pyairtable
-        
-        if not records:
+        """Retrieve and decrypt data from Airtable, served from cache when fresh"""
+        return self.get_data_if_changed(key)[0]
+
+    def get_data_if_changed(self, key, etags=()):
+        """Return (data, etag), skipping the decrypt when etag is in etags
+
+        data is None when the caller's copy is current (etag in etags) or
+        the key does not exist (etag None). A validator cached by an earlier
+        read answers a matching etag without touching Airtable.
+        """
+        if self.write_queue is not None:
+            # Read your own writes while they wait in the queue
+            pending = self.write_queue.pending_op(key)
+            if pending is not None:
+                if pending['op'] == 'delete':
+                    return None, None
+                etag = envelope_etag(pending['encrypted_value'])
+                if etag in etags:
+                    return None, etag
+                return self.crypto.decrypt_data(pending['encrypted_value']), etag
+
+        if etags:
+            etag = self.validators.get(key)
+            if etag is not None and etag in etags:
+                return None, etag
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            value, etag = cached
+            if etag in etags:
+                return None, etag
+            if self.cache_ciphertext_only:
+                return self.crypto.decrypt_data(value), etag
+            # Callers may mutate the result; never hand out the cached object
+            return copy.deepcopy(value), etag
+
+        encrypted_value, etag, version = self.reads.do(key, lambda: self._fetch(key))
+        if etag is None or etag in etags:
+            return None, etag
+        data = self.decrypts.do((key, etag), lambda: self._decrypt(key, version, encrypted_value, etag))
+        return data, etag
+
+    def fetch_record(self, key):
+        """Return the stored fields of one record (still encrypted), or None if missing"""
+        record_id = self._lookup_record_id(key)
+        if record_id is None:
             return None
-        
-        encrypted_value = records[0]['fields']['encrypted_value']
-        return self.encryptor.decrypt_data(encrypted_value)
+
+        try:
+            with _airtable_call('get'):
+                record = self.table.get(record_id)  # ← USES pyairtable
+        except HTTPError as e:
+            if not _is_not_found(e):
+                raise
+            self._index_pop(key)
+            return None
+        return record['fields']
+
+    def _fetch(self, key):
+        """Fetch one record's envelope and cache its etag; (None, None, version) if missing
+
+        Nothing is decrypted here, so a caller whose etag matches never
+        pays for it. version is for _decrypt's cache fill.
+        """
+        # Taken before the fetch, so a write landing meanwhile keeps this
+        # (possibly older) value out of the cache
+        version = self._cache_version(key)
+        fields = self.fetch_record(key)
+        if fields is None:
+            return None, None, version
+
+        encrypted_value = fields['encrypted_value']
+        etag = envelope_etag(encrypted_value)
+        self._fill_cache(key, version, encrypted_value if self.cache_ciphertext_only else None, etag)
+        return encrypted_value, etag, version
+
+    def _decrypt(self, key, version, encrypted_value, etag):
+        """Decrypt a fetched envelope and fill the plaintext cache"""
+        data = self.crypto.decrypt_data(encrypted_value)
+        if not self.cache_ciphertext_only:
+            self._fill_cache(key, version, copy.deepcopy(data), etag)
+        return data
+
+    def _apply_write_batch(self, ops):
+        """Apply one batch of journaled write-behind ops to Airtable"""
+        if ops[0]['op'] == 'store':
+            self._upsert_records([
+                {'fields': {
+                    'key': op['key'],
+                    'encrypted_value': op['encrypted_value'],
+                    'data_type': op['data_type'],
+                    **op.get('index_fields', {})
+                }}
+                for op in ops
+            ])
+        else:
+            self._delete_keys([op['key'] for op in ops])
+        for op in ops:
+            self._invalidate(op['key'])
+
+    def flush_writes(self, timeout=None):
+        """Wait until queued writes reach Airtable; True if nothing is left"""
+        if self.write_queue is None:
+            return True
+        return self.write_queue.flush(timeout)
+
+    def write_queue_stats(self):
+        """Return write-behind queue depth and counters"""
+        if self.write_queue is None:
+            return {"enabled": False}
+        return dict(self.write_queue.stats(), enabled=True)
+
+    def cache_stats(self):
+        """Return read-through cache counters"""
+        return dict(self.cache.stats(), ciphertext_only=self.cache_ciphertext_only)
+    
+    def coalescing_stats(self):
+        """Return how many concurrent reads shared another read's fetch (and decrypt)"""
+        return dict(self.reads.stats(), decrypts=self.decrypts.stats())
     
     def get_all_data(self):
         """Retrieve all data from Airtable"""
-        records = self.table.all()  # ← USES pyairtable
-        result = {}
-        
-        for record in records:
+        return dict(self.iter_all_data())
+
+    def iter_all_data(self, max_in_flight=None):
+        """Yield (key, record) for every record, decrypting on the batch pool
+
+        Decrypts for a page are submitted as soon as it arrives, and results
+        are yielded in table order as they complete, while later pages are
+        still being fetched. At most max_in_flight decrypts are outstanding.
+        """
+        if max_in_flight is None:
+            max_in_flight = self.batch_processor.max_workers * 8
+        pending = deque()
+        index = {}
+
+        def finish(record, future):
+            result = future.result()
             key = record['fields']['key']
-            encrypted_value = record['fields']['encrypted_value']
-            result[key] = {
-                'data': self.encryptor.decrypt_data(encrypted_value),
+            if 'error' in result:
+                raise ValueError(f"Failed to decrypt '{key}': {result['error']}")
+            return key, {
+                'data': result['decrypted_data'],
                 'type': record['fields'].get('data_type', 'content'),
                 'created': record['fields'].get('created_time'),
                 'modified': record['fields'].get('last_modified_time')
             }
-        
-        return result
+
+        for page in _timed_pages('list', self.table.iterate()):  # ← USES pyairtable
+            for record in page:
+                index[record['fields']['key']] = record['id']
+                while len(pending) >= max_in_flight:
+                    yield finish(*pending.popleft())
+                pending.append((
+                    record,
+                    self.batch_processor.submit_decrypt(record['fields']['encrypted_value'])
+                ))
+            # Hand back whatever is already done before fetching the next page
+            while pending and pending[0][1].done():
+                yield finish(*pending.popleft())
+
+        while pending:
+            yield finish(*pending.popleft())
+
+        # A full scan is as good as a fresh index load
+        with self._index_lock:
+            self._index = index
     
+    def search_data(self, field, value):
+        """Return [(key, data)] for records whose field equals value
+
+        The equality test is pushed down to Airtable as a formula on the
+        field's blind-index column, so only matching records are fetched
+        and decrypted. Writes still queued by write-behind are not visible.
+        """
+        self.blind_index.check_field(field)
+        token = self.blind_index.token(field, value)
+        with _airtable_call('search'):
+            records = self.table.all(  # ← USES pyairtable
+                formula=match({AIRTABLE_FIELD_PREFIX + field: token}),
+                fields=['key', 'encrypted_value']
+            )
+        records = [record['fields'] for record in records
+                   if 'key' in record['fields'] and 'encrypted_value' in record['fields']]
+        results = self.batch_processor.decrypt_many([fields['encrypted_value'] for fields in records])
+        matches = []
+        for fields, result in zip(records, results):
+            # Re-check the plaintext so a stale or colliding token never leaks a record
+            if 'error' not in result and self.blind_index.matches(result['decrypted_data'], field, value):
+                matches.append((fields['key'], result['decrypted_data']))
+        return sorted(matches, key=lambda match: match[0])
+
+    def rebuild_blind_index(self):
+        """Recompute every record's blind-index columns; returns the number updated
+
+        Tokens are keyed by the passcode, so run this after rotate_keys.py
+        or after changing BLIND_INDEX_FIELDS.
+        """
+        self.flush_writes()
+        # The full scan also reloads the key -> record id index
+        records = list(self.iter_all_data())
+        updates = [
+            {'id': self._index_get(key), 'fields': self._blind_index_fields(record['data'])}
+            for key, record in records
+        ]
+        for i in range(0, len(updates), AIRTABLE_BATCH_SIZE):
+            with _airtable_call('batch_update'):
+                self.table.batch_update(updates[i:i + AIRTABLE_BATCH_SIZE])  # ← USES pyairtable
+        return len(updates)
+
     def delete_data(self, key):
         """Delete data from Airtable"""
-        records = self.table.all(formula=f"{{key}} = '{key}'")  # ← USES pyairtable
-        
-        if records:
-            self.table.delete(records[0]['id'])  # ← USES pyairtable
-            return True
-        return False
+        if self.write_queue is not None:
+            pending = self.write_queue.pending_op(key)
+            if pending is not None:
+                existed = pending['op'] == 'store'
+            else:
+                existed = self._lookup_record_id(key) is not None
+            if existed:
+                self.write_queue.enqueue_delete(key)
+                self._invalidate(key)
+            return existed
+
+        record_id = self._lookup_record_id(key)
+        if record_id is None:
+            return False
+
+        self._index_pop(key)
+        self._invalidate(key)
+        try:
+            with _airtable_call('delete'):
+                self.table.delete(record_id)  # ← USES pyairtable
+        except HTTPError as e:
+            if not _is_not_found(e):
+                raise
+            return False
+        return True
 
 
 
     
+    # SiteManager-compatible interface used by the Flask routes
+    def store_site_data(self, data_id, data, notes=None):
+        """Store encrypted site data with notes - for Flask API"""
+        site_data = {
+            "data": data,
+            "notes": notes,
+            "timestamp": time.time()
+        }
+        self.store_data(data_id, site_data)
+        return {"message": f"Data stored as {data_id}", "id": data_id}
+
+    def retrieve_site_data(self, data_id):
+        """Retrieve and decrypt site data - for Flask API"""
+        return self.retrieve_site_data_if_changed(data_id)[0]
+
+    def retrieve_site_data_if_changed(self, data_id, etags=()):
+        """Return (site data or error, etag); site data is None when etag is in etags"""
+        data, etag = self.get_data_if_changed(data_id, etags)
+        if etag is None:
+            return {"error": f"Data with ID '{data_id}' not found"}, None
+        return data, etag
+
+    def search_site_data(self, field, value):
+        """Return {"items": [...]} of site data whose field equals value - for Flask API
+
+        field is a BLIND_INDEX_FIELDS path into the stored record, e.g. data.email.
+        """
+        return {"items": [dict(data, id=key) for key, data in self.search_data(field, value)]}
+
+    def delete_site_data(self, data_id):
+        """Delete encrypted site data - for Flask API"""
+        if self.delete_data(data_id):
+            return {"message": f"Data '{data_id}' deleted"}
+        return {"error": f"Data with ID '{data_id}' not found"}
+
     def list_all_data(self):
         """List all stored data"""
         try:
@@ -113,17 +668,41 @@ class AirtableManager:
                     })
                 return files
             else:
-                records = self.table.all()
-                files = []
-                
-                for record in records:
-                    files.append({
-                        "id": record['fields']['key'],
-                        "filename": f"{record['fields']['key']}.enc", 
-                        "path": f"airtable:{record['fields']['key']}"
-                    })
-                
-                return files
+                # Only the key field is needed; never download ciphertext to list
+                with _airtable_call('list'):
+                    records = self.table.all(fields=['key'])
+                return [self._list_entry(record) for record in records]
         except Exception as e:
             print(f"Error listing data: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def _list_entry(self, record):
+        key = record['fields']['key']
+        return {
+            "id": key,
+            "filename": f"{key}.enc",
+            "path": f"airtable:{key}"
+        }
+
+    def list_data_page(self, limit, cursor=None):
+        """List one page of stored keys using Airtable's native page offset
+
+        Returns {"items": [...], "next_cursor": str or None}; pass next_cursor
+        back in to fetch the following page.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        options = {'page_size': limit, 'fields': ['key']}
+        if cursor:
+            options['offset'] = cursor
+
+        with _airtable_call('list_page'):
+            response = self.table.api.request(  # ← USES pyairtable
+                'get',
+                self.table.urls.records,
+                fallback=('post', self.table.urls.records_post),
+                options=options
+            )
+        return {
+            "items": [self._list_entry(record) for record in response.get('records', [])],
+            "next_cursor": response.get('offset')
+        }
\ No newline at end of file
@@ -0,0 +1,302 @@
+import os
+import time
+import asyncio
+import httpx
+from pyairtable.formulas import match, OR
+from .encryption import DataEncryptor
+from .blind_index import BlindIndexer, AIRTABLE_FIELD_PREFIX
+from .metrics import AIRTABLE_REQUEST_SECONDS, AIRTABLE_ERRORS, AIRTABLE_RATE_LIMITED, AIRTABLE_RETRIES
+
+AIRTABLE_ENDPOINT_URL = 'https://api.airtable.com'
+AIRTABLE_BATCH_SIZE = 10
+LOOKUP_CHUNK_SIZE = 50
+DEFAULT_CONCURRENCY = 5
+MAX_RETRIES = 5
+
+
+class AsyncAirtableManager:
+    """asyncio counterpart of AirtableManager
+
+    Uses one pooled httpx.AsyncClient with keep-alive connections for every
+    request, caps in-flight requests with a semaphore and runs decryption on
+    an executor so the event loop never blocks on crypto. Use it as an async
+    context manager so the connection pool is closed:
+
+        async with AsyncAirtableManager() as manager:
+            data = await manager.get_many(['site_config', 'content_data'])
+    """
+
+    def __init__(self, concurrency=None, endpoint_url=None, table_name='site_data', executor=None, transport=None,
+                 blind_index_fields=None):
+        self.api_key = os.environ.get('AIRTABLE_KEY')
+        self.base_id = os.environ.get('AIRTABLE_BASE_ID')
+        if not self.api_key or not self.base_id:
+            raise ValueError("AIRTABLE_KEY and AIRTABLE_BASE_ID environment variables must be set")
+
+        self.concurrency = concurrency or int(os.environ.get('AIRTABLE_CONCURRENCY', DEFAULT_CONCURRENCY))
+        self.endpoint_url = (endpoint_url or os.environ.get('AIRTABLE_ENDPOINT_URL', AIRTABLE_ENDPOINT_URL)).rstrip('/')
+        self.table_url = f"{self.endpoint_url}/v0/{self.base_id}/{table_name}"
+        self.encryptor = DataEncryptor()
+        # Same bidx_<path> columns as AirtableManager, so its search finds these records
+        self.blind_index = BlindIndexer(self.encryptor, blind_index_fields)
+        self.executor = executor
+        self._transport = transport
+        self._client = None
+        self._semaphore = None
+        self._index = None
+        self._index_lock = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Create the shared connection pool"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency
+                ),
+                timeout=httpx.Timeout(30.0),
+                transport=self._transport
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._index_lock = asyncio.Lock()
+
+    async def close(self):
+        """Close the shared connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method, url, **kwargs):
+        """Send one request, retrying 429s and 5xx responses with backoff"""
+        await self.open()
+        operation = f"async_{method.lower()}"
+        start = time.perf_counter()
+        try:
+            delay = 1.0
+            for attempt in range(MAX_RETRIES + 1):
+                async with self._semaphore:
+                    response = await self._client.request(method, url, **kwargs)
+                if response.status_code == 429 or response.status_code >= 500:
+                    if response.status_code == 429:
+                        AIRTABLE_RATE_LIMITED.inc()
+                    if attempt == MAX_RETRIES:
+                        break
+                    AIRTABLE_RETRIES.inc()
+                    retry_after = response.headers.get('Retry-After')
+                    await asyncio.sleep(float(retry_after) if retry_after else delay)
+                    delay = min(delay * 2, 30.0)
+                    continue
+                break
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            AIRTABLE_ERRORS.labels(operation).inc()
+            raise
+        finally:
+            AIRTABLE_REQUEST_SECONDS.labels(operation).observe(time.perf_counter() - start)
+
+    async def _decrypt(self, encrypted_value):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.encryptor.decrypt_data, encrypted_value)
+
+    async def _encrypt(self, data):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.encryptor.encrypt_data, data)
+
+    async def iterate_pages(self, formula=None, fields=None, page_size=100):
+        """Yield pages of records, fetching the next page while the caller works on this one"""
+        params = {'pageSize': page_size}
+        if formula is not None:
+            params['filterByFormula'] = str(formula)
+        if fields:
+            params['fields[]'] = list(fields)
+
+        next_page = asyncio.ensure_future(self._request('GET', self.table_url, params=params))
+        try:
+            while next_page is not None:
+                page = await next_page
+                offset = page.get('offset')
+                next_page = None
+                if offset:
+                    next_page = asyncio.ensure_future(
+                        self._request('GET', self.table_url, params=dict(params, offset=offset))
+                    )
+                yield page.get('records', [])
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def load_index(self):
+        """Build the key -> record id index from one paginated scan"""
+        index = {}
+        async for page in self.iterate_pages(fields=['key']):
+            for record in page:
+                key = record['fields'].get('key')
+                if key is not None:
+                    index[key] = record['id']
+        self._index = index
+        return len(index)
+
+    async def _ensure_index(self):
+        await self.open()
+        if self._index is None:
+            async with self._index_lock:
+                if self._index is None:
+                    await self.load_index()
+
+    async def _lookup_record_ids(self, keys):
+        """Resolve keys to record ids, querying Airtable only for index misses"""
+        await self._ensure_index()
+        found = {key: self._index[key] for key in keys if key in self._index}
+        missing = [key for key in keys if key not in found]
+
+        async def lookup(chunk):
+            formula = OR(*[match({'key': key}) for key in chunk])
+            async for page in self.iterate_pages(formula=formula, fields=['key']):
+                for record in page:
+                    found[record['fields']['key']] = record['id']
+                    self._index[record['fields']['key']] = record['id']
+
+        await asyncio.gather(*[
+            lookup(missing[i:i + LOOKUP_CHUNK_SIZE])
+            for i in range(0, len(missing), LOOKUP_CHUNK_SIZE)
+        ])
+        return found
+
+    async def get_data(self, key):
+        """Retrieve and decrypt data from Airtable"""
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys):
+        """Fetch and decrypt many keys concurrently; missing keys are left out"""
+        record_ids = await self._lookup_record_ids(list(dict.fromkeys(keys)))
+
+        async def fetch(key, record_id):
+            record = await self._request('GET', f"{self.table_url}/{record_id}")
+            if record is None:
+                self._index.pop(key, None)
+                return key, None
+            return key, await self._decrypt(record['fields']['encrypted_value'])
+
+        results = await asyncio.gather(*[fetch(key, record_id) for key, record_id in record_ids.items()])
+        return {key: data for key, data in results if data is not None}
+
+    async def get_all_data(self):
+        """Retrieve all data, decrypting each page while the next one downloads"""
+        result = {}
+        index = {}
+        async for page in self.iterate_pages():
+            decrypted = await asyncio.gather(*[
+                self._decrypt(record['fields']['encrypted_value']) for record in page
+            ])
+            for record, data in zip(page, decrypted):
+                key = record['fields']['key']
+                index[key] = record['id']
+                result[key] = {
+                    'data': data,
+                    'type': record['fields'].get('data_type', 'content'),
+                    'created': record['fields'].get('created_time'),
+                    'modified': record['fields'].get('last_modified_time')
+                }
+        self._index = index
+        return result
+
+    def _blind_index_fields(self, data):
+        """Airtable columns holding data's blind-index tokens; None clears a column"""
+        return {
+            AIRTABLE_FIELD_PREFIX + field: token
+            for field, token in self.blind_index.tokens(data).items()
+        }
+
+    async def store_data(self, key, data, data_type='content'):
+        """Store encrypted data in Airtable"""
+        await self.store_many([{'key': key, 'data': data, 'data_type': data_type}])
+
+    async def store_many(self, items):
+        """Encrypt items concurrently and upsert them 10 records per request"""
+        latest = {}
+        for item in items:
+            latest[item['key']] = item
+        items = list(latest.values())
+
+        encrypted = await asyncio.gather(*[self._encrypt(item['data']) for item in items])
+        records = [
+            {'fields': {
+                'key': item['key'],
+                'encrypted_value': encrypted_value,
+                'data_type': item.get('data_type', 'content'),
+                **self._blind_index_fields(item['data'])
+            }}
+            for item, encrypted_value in zip(items, encrypted)
+        ]
+
+        async def upsert(chunk):
+            return await self._request('PATCH', self.table_url, json={
+                'performUpsert': {'fieldsToMergeOn': ['key']},
+                'records': chunk
+            })
+
+        responses = await asyncio.gather(*[
+            upsert(records[i:i + AIRTABLE_BATCH_SIZE])
+            for i in range(0, len(records), AIRTABLE_BATCH_SIZE)
+        ])
+
+        created = []
+        updated = []
+        await self._ensure_index()
+        for response in responses:
+            created_ids = set(response.get('createdRecords', []))
+            for record in response['records']:
+                key = record['fields']['key']
+                self._index[key] = record['id']
+                (created if record['id'] in created_ids else updated).append(key)
+        return {"created": created, "updated": updated}
+
+    async def delete_data(self, key):
+        """Delete data from Airtable"""
+        return key in (await self.delete_many([key]))['deleted']
+
+    async def delete_many(self, keys):
+        """Delete many keys, 10 records per request"""
+        record_ids = await self._lookup_record_ids(list(dict.fromkeys(keys)))
+        items = list(record_ids.items())
+
+        async def delete(chunk):
+            await self._request('DELETE', self.table_url, params={
+                'records[]': [record_id for _, record_id in chunk]
+            })
+
+        await asyncio.gather(*[
+            delete(items[i:i + AIRTABLE_BATCH_SIZE])
+            for i in range(0, len(items), AIRTABLE_BATCH_SIZE)
+        ])
+        for key, _ in items:
+            self._index.pop(key, None)
+
+        return {
+            "deleted": [key for key, _ in items],
+            "missing": [key for key in keys if key not in record_ids]
+        }
+
+    async def list_all_data(self):
+        """List all stored keys without downloading ciphertext"""
+        files = []
+        async for page in self.iterate_pages(fields=['key']):
+            for record in page:
+                key = record['fields']['key']
+                files.append({
+                    "id": key,
+                    "filename": f"{key}.enc",
+                    "path": f"airtable:{key}"
+                })
+        return files
@@ -0,0 +1,103 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .encryption import DataEncryptor
+
+DEFAULT_BATCH_MAX_ITEMS = 1000
+
+# Per-process encryptor used by the process pool workers
+_worker_encryptor = None
+
+
+def _init_worker():
+    global _worker_encryptor
+    _worker_encryptor = DataEncryptor()
+
+
+def _encrypt_item(encryptor, item):
+    if not item:
+        return {"error": "Data field is required."}
+    try:
+        return {"encrypted_data": encryptor.encrypt_data(item)}
+    except Exception as e:
+        return {"error": f"Encryption failed: {str(e)}"}
+
+
+def _decrypt_item(encryptor, item):
+    if not item or not isinstance(item, str):
+        return {"error": "encrypted_data field is required."}
+    try:
+        return {"decrypted_data": encryptor.decrypt_data(item)}
+    except Exception as e:
+        return {"error": f"Decryption failed: {str(e)}"}
+
+
+def _worker_encrypt(item):
+    return _encrypt_item(_worker_encryptor, item)
+
+
+def _worker_decrypt(item):
+    return _decrypt_item(_worker_encryptor, item)
+
+
+class BatchProcessor:
+    """Spread encrypt/decrypt work for a batch over a thread or process pool"""
+
+    def __init__(self, encryptor, max_workers=None, executor=None, max_items=None):
+        self.encryptor = encryptor
+        self.max_workers = max_workers or int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 1))
+        self.executor_type = executor or os.environ.get('BATCH_EXECUTOR', 'thread')
+        self.max_items = max_items or int(os.environ.get('BATCH_MAX_ITEMS', DEFAULT_BATCH_MAX_ITEMS))
+
+        if self.executor_type not in ('thread', 'process'):
+            raise ValueError(f"Unsupported batch executor: {self.executor_type}")
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        """Create the worker pool on first use"""
+        with self._pool_lock:
+            if self._pool is not None:
+                return self._pool
+            if self.executor_type == 'process':
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='batch-crypto'
+                )
+        return self._pool
+
+    def _map(self, thread_func, process_func, items):
+        if len(items) <= 1:
+            return [thread_func(self.encryptor, item) for item in items]
+
+        pool = self._get_pool()
+        if self.executor_type == 'process':
+            chunksize = max(1, len(items) // (self.max_workers * 4))
+            return list(pool.map(process_func, items, chunksize=chunksize))
+        return list(pool.map(lambda item: thread_func(self.encryptor, item), items))
+
+    def encrypt_many(self, items):
+        """Encrypt a list of values, returning one result per item in order"""
+        return self._map(_encrypt_item, _worker_encrypt, items)
+
+    def decrypt_many(self, items):
+        """Decrypt a list of envelopes, returning one result per item in order"""
+        return self._map(_decrypt_item, _worker_decrypt, items)
+
+    def submit_decrypt(self, item):
+        """Schedule one decrypt on the pool and return its future"""
+        pool = self._get_pool()
+        if self.executor_type == 'process':
+            return pool.submit(_worker_decrypt, item)
+        return pool.submit(_decrypt_item, self.encryptor, item)
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,136 @@
+import os
+import json
+import sqlite3
+import threading
+
+# Tokens are HMACs under their own passcode-derived subkey, truncated to
+# 128 bits; the field path is hashed in so equal values in different fields
+# give different tokens
+HKDF_INFO_BLIND_INDEX = b'python_api_site/blind-index/v1'
+TOKEN_LENGTH = 32
+# Airtable column holding the token for field path p is AIRTABLE_FIELD_PREFIX + p
+AIRTABLE_FIELD_PREFIX = 'bidx_'
+LOCAL_INDEX_FILENAME = 'blind_index.db'
+
+_MISSING = object()
+
+
+def configured_fields(value=None):
+    """Parse a comma-separated list of JSON paths (default BLIND_INDEX_FIELDS)"""
+    if value is None:
+        value = os.environ.get('BLIND_INDEX_FIELDS', '')
+    return tuple(dict.fromkeys(path.strip() for path in value.split(',') if path.strip()))
+
+
+def extract(data, path):
+    """Value at a dotted path in nested dicts, or _MISSING"""
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def normalize(value):
+    """Text form of a value; query strings compare against this"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+class BlindIndexer:
+    """Keyed equality tokens for configured JSON paths of stored documents
+
+    A token reveals only whether two records hold the same value at the same
+    path, never the value; it changes with the passcode.
+    """
+
+    def __init__(self, encryptor, fields=None):
+        self.encryptor = encryptor
+        self.fields = configured_fields() if fields is None else tuple(fields)
+
+    def token(self, field, value):
+        return self.encryptor.keyed_hash(f"{field}\0{normalize(value)}", HKDF_INFO_BLIND_INDEX)[:TOKEN_LENGTH]
+
+    def tokens(self, data):
+        """Return {field: token} for every configured field; None where data lacks it"""
+        tokens = {}
+        for field in self.fields:
+            value = extract(data, field)
+            tokens[field] = None if value is _MISSING else self.token(field, value)
+        return tokens
+
+    def matches(self, data, field, value):
+        """Check a decrypted document really holds value (guards stale index entries)"""
+        found = extract(data, field)
+        return found is not _MISSING and normalize(found) == normalize(value)
+
+    def check_field(self, field):
+        if field not in self.fields:
+            raise ValueError(f"Field '{field}' is not blind-indexed")
+
+
+class LocalBlindIndex:
+    """(field, token) -> ids for SiteManager records, in a SQLite file
+
+    Kept apart from the record backend so it works with every backend; one
+    connection per thread, as in SQLiteBackend.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blind_index (
+            field TEXT NOT NULL,
+            token TEXT NOT NULL,
+            id TEXT NOT NULL,
+            PRIMARY KEY (field, token, id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS blind_index_id ON blind_index (id);
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def set(self, data_id, tokens):
+        """Replace the tokens of one record"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM blind_index WHERE id = ?', (data_id,))
+            conn.executemany(
+                'INSERT OR IGNORE INTO blind_index (field, token, id) VALUES (?, ?, ?)',
+                [(field, token, data_id) for field, token in tokens.items() if token is not None]
+            )
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def remove(self, data_id):
+        self._connection().execute('DELETE FROM blind_index WHERE id = ?', (data_id,))
+
+    def find(self, field, token):
+        """Return the ids whose field has this token, sorted"""
+        rows = self._connection().execute(
+            'SELECT id FROM blind_index WHERE field = ? AND token = ? ORDER BY id', (field, token)
+        )
+        return [row[0] for row in rows]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
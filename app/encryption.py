@@ -1,77 +1,525 @@
 import os
 import base64
 import json
+import hmac
+import hashlib
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
+from .metrics import ENCRYPTION_KDF_SECONDS, ENCRYPTION_AEAD_SECONDS, ENCRYPTION_BYTES, ENCRYPTION_COMPRESSION_BYTES
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used instead
+    zstandard = None
+
+# Envelope formats:
+#   v1: base64(salt[16] + nonce[12] + ciphertext), key = PBKDF2(passcode, salt)
+#   v2: "v2:" + base64(master_salt[16] + salt[16] + nonce[12] + ciphertext),
+#       master = PBKDF2(passcode, master_salt) (once per process),
+#       key = HKDF(master, salt)
+#   v3: "v3:" + base64(codec[1] + master_salt[16] + salt[16] + nonce[12] + ciphertext),
+#       v2 keys; the plaintext is compressed with codec before AES-GCM and
+#       the codec byte is authenticated as associated data
+ENVELOPE_V2_PREFIX = 'v2:'
+ENVELOPE_V3_PREFIX = 'v3:'
+HKDF_INFO_V2 = b'python_api_site/envelope/v2'
+# Keyed hashes use HKDF subkeys of PBKDF2(passcode, HASH_KEY_SALT); the fixed
+# salt makes digests comparable across processes and builds
+HASH_KEY_SALT = b'python_api_site/keyed-hash/v1'
+HKDF_INFO_CONTENT_HASH = b'python_api_site/content-hash'
+PBKDF2_ITERATIONS = 100000
+DEFAULT_KEY_CACHE_SIZE = 128
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}
+# Below this many plaintext bytes compression rarely pays for its header
+DEFAULT_COMPRESSION_MIN_BYTES = 256
+
+# Streaming file format:
+#   header  = magic[4] + version[1] + segment_size[4] + master_salt[16]
+#             + salt[16] + nonce_prefix[7]
+#   segment = AES-GCM(key, nonce_prefix + counter[4] + last_flag[1], chunk, aad=header)
+# Every segment holds segment_size plaintext bytes except the last one, whose
+# nonce carries last_flag=1 so a stream truncated at a segment boundary fails
+# authentication.
+STREAM_MAGIC = b'\x00ENC'
+STREAM_VERSION = 1
+STREAM_HEADER_LEN = 4 + 1 + 4 + 16 + 16 + 7
+HKDF_INFO_STREAM = b'python_api_site/stream/v1'
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+# segment_size is read before anything is authenticated; larger values are
+# rejected so a crafted header cannot make the decryptor buffer everything
+MAX_SEGMENT_SIZE = 64 * 1024 * 1024
+GCM_TAG_LEN = 16
+MAX_SEGMENTS = 2 ** 32
+
+# Metric series bound once; observing is then a bisect and a lock
+_PBKDF2_SECONDS = ENCRYPTION_KDF_SECONDS.labels('pbkdf2')
+_HKDF_SECONDS = ENCRYPTION_KDF_SECONDS.labels('hkdf')
+_ENCRYPT_SECONDS = ENCRYPTION_AEAD_SECONDS.labels('encrypt')
+_DECRYPT_SECONDS = ENCRYPTION_AEAD_SECONDS.labels('decrypt')
+_ENCRYPT_BYTES = ENCRYPTION_BYTES.labels('encrypt')
+_DECRYPT_BYTES = ENCRYPTION_BYTES.labels('decrypt')
+_COMPRESSION_IN = ENCRYPTION_COMPRESSION_BYTES.labels('in')
+_COMPRESSION_OUT = ENCRYPTION_COMPRESSION_BYTES.labels('out')
+
+
+class CompressionStats:
+    """Process-wide compress-then-encrypt counters"""
 
-class DataEncryptor:
     def __init__(self):
-        self.passcode = os.environ.get('LOCAL_PASSCODE_FOR_SITE_DATA')
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.compressed = 0
+            self.skipped_small = 0
+            self.skipped_incompressible = 0
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record(self, outcome, size_in=0, size_out=0):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "compressed": self.compressed,
+                "skipped_small": self.skipped_small,
+                "skipped_incompressible": self.skipped_incompressible,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": self.bytes_in / self.bytes_out if self.bytes_out else None,
+                "saved_bytes": self.bytes_in - self.bytes_out
+            }
+
+
+COMPRESSION_STATS = CompressionStats()
+
+
+def _resolve_codec(compression):
+    """Map none/zlib/zstd/auto to a codec id (0 = no compression)"""
+    compression = (compression or 'none').lower()
+    if compression in ('none', 'off', 'false', '0'):
+        return 0
+    if compression == 'auto':
+        return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+    if compression not in CODECS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if compression == 'zstd' and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+    return CODECS[compression]
+
+
+def envelope_etag(encrypted_data):
+    """Strong HTTP validator for a stored envelope
+
+    Every encryption uses a fresh salt and nonce, so any rewrite changes the
+    envelope, and with it the tag, even if the plaintext is the same.
+    """
+    return hashlib.sha256(encrypted_data.encode('utf-8')).hexdigest()[:32]
+
+
+class DataEncryptor:
+    def __init__(self, envelope_version=None, key_cache_size=None, compression=None, compression_min_bytes=None,
+                 passcode=None):
+        # An explicit passcode is for key rotation; everything else uses the environment
+        self.passcode = passcode or os.environ.get('LOCAL_PASSCODE_FOR_SITE_DATA')
         if not self.passcode:
             raise ValueError("LOCAL_PASSCODE_FOR_SITE_DATA environment variable not set")
-        
+
+        if envelope_version is None:
+            envelope_version = int(os.environ.get('ENCRYPTION_ENVELOPE_VERSION', 2))
+        if envelope_version not in (1, 2):
+            raise ValueError(f"Unsupported envelope version: {envelope_version}")
+        self.envelope_version = envelope_version
+
+        # Compress-then-encrypt (v3 envelopes); ignored for v1 envelopes
+        if compression is None:
+            compression = os.environ.get('ENCRYPTION_COMPRESSION', 'none')
+        self.compression_codec = _resolve_codec(compression)
+        if compression_min_bytes is None:
+            compression_min_bytes = int(os.environ.get('ENCRYPTION_COMPRESSION_MIN_BYTES', DEFAULT_COMPRESSION_MIN_BYTES))
+        self.compression_min_bytes = compression_min_bytes
+
+        if key_cache_size is None:
+            key_cache_size = int(os.environ.get('ENCRYPTION_KEY_CACHE_SIZE', DEFAULT_KEY_CACHE_SIZE))
+        self.key_cache_size = key_cache_size
+        self._key_cache = OrderedDict()
+        self._key_cache_lock = threading.Lock()
+        self.key_cache_hits = 0
+        self.key_cache_misses = 0
+
+        self._master = None
+        self._master_lock = threading.Lock()
+        self._hash_keys = {}
+
     def _derive_key(self, salt=None):
-        """Derive encryption key from passcode using PBKDF2"""
+        """Derive encryption key from passcode using PBKDF2 (cached by salt)"""
         if salt is None:
             salt = os.urandom(16)
-        
+
+        salt = bytes(salt)
+        with self._key_cache_lock:
+            key = self._key_cache.get(salt)
+            if key is not None:
+                self._key_cache.move_to_end(salt)
+                self.key_cache_hits += 1
+                return key, salt
+            self.key_cache_misses += 1
+
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
             salt=salt,
-            iterations=100000,
+            iterations=PBKDF2_ITERATIONS,
             backend=default_backend()
         )
+        start = time.perf_counter()
         key = kdf.derive(self.passcode.encode('utf-8'))
+        _PBKDF2_SECONDS.observe(time.perf_counter() - start)
+
+        if self.key_cache_size > 0:
+            with self._key_cache_lock:
+                self._key_cache[salt] = key
+                self._key_cache.move_to_end(salt)
+                while len(self._key_cache) > self.key_cache_size:
+                    self._key_cache.popitem(last=False)
         return key, salt
-    
-    def encrypt_data(self, plaintext):
+
+    def _get_master_key(self):
+        """Derive this process's v2 master key once and reuse it"""
+        if self._master is None:
+            with self._master_lock:
+                if self._master is None:
+                    self._master = self._derive_key()
+        return self._master
+
+    def _master_key_for(self, master_salt):
+        """Return the master key for a salt, reusing this process's own key"""
+        master = self._master
+        if master is not None and master[1] == master_salt:
+            return master[0]
+        master_key, _ = self._derive_key(master_salt)
+        return master_key
+
+    def _derive_subkey(self, master_key, salt, info=HKDF_INFO_V2):
+        """Derive a per-message key from a master key using HKDF"""
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=salt,
+            info=info,
+            backend=default_backend()
+        )
+        start = time.perf_counter()
+        key = hkdf.derive(master_key)
+        _HKDF_SECONDS.observe(time.perf_counter() - start)
+        return key
+
+    def _hash_key(self, info):
+        key = self._hash_keys.get(info)
+        if key is None:
+            with self._master_lock:
+                root = self._hash_keys.get(None)
+                if root is None:
+                    root = self._hash_keys[None] = self._derive_key(HASH_KEY_SALT)[0]
+                key = self._hash_keys[info] = self._derive_subkey(root, HASH_KEY_SALT, info)
+        return key
+
+    def keyed_hash(self, data, info=HKDF_INFO_CONTENT_HASH):
+        """HMAC-SHA256 hex digest of data under a passcode-derived key
+
+        Dicts and lists are hashed as canonical JSON, so equal data gives equal
+        digests in every process; changing the passcode changes every digest.
+        """
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return hmac.new(self._hash_key(info), data, hashlib.sha256).hexdigest()
+
+    def key_cache_info(self):
+        """Return derived-key cache statistics"""
+        with self._key_cache_lock:
+            size = len(self._key_cache)
+        return {
+            "hits": self.key_cache_hits,
+            "misses": self.key_cache_misses,
+            "size": size,
+            "max_size": self.key_cache_size
+        }
+
+    def clear_key_cache(self):
+        """Drop all cached derived keys"""
+        with self._key_cache_lock:
+            self._key_cache.clear()
+
+    def _seal(self, aesgcm, nonce, plaintext, aad=None):
+        start = time.perf_counter()
+        ciphertext = aesgcm.encrypt(nonce, plaintext, aad)
+        _ENCRYPT_SECONDS.observe(time.perf_counter() - start)
+        _ENCRYPT_BYTES.inc(len(plaintext))
+        return ciphertext
+
+    def _open(self, aesgcm, nonce, ciphertext, aad=None):
+        start = time.perf_counter()
+        plaintext = aesgcm.decrypt(nonce, ciphertext, aad)
+        _DECRYPT_SECONDS.observe(time.perf_counter() - start)
+        _DECRYPT_BYTES.inc(len(plaintext))
+        return plaintext
+
+    def _compress(self, plaintext):
+        """Return (codec, payload); codec 0 means the plaintext is stored as is"""
+        if not self.compression_codec:
+            return 0, plaintext
+        if len(plaintext) < self.compression_min_bytes:
+            COMPRESSION_STATS.record('skipped_small')
+            return 0, plaintext
+
+        if self.compression_codec == CODEC_ZSTD:
+            compressed = zstandard.ZstdCompressor(level=3).compress(plaintext)
+        else:
+            compressed = zlib.compress(plaintext, 6)
+        if len(compressed) >= len(plaintext):
+            COMPRESSION_STATS.record('skipped_incompressible')
+            return 0, plaintext
+
+        COMPRESSION_STATS.record('compressed', len(plaintext), len(compressed))
+        _COMPRESSION_IN.inc(len(plaintext))
+        _COMPRESSION_OUT.inc(len(compressed))
+        return self.compression_codec, compressed
+
+    def _decompress(self, codec, payload):
+        if codec == CODEC_ZLIB:
+            return zlib.decompress(payload)
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstd envelope requires the zstandard package")
+            return zstandard.ZstdDecompressor().decompress(payload)
+        raise ValueError(f"Unsupported compression codec: {codec}")
+
+    def compression_stats(self):
+        """Return process-wide compression counters and the achieved ratio"""
+        return dict(
+            COMPRESSION_STATS.snapshot(),
+            codec={v: k for k, v in CODECS.items()}.get(self.compression_codec, 'none'),
+            min_bytes=self.compression_min_bytes
+        )
+
+    def encrypt_data(self, plaintext, envelope_version=None):
         """Encrypt data using AES-GCM"""
         if isinstance(plaintext, dict):
             plaintext = json.dumps(plaintext)
         if isinstance(plaintext, str):
             plaintext = plaintext.encode('utf-8')
-            
-        key, salt = self._derive_key()
-        aesgcm = AESGCM(key)
+
+        version = envelope_version or self.envelope_version
         nonce = os.urandom(12)
-        
-        ciphertext = aesgcm.encrypt(nonce, plaintext, None)
-        return base64.b64encode(salt + nonce + ciphertext).decode('utf-8')
-    
-    def decrypt_data(self, encrypted_data):
-        """Decrypt data using AES-GCM"""
-        encrypted_bytes = base64.b64decode(encrypted_data)
-        salt = encrypted_bytes[:16]
-        nonce = encrypted_bytes[16:28]
-        ciphertext = encrypted_bytes[28:]
-        
-        key, _ = self._derive_key(salt)
-        aesgcm = AESGCM(key)
-        
-        plaintext = aesgcm.decrypt(nonce, ciphertext, None)
-        
+
+        if version == 1:
+            key, salt = self._derive_key()
+            ciphertext = self._seal(AESGCM(key), nonce, plaintext)
+            return base64.b64encode(salt + nonce + ciphertext).decode('utf-8')
+
+        master_key, master_salt = self._get_master_key()
+        salt = os.urandom(16)
+        key = self._derive_subkey(master_key, salt)
+        codec, payload = self._compress(plaintext)
+        if codec:
+            header = bytes([codec])
+            ciphertext = self._seal(AESGCM(key), nonce, payload, header)
+            encoded = base64.b64encode(header + master_salt + salt + nonce + ciphertext).decode('utf-8')
+            return ENVELOPE_V3_PREFIX + encoded
+
+        ciphertext = self._seal(AESGCM(key), nonce, plaintext)
+        encoded = base64.b64encode(master_salt + salt + nonce + ciphertext).decode('utf-8')
+        return ENVELOPE_V2_PREFIX + encoded
+
+    def _decrypt_bytes(self, encrypted_data):
+        """Decrypt an envelope and return the raw plaintext bytes"""
+        if encrypted_data.startswith(ENVELOPE_V3_PREFIX):
+            encrypted_bytes = base64.b64decode(encrypted_data[len(ENVELOPE_V3_PREFIX):])
+            header = encrypted_bytes[:1]
+            master_salt = encrypted_bytes[1:17]
+            salt = encrypted_bytes[17:33]
+            nonce = encrypted_bytes[33:45]
+            ciphertext = encrypted_bytes[45:]
+
+            key = self._derive_subkey(self._master_key_for(master_salt), salt)
+            payload = self._open(AESGCM(key), nonce, ciphertext, header)
+            return self._decompress(header[0], payload)
+
+        if encrypted_data.startswith(ENVELOPE_V2_PREFIX):
+            encrypted_bytes = base64.b64decode(encrypted_data[len(ENVELOPE_V2_PREFIX):])
+            master_salt = encrypted_bytes[:16]
+            salt = encrypted_bytes[16:32]
+            nonce = encrypted_bytes[32:44]
+            ciphertext = encrypted_bytes[44:]
+
+            key = self._derive_subkey(self._master_key_for(master_salt), salt)
+        else:
+            encrypted_bytes = base64.b64decode(encrypted_data)
+            salt = encrypted_bytes[:16]
+            nonce = encrypted_bytes[16:28]
+            ciphertext = encrypted_bytes[28:]
+
+            key, _ = self._derive_key(salt)
+
+        return self._open(AESGCM(key), nonce, ciphertext)
+
+    def _decode_plaintext(self, plaintext):
         # Try to parse as JSON, return string if it fails
         try:
             return json.loads(plaintext.decode('utf-8'))
         except:
             return plaintext.decode('utf-8')
-    
-    def encrypt_file(self, input_path, output_path):
-        """Encrypt a file and save to output path"""
-        with open(input_path, 'r') as f:
-            plaintext = f.read()
-        
-        encrypted_data = self.encrypt_data(plaintext)
-        
-        with open(output_path, 'w') as f:
-            f.write(encrypted_data)
-    
-    def decrypt_file(self, input_path):
-        """Decrypt a file and return contents"""
-        with open(input_path, 'r') as f:
-            encrypted_data = f.read()
-        
-        return self.decrypt_data(encrypted_data)
+
+    def decrypt_data(self, encrypted_data):
+        """Decrypt data using AES-GCM"""
+        return self._decode_plaintext(self._decrypt_bytes(encrypted_data))
+
+    def reencrypt(self, encrypted_data, target):
+        """Decrypt an envelope with this encryptor and re-encrypt it with target
+
+        The plaintext bytes are carried over unchanged, so values that
+        decrypt_data would parse (JSON, numbers) round-trip exactly.
+        """
+        return target.encrypt_data(self._decrypt_bytes(encrypted_data))
+
+    def _stream_nonce(self, nonce_prefix, counter, last):
+        if counter >= MAX_SEGMENTS:
+            raise ValueError("Stream too long for segment counter")
+        return nonce_prefix + struct.pack('>IB', counter, 1 if last else 0)
+
+    def encrypt_stream(self, chunks, segment_size=DEFAULT_SEGMENT_SIZE):
+        """Encrypt an iterable of plaintext byte chunks, yielding the encrypted stream"""
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            raise ValueError(f"segment_size must be between 1 and {MAX_SEGMENT_SIZE}")
+
+        master_key, master_salt = self._get_master_key()
+        salt = os.urandom(16)
+        nonce_prefix = os.urandom(7)
+        header = (STREAM_MAGIC + struct.pack('>BI', STREAM_VERSION, segment_size)
+                  + master_salt + salt + nonce_prefix)
+        aesgcm = AESGCM(self._derive_subkey(master_key, salt, HKDF_INFO_STREAM))
+
+        yield header
+
+        buffer = bytearray()
+        counter = 0
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            buffer += chunk
+            # Hold back at least one byte so the final segment is never skipped
+            while len(buffer) > segment_size:
+                segment = bytes(buffer[:segment_size])
+                del buffer[:segment_size]
+                yield self._seal(aesgcm, self._stream_nonce(nonce_prefix, counter, False), segment, header)
+                counter += 1
+
+        yield self._seal(aesgcm, self._stream_nonce(nonce_prefix, counter, True), bytes(buffer), header)
+
+    def decrypt_stream(self, chunks):
+        """Decrypt an iterable of encrypted byte chunks, yielding plaintext segments"""
+        buffer = bytearray()
+        chunks = iter(chunks)
+
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= STREAM_HEADER_LEN:
+                break
+        if len(buffer) < STREAM_HEADER_LEN or bytes(buffer[:4]) != STREAM_MAGIC:
+            raise ValueError("Not an encrypted stream")
+
+        header = bytes(buffer[:STREAM_HEADER_LEN])
+        del buffer[:STREAM_HEADER_LEN]
+        version, segment_size = struct.unpack('>BI', header[4:9])
+        if version != STREAM_VERSION:
+            raise ValueError(f"Unsupported stream version: {version}")
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            raise ValueError(f"Invalid stream segment size: {segment_size}")
+        master_salt = header[9:25]
+        salt = header[25:41]
+        nonce_prefix = header[41:48]
+
+        key = self._derive_subkey(self._master_key_for(master_salt), salt, HKDF_INFO_STREAM)
+        aesgcm = AESGCM(key)
+        encrypted_segment_size = segment_size + GCM_TAG_LEN
+
+        counter = 0
+        for chunk in chunks:
+            buffer += chunk
+            # A full segment is only known to be non-final once more data follows it
+            while len(buffer) > encrypted_segment_size:
+                segment = bytes(buffer[:encrypted_segment_size])
+                del buffer[:encrypted_segment_size]
+                yield self._open(aesgcm, self._stream_nonce(nonce_prefix, counter, False), segment, header)
+                counter += 1
+
+        yield self._open(aesgcm, self._stream_nonce(nonce_prefix, counter, True), bytes(buffer), header)
+
+    def _read_chunks(self, f, size=DEFAULT_SEGMENT_SIZE):
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def _write_atomic(self, output_path, blocks):
+        """Write blocks to a temp file and move it into place only on success"""
+        tmp_path = f'{output_path}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                for block in blocks:
+                    f.write(block)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def is_stream_file(self, path):
+        """Return True if the file uses the streaming segment format"""
+        with open(path, 'rb') as f:
+            return f.read(len(STREAM_MAGIC)) == STREAM_MAGIC
+
+    def encrypt_file(self, input_path, output_path, segment_size=DEFAULT_SEGMENT_SIZE):
+        """Encrypt a file and save to output path using the streaming format"""
+        with open(input_path, 'rb') as src:
+            self._write_atomic(
+                output_path,
+                self.encrypt_stream(self._read_chunks(src, segment_size), segment_size)
+            )
+
+    def decrypt_file(self, input_path, output_path=None):
+        """Decrypt a file and return contents, or stream them to output_path"""
+        if not self.is_stream_file(input_path):
+            # Legacy single-envelope text file
+            with open(input_path, 'r') as f:
+                encrypted_data = f.read()
+            if output_path is None:
+                return self.decrypt_data(encrypted_data)
+            self._write_atomic(output_path, [self._decrypt_bytes(encrypted_data)])
+            return None
+
+        with open(input_path, 'rb') as src:
+            plaintext = self.decrypt_stream(self._read_chunks(src))
+            if output_path is None:
+                return self._decode_plaintext(b''.join(plaintext))
+            self._write_atomic(output_path, plaintext)
+        return None
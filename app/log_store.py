@@ -0,0 +1,446 @@
+import os
+import json
+import time
+import zlib
+import fcntl
+import struct
+import threading
+
+from .storage import StorageBackend, _envelope_to_blob, _blob_to_envelope
+
+# Segment file layout:
+#   record* [footer trailer]
+#   record  = crc32[4] + seq[8] + timestamp[8] + kind[1] + key_len[2]
+#             + type_len[1] + value_len[4] + key + data_type + value
+#             crc32 covers everything after itself; kind 0 is a delete
+#             tombstone, 1/2/3 is a v1/v2/v3 envelope whose raw bytes are
+#             the value
+#   footer  = JSON {key: [seq, offset, length, kind]} for the last record of
+#             each key in the segment
+#   trailer = footer_len[8] + crc32(footer)[4] + FOOTER_MAGIC[8]
+# A segment with a trailer is sealed and never written again. Only unsealed
+# segments are scanned record by record at startup; a torn record at the
+# tail is truncated away. The highest seq for a key wins, so compacted
+# segments may carry any file number.
+RECORD_HEADER = struct.Struct('>IQdBHBI')
+TRAILER = struct.Struct('>QI8s')
+FOOTER_MAGIC = b'LOGFOOT1'
+KIND_TOMBSTONE = 0
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+COMPACT_SUFFIX = '.compact'
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_COMPACT_RATIO = 0.5
+DEFAULT_COMPACT_INTERVAL = 60.0
+
+
+def _segment_name(segment_id):
+    return f'{SEGMENT_PREFIX}{segment_id:08d}{SEGMENT_SUFFIX}'
+
+
+def _encode_record(seq, timestamp, kind, key, data_type, value):
+    key_bytes = key.encode('utf-8')
+    type_bytes = data_type.encode('utf-8')
+    body = RECORD_HEADER.pack(0, seq, timestamp, kind, len(key_bytes), len(type_bytes), len(value))[4:]
+    body += key_bytes + type_bytes + value
+    return struct.pack('>I', zlib.crc32(body)) + body
+
+
+def _record_length(data, offset=0):
+    """Length of the record starting at offset, or None if its header is incomplete"""
+    if len(data) - offset < RECORD_HEADER.size:
+        return None
+    _, _, _, _, key_len, type_len, value_len = RECORD_HEADER.unpack_from(data, offset)
+    return RECORD_HEADER.size + key_len + type_len + value_len
+
+
+def _decode_record(data):
+    """Return (seq, timestamp, kind, key, data_type, value), or None if torn or corrupt"""
+    length = _record_length(data)
+    if length is None or len(data) < length:
+        return None
+    crc, seq, timestamp, kind, key_len, type_len, _ = RECORD_HEADER.unpack_from(data)
+    if zlib.crc32(data[4:length]) != crc:
+        return None
+    key_end = RECORD_HEADER.size + key_len
+    type_end = key_end + type_len
+    return (
+        seq, timestamp, kind,
+        data[RECORD_HEADER.size:key_end].decode('utf-8'),
+        data[key_end:type_end].decode('utf-8'),
+        bytes(data[type_end:length])
+    )
+
+
+def _write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Segment:
+    def __init__(self, segment_id, path):
+        self.id = segment_id
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.size = os.fstat(self.fd).st_size
+        self.live_bytes = 0
+
+    def read(self, offset, length):
+        return os.pread(self.fd, length, offset)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LogStructuredBackend(StorageBackend):
+    """Append-only segment files with an in-memory key -> location index
+
+    Every store or delete is one sequential append to the active segment and
+    a read is one dict lookup plus one pread. Segments roll over at
+    segment_bytes and are sealed with a footer indexing their records, so
+    startup reads footers instead of whole files. A background thread
+    rewrites the sealed segments once more than compact_ratio of their bytes
+    are dead (overwritten, deleted or tombstones).
+
+    One process owns a log directory at a time (an flock on LOCK): run
+    gunicorn with one worker and several threads, or use the SQLite backend
+    when several worker processes must share the data.
+    """
+
+    def __init__(self, log_dir, segment_bytes=None, sync=None, compact_ratio=None,
+                 compact_interval=None, start_compactor=True):
+        self.log_dir = log_dir
+        self.segment_bytes = segment_bytes or int(os.environ.get('SITE_LOG_SEGMENT_BYTES', DEFAULT_SEGMENT_BYTES))
+        if sync is None:
+            sync = os.environ.get('SITE_LOG_FSYNC', '').lower() in ('1', 'true', 'yes')
+        self.sync = sync
+        if compact_ratio is None:
+            compact_ratio = float(os.environ.get('SITE_LOG_COMPACT_RATIO', DEFAULT_COMPACT_RATIO))
+        self.compact_ratio = compact_ratio
+        if compact_interval is None:
+            compact_interval = float(os.environ.get('SITE_LOG_COMPACT_INTERVAL', DEFAULT_COMPACT_INTERVAL))
+        self.compact_interval = compact_interval
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._lock_file = open(os.path.join(self.log_dir, 'LOCK'), 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            raise RuntimeError(f"Log store {self.log_dir} is in use by another process")
+
+        # key -> (seq, segment_id, offset, length) of its newest live record
+        self._index = {}
+        self._segments = {}
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._seq = 0
+        self._next_segment_id = 1
+        self._active = None
+        self._active_fd = None
+        # key -> (seq, offset, length, kind) in the active segment, for its footer
+        self._active_entries = {}
+        # Segments replaced by a compaction; closed by the next one so
+        # in-flight reads never see a closed descriptor
+        self._retired = []
+        self.compactions = 0
+
+        self._load()
+
+        self._stopping = threading.Event()
+        self._compactor = None
+        if start_compactor and self.compact_interval > 0:
+            self._compactor = threading.Thread(target=self._compact_loop, name='log-compactor', daemon=True)
+            self._compactor.start()
+
+    # Startup
+
+    def _load(self):
+        segment_ids = []
+        for name in os.listdir(self.log_dir):
+            if name.endswith(COMPACT_SUFFIX):
+                # Unfinished compaction output from a crash
+                os.remove(os.path.join(self.log_dir, name))
+            elif name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                segment_ids.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+
+        tombstones = {}
+        unsealed = []
+        for segment_id in sorted(segment_ids):
+            segment = _Segment(segment_id, os.path.join(self.log_dir, _segment_name(segment_id)))
+            self._segments[segment_id] = segment
+            self._next_segment_id = max(self._next_segment_id, segment_id + 1)
+            entries = self._read_footer(segment)
+            if entries is None:
+                entries = self._scan(segment)
+                unsealed.append((segment, entries))
+            for key, (seq, offset, length, kind) in entries.items():
+                self._load_entry(tombstones, key, seq, segment_id, offset, length, kind)
+
+        for _, segment_id, _, length in self._index.values():
+            self._segments[segment_id].live_bytes += length
+
+        # Keep appending to the newest unsealed segment; seal any older ones
+        for segment, entries in unsealed[:-1]:
+            self._write_footer(segment.path, entries)
+            segment.size = os.path.getsize(segment.path)
+        if unsealed:
+            segment, entries = unsealed[-1]
+            self._active = segment
+            self._active_entries = entries
+            self._active_fd = os.open(segment.path, os.O_WRONLY | os.O_APPEND)
+        else:
+            self._roll_segment()
+
+    def _load_entry(self, tombstones, key, seq, segment_id, offset, length, kind):
+        """Index a record found at startup if nothing newer for its key was seen"""
+        self._seq = max(self._seq, seq)
+        current = self._index.get(key)
+        newest = max(current[0] if current else -1, tombstones.get(key, -1))
+        if seq <= newest:
+            return
+        if kind == KIND_TOMBSTONE:
+            self._index.pop(key, None)
+            tombstones[key] = seq
+        else:
+            self._index[key] = (seq, segment_id, offset, length)
+
+    def _read_footer(self, segment):
+        """Return a sealed segment's entries, or None if it has no valid footer"""
+        if segment.size < TRAILER.size:
+            return None
+        footer_len, crc, magic = TRAILER.unpack(segment.read(segment.size - TRAILER.size, TRAILER.size))
+        if magic != FOOTER_MAGIC or footer_len > segment.size - TRAILER.size:
+            return None
+        footer = segment.read(segment.size - TRAILER.size - footer_len, footer_len)
+        if zlib.crc32(footer) != crc:
+            return None
+        return {key: tuple(entry) for key, entry in json.loads(footer).items()}
+
+    def _scan(self, segment):
+        """Read an unsealed segment record by record, truncating a torn tail"""
+        entries = {}
+        data = segment.read(0, segment.size)
+        offset = 0
+        while offset < len(data):
+            length = _record_length(data, offset)
+            decoded = _decode_record(data[offset:offset + length]) if length else None
+            if decoded is None:
+                print(f"⚠️  Truncating {len(data) - offset} torn bytes from {segment.path}")
+                os.truncate(segment.path, offset)
+                break
+            seq, _, kind, key, _, _ = decoded
+            entries[key] = (seq, offset, length, kind)
+            offset += length
+        segment.size = offset
+        return entries
+
+    # Segment files
+
+    def _write_footer(self, path, entries):
+        footer = json.dumps(entries, separators=(',', ':')).encode('utf-8')
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+        try:
+            _write_all(fd, footer + TRAILER.pack(len(footer), zlib.crc32(footer), FOOTER_MAGIC))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _new_segment_id(self):
+        segment_id = self._next_segment_id
+        self._next_segment_id += 1
+        return segment_id
+
+    def _roll_segment(self):
+        """Seal the active segment and start a new one; caller holds self._lock"""
+        if self._active is not None:
+            os.close(self._active_fd)
+            self._write_footer(self._active.path, self._active_entries)
+            self._active.size = os.path.getsize(self._active.path)
+
+        segment_id = self._new_segment_id()
+        path = os.path.join(self.log_dir, _segment_name(segment_id))
+        self._active_fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        self._active = _Segment(segment_id, path)
+        self._segments[self._active.id] = self._active
+        self._active_entries = {}
+        _fsync_dir(self.log_dir)
+
+    def _append(self, key, kind, data_type, value):
+        """Append one record and point the index at it"""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            record = _encode_record(seq, time.time(), kind, key, data_type, value)
+            if self._active.size and self._active.size + len(record) > self.segment_bytes:
+                self._roll_segment()
+
+            offset = self._active.size
+            _write_all(self._active_fd, record)
+            if self.sync:
+                os.fsync(self._active_fd)
+            self._active.size += len(record)
+            self._active_entries[key] = (seq, offset, len(record), kind)
+
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._segments[previous[1]].live_bytes -= previous[3]
+            if kind != KIND_TOMBSTONE:
+                self._index[key] = (seq, self._active.id, offset, len(record))
+                self._active.live_bytes += len(record)
+            return previous is not None
+
+    # StorageBackend
+
+    def put(self, data_id, encrypted_data, data_type='content', timestamp=None):
+        version, blob = _envelope_to_blob(encrypted_data)
+        self._append(data_id, version, data_type or 'content', blob)
+
+    def get(self, data_id):
+        record = self.get_record(data_id)
+        return None if record is None else record[0]
+
+    def get_record(self, data_id):
+        with self._lock:
+            entry = self._index.get(data_id)
+            if entry is None:
+                return None
+            segment = self._segments[entry[1]]
+        record = _decode_record(segment.read(entry[2], entry[3]))
+        if record is None:
+            raise ValueError(f"Corrupt log record for '{data_id}' in {segment.path}")
+        return _blob_to_envelope(record[2], record[5]), record[4]
+
+    def delete(self, data_id):
+        with self._lock:
+            if data_id not in self._index:
+                return False
+            return self._append(data_id, KIND_TOMBSTONE, '', b'')
+
+    def list_ids(self):
+        with self._lock:
+            return list(self._index)
+
+    def location(self, data_id):
+        return f'log:{data_id}'
+
+    def stats(self):
+        """Return segment, size and compaction counters"""
+        with self._lock:
+            sealed = [s for s in self._segments.values() if s is not self._active]
+            return {
+                "keys": len(self._index),
+                "segments": len(self._segments),
+                "bytes": sum(s.size for s in self._segments.values()),
+                "live_bytes": sum(s.live_bytes for s in self._segments.values()),
+                "sealed_bytes": sum(s.size for s in sealed),
+                "sealed_live_bytes": sum(s.live_bytes for s in sealed),
+                "compactions": self.compactions
+            }
+
+    def close(self):
+        self._stopping.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            if self._active_fd is not None:
+                if self.sync:
+                    os.fsync(self._active_fd)
+                os.close(self._active_fd)
+                self._active_fd = None
+            for segment in list(self._segments.values()) + self._retired:
+                segment.close()
+            self._segments = {}
+            self._retired = []
+        self._lock_file.close()
+
+    # Compaction
+
+    def garbage_ratio(self):
+        """Fraction of sealed segment bytes that no longer back a live key"""
+        stats = self.stats()
+        if not stats["sealed_bytes"]:
+            return 0.0
+        return 1.0 - stats["sealed_live_bytes"] / stats["sealed_bytes"]
+
+    def _compact_loop(self):
+        while not self._stopping.wait(self.compact_interval):
+            try:
+                if self.garbage_ratio() > self.compact_ratio:
+                    self.compact()
+            except Exception as e:
+                print(f"❌ Log compaction failed: {e}")
+
+    def compact(self):
+        """Rewrite all sealed segments, keeping only live records
+
+        Reads and writes continue during the copy; only the final index
+        swap takes the lock. Returns the number of records kept.
+        """
+        with self._compact_lock:
+            with self._lock:
+                sources = {s.id: s for s in self._segments.values() if s is not self._active}
+                if not sources:
+                    return 0
+                live = sorted(
+                    (entry[1], entry[2], key, entry)
+                    for key, entry in self._index.items() if entry[1] in sources
+                )
+
+            outputs = []
+            fd = None
+            for segment_id, offset, key, (seq, _, _, length) in live:
+                data = sources[segment_id].read(offset, length)
+                record = _decode_record(data)
+                if record is None:
+                    raise ValueError(f"Corrupt log record for '{key}' in {sources[segment_id].path}")
+                if fd is None or outputs[-1][2] + length > self.segment_bytes:
+                    if fd is not None:
+                        os.close(fd)
+                    with self._lock:
+                        output_id = self._new_segment_id()
+                    path = os.path.join(self.log_dir, _segment_name(output_id) + COMPACT_SUFFIX)
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    outputs.append([output_id, path, 0, {}])
+                output = outputs[-1]
+                _write_all(fd, data)
+                output[3][key] = (seq, output[2], length, record[2])
+                output[2] += length
+            if fd is not None:
+                os.close(fd)
+
+            for output_id, path, _, entries in outputs:
+                self._write_footer(path, entries)
+                os.rename(path, path[:-len(COMPACT_SUFFIX)])
+            _fsync_dir(self.log_dir)
+
+            with self._lock:
+                for output_id, path, _, entries in outputs:
+                    segment = _Segment(output_id, path[:-len(COMPACT_SUFFIX)])
+                    self._segments[output_id] = segment
+                    for key, (seq, offset, length, _) in entries.items():
+                        current = self._index.get(key)
+                        # Skip keys rewritten or deleted while we were copying
+                        if current is not None and current[0] == seq and current[1] in sources:
+                            self._index[key] = (seq, output_id, offset, length)
+                            segment.live_bytes += length
+                for segment_id in sources:
+                    del self._segments[segment_id]
+                retired, self._retired = self._retired, list(sources.values())
+                self.compactions += 1
+
+            for segment in retired:
+                segment.close()
+            for segment in sources.values():
+                os.remove(segment.path)
+            return len(live)
@@ -0,0 +1,264 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Seconds; spans AES-GCM on small values up to PBKDF2 and slow Airtable calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall time spent in a with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count)"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """Return the child series for one set of label values"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        for values, child in self._items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        labels = _format_labels(self.labelnames, values)
+        return [f"{self.name}{labels} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, values, child):
+        cumulative, total, count = child.snapshot()
+        lines = []
+        for bound, running in zip(self.buckets + (float('inf'),), cumulative):
+            labels = _format_labels(self.labelnames, values, ('le', _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {running}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Create (or return the existing) counter"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Create (or return the existing) histogram"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Encryption
+ENCRYPTION_KDF_SECONDS = REGISTRY.histogram(
+    'encryption_kdf_seconds', 'Time spent deriving keys', ['kdf']
+)
+ENCRYPTION_AEAD_SECONDS = REGISTRY.histogram(
+    'encryption_aead_seconds', 'Time spent in AES-GCM', ['operation']
+)
+ENCRYPTION_BYTES = REGISTRY.counter(
+    'encryption_bytes_total', 'Plaintext bytes encrypted or decrypted', ['operation']
+)
+ENCRYPTION_COMPRESSION_BYTES = REGISTRY.counter(
+    'encryption_compression_bytes_total', 'Bytes before (in) and after (out) compress-then-encrypt', ['stage']
+)
+CRYPTO_POOL_WAIT_SECONDS = REGISTRY.histogram(
+    'crypto_pool_wait_seconds', 'Time crypto work waited for a pool worker'
+)
+CRYPTO_POOL_REJECTED = REGISTRY.counter(
+    'crypto_pool_rejected_total', 'Crypto work turned away because the pool queue was full'
+)
+
+# Reads of one key that joined a fetch+decrypt already in flight
+READS_COALESCED = REGISTRY.counter(
+    'reads_coalesced_total', 'Concurrent reads served by another caller\'s in-flight fetch', ['source']
+)
+
+# Local site data files
+SITE_IO_SECONDS = REGISTRY.histogram(
+    'site_manager_io_seconds', 'Time spent on site data file I/O', ['operation']
+)
+
+# Airtable
+AIRTABLE_REQUEST_SECONDS = REGISTRY.histogram(
+    'airtable_request_seconds', 'Airtable call latency, including retries', ['operation']
+)
+AIRTABLE_ERRORS = REGISTRY.counter(
+    'airtable_errors_total', 'Airtable calls that raised', ['operation']
+)
+AIRTABLE_RATE_LIMITED = REGISTRY.counter(
+    'airtable_rate_limited_total', 'HTTP 429 responses from Airtable'
+)
+AIRTABLE_RETRIES = REGISTRY.counter(
+    'airtable_retries_total', 'Airtable requests retried: after a 429 (sync client) or a 429 or 5xx (async client)'
+)
+WRITE_BEHIND_FAILURES = REGISTRY.counter(
+    'write_behind_failures_total', 'Failed write-behind batch attempts'
+)
+WRITE_BEHIND_DEAD_LETTERED = REGISTRY.counter(
+    'write_behind_dead_lettered_total', 'Write-behind ops given up on and moved to the dead-letter journal'
+)
+
+# Tiered storage: local ciphertext tier in front of Airtable
+TIERED_READS = REGISTRY.counter(
+    'tiered_reads_total', 'Tiered reads by outcome (fresh/stale local copy, or miss to Airtable)', ['result']
+)
+TIERED_REFRESHES = REGISTRY.counter(
+    'tiered_refreshes_total', 'Local tier refreshes from Airtable by outcome', ['result']
+)
+
+# HTTP API
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', 'Flask request latency by route', ['method', 'route', 'status']
+)
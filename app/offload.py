@@ -0,0 +1,148 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .encryption import DataEncryptor
+from .metrics import CRYPTO_POOL_WAIT_SECONDS, CRYPTO_POOL_REJECTED
+
+DEFAULT_QUEUE_PER_WORKER = 8
+DEFAULT_RETRY_AFTER = 1
+
+# Per-process encryptor used by the process pool workers
+_worker_encryptor = None
+
+
+def _init_worker():
+    global _worker_encryptor
+    _worker_encryptor = DataEncryptor()
+
+
+def _worker_call(method, args):
+    return getattr(_worker_encryptor, method)(*args)
+
+
+class PoolFull(Exception):
+    """Raised instead of queueing when the crypto pool is at capacity"""
+
+    def __init__(self, retry_after):
+        super().__init__("Crypto pool is full")
+        self.retry_after = retry_after
+
+
+class CryptoPool:
+    """Bounded pool that runs DataEncryptor work off the request threads
+
+    At most max_workers operations run at once and max_queue more may wait;
+    past that, submit raises PoolFull straight away so the caller can shed
+    load (the routes answer 503 with Retry-After) instead of piling up
+    requests behind PBKDF2. encrypt_data/decrypt_data block the calling
+    thread until the result is ready, so the pool can stand in for an
+    encryptor; asyncio code awaits run() instead.
+    """
+
+    def __init__(self, encryptor=None, max_workers=None, executor=None, max_queue=None, retry_after=None):
+        self.encryptor = encryptor or DataEncryptor()
+        self.max_workers = max_workers or int(os.environ.get('CRYPTO_POOL_WORKERS', os.cpu_count() or 1))
+        self.executor_type = executor or os.environ.get('CRYPTO_POOL_EXECUTOR', 'thread')
+        if max_queue is None:
+            max_queue = int(os.environ.get('CRYPTO_POOL_MAX_QUEUE', self.max_workers * DEFAULT_QUEUE_PER_WORKER))
+        self.max_queue = max_queue
+        if retry_after is None:
+            retry_after = int(os.environ.get('CRYPTO_POOL_RETRY_AFTER', DEFAULT_RETRY_AFTER))
+        self.retry_after = retry_after
+
+        if self.executor_type not in ('thread', 'process'):
+            raise ValueError(f"Unsupported crypto pool executor: {self.executor_type}")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_pool(self):
+        """Create the worker pool on first use"""
+        with self._pool_lock:
+            if self._pool is not None:
+                return self._pool
+            if self.executor_type == 'process':
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='crypto-pool'
+                )
+        return self._pool
+
+    def _finished(self, future):
+        self._slots.release()
+        with self._stats_lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def submit(self, method, *args):
+        """Schedule one encryptor method call and return its future
+
+        Raises PoolFull without waiting when every worker is busy and the
+        queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            CRYPTO_POOL_REJECTED.inc()
+            raise PoolFull(self.retry_after)
+        with self._stats_lock:
+            self.in_flight += 1
+
+        queued = time.perf_counter()
+        try:
+            if self.executor_type == 'process':
+                future = self._get_pool().submit(_worker_call, method, args)
+            else:
+                # Queue wait is only visible in-process, so threads only
+                def call():
+                    CRYPTO_POOL_WAIT_SECONDS.observe(time.perf_counter() - queued)
+                    return getattr(self.encryptor, method)(*args)
+                future = self._get_pool().submit(call)
+        except BaseException:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def call(self, method, *args):
+        """Run one encryptor method on the pool and wait for its result"""
+        return self.submit(method, *args).result()
+
+    async def run(self, method, *args):
+        """Await one encryptor method on the pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(method, *args))
+
+    def encrypt_data(self, plaintext, envelope_version=None):
+        return self.call('encrypt_data', plaintext, envelope_version)
+
+    def decrypt_data(self, encrypted_data):
+        return self.call('decrypt_data', encrypted_data)
+
+    def stats(self):
+        """Return current load and admission counters"""
+        with self._stats_lock:
+            return {
+                "executor": self.executor_type,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
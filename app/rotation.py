@@ -0,0 +1,251 @@
+import os
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .encryption import DataEncryptor
+from .airtable_manager import AIRTABLE_BATCH_SIZE, _airtable_call, _timed_pages
+
+DEFAULT_BATCH_SIZE = 100
+# Batches being re-encrypted while the oldest one is written
+MAX_BATCHES_IN_FLIGHT = 2
+
+# Checkpoint target under which finished blind-index rebuilds are logged
+BLIND_INDEX_STEP = 'blind_index'
+
+# Per-process (old, new) encryptors used by the process pool workers
+_worker_pair = None
+
+
+def _init_worker(old_passcode, new_passcode):
+    global _worker_pair
+    _worker_pair = (DataEncryptor(passcode=old_passcode), DataEncryptor(passcode=new_passcode))
+
+
+def _rotate_envelope(pair, envelope):
+    """Return ('rotated', new envelope), ('current', envelope) or ('error', message)"""
+    old, new = pair
+    try:
+        return 'rotated', old.reencrypt(envelope, new)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+    # A resumed run can meet records it wrote but never checkpointed
+    try:
+        new.decrypt_data(envelope)
+    except Exception:
+        return 'error', f"Neither passcode decrypts this record ({error})"
+    return 'current', envelope
+
+
+def _worker_rotate(envelope):
+    return _rotate_envelope(_worker_pair, envelope)
+
+
+class SiteRotationTarget:
+    """Records held by a SiteManager's storage backend"""
+
+    name = 'site'
+
+    def __init__(self, site_manager):
+        self.site_manager = site_manager
+        self.backend = site_manager.backend
+
+    def iter_records(self):
+        """Yield (id, envelope, data_type) for every stored record"""
+        for data_id in sorted(self.backend.list_ids()):
+            record = self.backend.get_record(data_id)
+            if record is not None:
+                yield data_id, record[0], record[1]
+
+    def write(self, records):
+        """Store re-encrypted (id, envelope, data_type) records"""
+        self.backend.put_many([(data_id, envelope, data_type, None) for data_id, envelope, data_type in records])
+        for data_id, _, _ in records:
+            self.site_manager._written(data_id)
+
+
+class AirtableRotationTarget:
+    """encrypted_value of every record in an AirtableManager's table"""
+
+    name = 'airtable'
+
+    def __init__(self, manager):
+        self.manager = manager
+        if manager.write_queue is not None:
+            # Queued writes were encrypted with the old passcode
+            manager.flush_writes()
+
+    def iter_records(self):
+        """Yield (key, envelope, record id) for every record"""
+        pages = self.manager.table.iterate(fields=['key', 'encrypted_value'])  # ← USES pyairtable
+        for page in _timed_pages('list', pages):
+            for record in page:
+                fields = record['fields']
+                if 'key' in fields and 'encrypted_value' in fields:
+                    yield fields['key'], fields['encrypted_value'], record['id']
+
+    def write(self, records):
+        """Update encrypted_value in place, 10 records per request"""
+        for i in range(0, len(records), AIRTABLE_BATCH_SIZE):
+            chunk = records[i:i + AIRTABLE_BATCH_SIZE]
+            with _airtable_call('batch_update'):
+                self.manager.table.batch_update([  # ← USES pyairtable
+                    {'id': record_id, 'fields': {'encrypted_value': envelope}}
+                    for _, envelope, record_id in chunk
+                ])
+            for key, _, _ in chunk:
+                self.manager._invalidate(key)
+
+
+class RotationCheckpoint:
+    """Append-only log of (target, id) pairs whose rotation is durable
+
+    One JSON line per finished record, fsynced after every batch, so a
+    killed run loses at most the batch it was writing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        target, data_id = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a killed run
+                        continue
+                    self.done.add((target, data_id))
+
+    def __contains__(self, item):
+        return item in self.done
+
+    def record(self, target, ids):
+        self.done.update((target, data_id) for data_id in ids)
+        if not self.path or not ids:
+            return
+        with open(self.path, 'a') as f:
+            for data_id in ids:
+                f.write(json.dumps([target, data_id]) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def rebuild_blind_index(name, manager, checkpoint_path=None):
+    """Recompute manager's blind-index tokens once rotation has finished
+
+    Tokens are keyed by the passcode, so manager must already use the new
+    one. The rebuild is logged as (BLIND_INDEX_STEP, name) and skipped when
+    the checkpoint has it. Returns the number of records, or None if skipped.
+    """
+    checkpoint = RotationCheckpoint(checkpoint_path)
+    if (BLIND_INDEX_STEP, name) in checkpoint:
+        return None
+    count = manager.rebuild_blind_index() if manager.blind_index.fields else 0
+    checkpoint.record(BLIND_INDEX_STEP, [name])
+    return count
+
+
+class KeyRotation:
+    """Re-encrypt stored records from an old passcode to a new one
+
+    Records are read in batches and re-encrypted on a worker pool while the
+    previous batch is written back, so reads, crypto and writes overlap.
+    With a checkpoint path, finished records are logged and skipped when
+    the job is run again. Records already under the new passcode are left
+    alone; records neither passcode opens are reported, not written.
+    """
+
+    def __init__(self, old_passcode, new_passcode, max_workers=None, executor=None, batch_size=None):
+        if not old_passcode or not new_passcode:
+            raise ValueError("Both the old and the new passcode are required")
+        if old_passcode == new_passcode:
+            raise ValueError("The new passcode must differ from the old one")
+        self.old_passcode = old_passcode
+        self.new_passcode = new_passcode
+        self.max_workers = max_workers or int(os.environ.get('ROTATION_WORKERS', os.cpu_count() or 1))
+        self.executor_type = executor or os.environ.get('ROTATION_EXECUTOR', 'process')
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        if self.executor_type not in ('thread', 'process'):
+            raise ValueError(f"Unsupported rotation executor: {self.executor_type}")
+        self._pool = None
+        self._pair = None
+
+    def _get_pool(self):
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            if self.executor_type == 'process':
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self.old_passcode, self.new_passcode)
+                )
+            else:
+                self._pair = (DataEncryptor(passcode=self.old_passcode), DataEncryptor(passcode=self.new_passcode))
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='key-rotation'
+                )
+        return self._pool
+
+    def _submit(self, envelopes):
+        pool = self._get_pool()
+        if self.executor_type == 'process':
+            chunksize = max(1, len(envelopes) // (self.max_workers * 4))
+            return pool.map(_worker_rotate, envelopes, chunksize=chunksize)
+        return pool.map(lambda envelope: _rotate_envelope(self._pair, envelope), envelopes)
+
+    def run(self, target, checkpoint_path=None, progress=None):
+        """Rotate every record of target; returns counts and per-id errors
+
+        progress, if given, is called with the running summary after each
+        batch is written.
+        """
+        checkpoint = RotationCheckpoint(checkpoint_path)
+        summary = {"target": target.name, "rotated": 0, "already_current": 0, "skipped": 0, "errors": {}}
+        in_flight = deque()
+
+        def finish(batch, results):
+            written = []
+            finished = []
+            for (data_id, _, extra), (status, value) in zip(batch, results):
+                if status == 'error':
+                    summary["errors"][data_id] = value
+                    continue
+                finished.append(data_id)
+                if status == 'rotated':
+                    written.append((data_id, value, extra))
+                else:
+                    summary["already_current"] += 1
+            if written:
+                target.write(written)
+            summary["rotated"] += len(written)
+            checkpoint.record(target.name, finished)
+            if progress is not None:
+                progress(summary)
+
+        def flush(limit):
+            while len(in_flight) > limit:
+                batch, results = in_flight.popleft()
+                # Iterating the map result waits for that batch's workers
+                finish(batch, list(results))
+
+        batch = []
+        for record in target.iter_records():
+            if (target.name, record[0]) in checkpoint:
+                summary["skipped"] += 1
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                in_flight.append((batch, self._submit([envelope for _, envelope, _ in batch])))
+                batch = []
+                flush(MAX_BATCHES_IN_FLIGHT - 1)
+        if batch:
+            in_flight.append((batch, self._submit([envelope for _, envelope, _ in batch])))
+        flush(0)
+        return summary
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -1,23 +1,135 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Blueprint, jsonify, request, g, Response, current_app
 from flask_restful import Api, Resource
-from flasgger import Swagger
 import os
+import time
+import functools
+import threading
 
 from .encryption import DataEncryptor
-# REMOVE: from .site_manager import SiteManager
-# ADD:
-from .airtable_manager import AirtableManager
+from .batch import BatchProcessor
+from .offload import CryptoPool, PoolFull
+from .metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUEST_SECONDS
 
-app = Flask(__name__)
-api = Api(app)
-swagger = Swagger(app)
+# app.extensions key holding each app's Services
+EXTENSION = 'site_api'
 
-encryptor = DataEncryptor()
-# REPLACE: site_manager = SiteManager()
-# WITH:
-airtable_manager = AirtableManager()
 
-class EncryptData(Resource):
+def _env_flag(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+class Services:
+    """Backends shared by one app's requests, each built on first use
+
+    Nothing here reads credentials, derives keys or imports pyairtable until
+    a request needs it, so importing the app and booting a worker stay cheap
+    and a missing AIRTABLE_KEY only fails the requests that use Airtable.
+    Instances given in the app config (ENCRYPTOR, BATCH_PROCESSOR,
+    CRYPTO_POOL, AIRTABLE_MANAGER) are used as is.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._built = {}
+        # Reentrant: building one service may build the ones it depends on
+        self._lock = threading.RLock()
+
+    def _get(self, name, factory):
+        service = self._built.get(name)
+        if service is None:
+            with self._lock:
+                service = self._built.get(name)
+                if service is None:
+                    service = self.config.get(name.upper()) or factory()
+                    self._built[name] = service
+        return service
+
+    @property
+    def encryptor(self):
+        return self._get('encryptor', DataEncryptor)
+
+    @property
+    def batch_processor(self):
+        return self._get('batch_processor', lambda: BatchProcessor(self.encryptor))
+
+    @property
+    def crypto_pool(self):
+        # Single-item crypto runs on a bounded pool; once it is saturated
+        # requests get 503 + Retry-After instead of queueing behind the KDF
+        return self._get('crypto_pool', lambda: CryptoPool(self.encryptor))
+
+    @property
+    def airtable_manager(self):
+        return self._get('airtable_manager', self._create_airtable_manager)
+
+    def _create_airtable_manager(self):
+        # pyairtable is the slowest import in the app
+        from .airtable_manager import AirtableManager
+        manager = AirtableManager(crypto=self.crypto_pool)
+        if self.config.get('TIERED_STORAGE'):
+            # Serve reads from a local copy of the ciphertext; see app/tiered.py
+            from .tiered import TieredManager
+            manager = TieredManager(manager)
+        return manager
+
+    def warm(self):
+        """Do the fork-safe startup work now, e.g. in the gunicorn master before --preload forks
+
+        The Airtable manager is only imported, not built: it owns threads,
+        file locks and SQLite connections (write-behind drain, journal lock,
+        tier state) that a forked worker would inherit without the threads,
+        so each worker builds its own on first use.
+        """
+        encryptor = self.encryptor
+        if encryptor.envelope_version != 1:
+            # Forked workers inherit the derived master key
+            encryptor._get_master_key()
+        # Their pools start on first use, after the fork
+        self.batch_processor
+        self.crypto_pool
+        # Importing pyairtable is safe to share, and the slowest part of a cold start
+        from . import airtable_manager
+        if self.config.get('TIERED_STORAGE'):
+            from . import tiered
+
+
+def services():
+    """Services of the app handling the current request"""
+    return current_app.extensions[EXTENSION]
+
+
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def record_request_latency(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Label by route template, not path, so ids don't create new series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.labels(request.method, route, response.status_code).observe(
+            time.perf_counter() - start
+        )
+    return response
+
+def admission_control(method):
+    """Turn a full crypto pool into 503 + Retry-After instead of an error"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except PoolFull as e:
+            return (
+                {"error": "Server is busy; retry shortly."},
+                503,
+                {'Retry-After': str(e.retry_after)}
+            )
+    return wrapper
+
+class CryptoResource(Resource):
+    method_decorators = [admission_control]
+
+class EncryptData(CryptoResource):
     def post(self):
         """
         Encrypt data using AES-GCM
@@ -52,6 +164,8 @@ class EncryptData(Resource):
                                     description: The original data
             400:
                 description: Bad request if data is missing
+            503:
+                description: Crypto pool is full; retry after the Retry-After header
         """
         data = request.json
 
@@ -62,14 +176,14 @@ class EncryptData(Resource):
         if not data_to_encrypt:
             return {"error": "Data field is required."}, 400
         
-        encrypted_data = encryptor.encrypt_data(data_to_encrypt)
+        encrypted_data = services().crypto_pool.encrypt_data(data_to_encrypt)
         
         return {
             "encrypted_data": encrypted_data,
             "original_data": data_to_encrypt
         }, 200
 
-class DecryptData(Resource):
+class DecryptData(CryptoResource):
     def post(self):
         """
         Decrypt data using AES-GCM
@@ -104,6 +218,8 @@ class DecryptData(Resource):
                                     description: The original encrypted data
             400:
                 description: Bad request if encrypted_data is missing
+            503:
+                description: Crypto pool is full; retry after the Retry-After header
         """
         data = request.json
 
@@ -115,16 +231,128 @@ class DecryptData(Resource):
             return {"error": "encrypted_data field is required."}, 400
         
         try:
-            decrypted_data = encryptor.decrypt_data(encrypted_data)
+            decrypted_data = services().crypto_pool.decrypt_data(encrypted_data)
             
             return {
                 "decrypted_data": decrypted_data,
                 "encrypted_data": encrypted_data
             }, 200
+        except PoolFull:
+            raise
         except Exception as e:
             return {"error": f"Decryption failed: {str(e)}"}, 400
 
-class StoreSiteData(Resource):
+class EncryptBatch(Resource):
+    def post(self):
+        """
+        Encrypt a batch of values using AES-GCM
+        ---
+        tags:
+        - Encryption
+        parameters:
+            - in: body
+              name: body
+              required: true
+              schema:
+                id: EncryptBatchRequest
+                required:
+                  - items
+                properties:
+                  items:
+                    type: array
+                    items:
+                      type: string
+                    description: The values to encrypt
+        responses:
+            200:
+                description: One result per item, in request order
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                results:
+                                    type: array
+                                    items:
+                                        type: object
+                                        properties:
+                                            encrypted_data:
+                                                type: string
+                                            error:
+                                                type: string
+            400:
+                description: Bad request if items is missing or too large
+        """
+        data = request.json
+
+        if not data:
+            return {"error": "Request body must be in JSON format."}, 400
+
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return {"error": "items field must be a non-empty array."}, 400
+        batch_processor = services().batch_processor
+        if len(items) > batch_processor.max_items:
+            return {"error": f"items may contain at most {batch_processor.max_items} entries."}, 400
+
+        return {"results": batch_processor.encrypt_many(items)}, 200
+
+class DecryptBatch(Resource):
+    def post(self):
+        """
+        Decrypt a batch of values using AES-GCM
+        ---
+        tags:
+        - Encryption
+        parameters:
+            - in: body
+              name: body
+              required: true
+              schema:
+                id: DecryptBatchRequest
+                required:
+                  - items
+                properties:
+                  items:
+                    type: array
+                    items:
+                      type: string
+                    description: The encrypted values to decrypt
+        responses:
+            200:
+                description: One result per item, in request order
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                results:
+                                    type: array
+                                    items:
+                                        type: object
+                                        properties:
+                                            decrypted_data:
+                                                type: string
+                                            error:
+                                                type: string
+            400:
+                description: Bad request if items is missing or too large
+        """
+        data = request.json
+
+        if not data:
+            return {"error": "Request body must be in JSON format."}, 400
+
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return {"error": "items field must be a non-empty array."}, 400
+        batch_processor = services().batch_processor
+        if len(items) > batch_processor.max_items:
+            return {"error": f"items may contain at most {batch_processor.max_items} entries."}, 400
+
+        return {"results": batch_processor.decrypt_many(items)}, 200
+
+class StoreSiteData(CryptoResource):
     def post(self):
         """
         Store encrypted site data with notes
@@ -166,6 +394,8 @@ class StoreSiteData(Resource):
                                     description: The data ID
             400:
                 description: Bad request if required fields are missing
+            503:
+                description: Crypto pool is full; retry after the Retry-After header
         """
         data = request.json
 
@@ -179,10 +409,97 @@ class StoreSiteData(Resource):
         if not data_id or not data_to_store:
             return {"error": "Both 'data_id' and 'data' fields are required."}, 400
         
-        result = site_manager.store_site_data(data_id, data_to_store, notes)
+        result = services().airtable_manager.store_site_data(data_id, data_to_store, notes)
         return result, 200
 
-class RetrieveSiteData(Resource):
+class StoreSiteDataBulk(Resource):
+    def post(self):
+        """
+        Store many encrypted site data records in one request
+        ---
+        tags:
+        - Site Data
+        parameters:
+            - in: body
+              name: body
+              required: true
+              schema:
+                id: StoreSiteDataBulkRequest
+                required:
+                  - items
+                properties:
+                  items:
+                    type: array
+                    items:
+                      type: object
+                      required:
+                        - data_id
+                        - data
+                      properties:
+                        data_id:
+                          type: string
+                          description: Unique identifier for the data
+                        data:
+                          type: string
+                          description: The data to encrypt and store
+                        notes:
+                          type: string
+                          description: Optional notes about the data
+                        data_type:
+                          type: string
+                          description: Optional data type (defaults to content)
+        responses:
+            200:
+                description: Keys created and updated, plus per-key errors
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                created:
+                                    type: array
+                                    items:
+                                        type: string
+                                updated:
+                                    type: array
+                                    items:
+                                        type: string
+                                errors:
+                                    type: object
+            400:
+                description: Bad request if items is missing, too large or malformed
+        """
+        data = request.json
+
+        if not data:
+            return {"error": "Request body must be in JSON format."}, 400
+
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return {"error": "items field must be a non-empty array."}, 400
+        batch_processor = services().batch_processor
+        if len(items) > batch_processor.max_items:
+            return {"error": f"items may contain at most {batch_processor.max_items} entries."}, 400
+
+        records = []
+        for position, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('data_id') or not item.get('data'):
+                return {"error": f"Item {position}: both 'data_id' and 'data' fields are required."}, 400
+            # Same record shape as POST /site-data, so GET /site-data/<id> reads both alike
+            records.append({
+                'key': item['data_id'],
+                'data': {
+                    "data": item['data'],
+                    "notes": item.get('notes'),
+                    "timestamp": time.time()
+                },
+                'data_type': item.get('data_type', 'content')
+            })
+
+        result = services().airtable_manager.store_many(records)
+        return result, 200
+
+class RetrieveSiteData(CryptoResource):
     def get(self, data_id):
         """
         Retrieve and decrypt site data
@@ -195,9 +512,14 @@ class RetrieveSiteData(Resource):
               type: string
               required: true
               description: The ID of the data to retrieve
+            - name: If-None-Match
+              in: header
+              type: string
+              required: false
+              description: ETag from a previous response; 304 if the data has not changed
         responses:
             200:
-                description: Successfully retrieved decrypted data
+                description: Successfully retrieved decrypted data, with an ETag header
                 content:
                     application/json:
                         schema:
@@ -212,43 +534,144 @@ class RetrieveSiteData(Resource):
                                 timestamp:
                                     type: number
                                     description: When the data was stored
+            304:
+                description: Not modified since the ETag given in If-None-Match
             404:
                 description: Data not found
+            503:
+                description: Crypto pool is full; retry after the Retry-After header
         """
-        result = site_manager.retrieve_site_data(data_id)
-        if 'error' in result:
+        # If-None-Match compares weakly, so W/"..." tags from proxies still match
+        etags = frozenset(request.if_none_match.as_set(include_weak=True))
+        result, etag = services().airtable_manager.retrieve_site_data_if_changed(data_id, etags)
+        if etag is None:
             return result, 404
-        return result, 200
+
+        # Decrypted data must never be stored by shared caches
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        if etag in etags:
+            return Response(status=304, headers=headers)
+        return result, 200, headers
 
 class ListSiteData(Resource):
     def get(self):
         """
-        List all stored encrypted data files
+        List stored encrypted data, optionally one page at a time
         ---
         tags:
         - Site Data
+        parameters:
+            - name: limit
+              in: query
+              type: integer
+              required: false
+              description: Page size (max 100); enables cursor pagination
+            - name: cursor
+              in: query
+              type: string
+              required: false
+              description: next_cursor value from the previous page
         responses:
             200:
-                description: List of all encrypted data files
+                description: List of all encrypted data files, or one page of them when limit is given
                 content:
                     application/json:
                         schema:
-                            type: array
-                            items:
-                                type: object
-                                properties:
-                                    id:
-                                        type: string
-                                        description: The data ID
-                                    filename:
-                                        type: string
-                                        description: The encrypted filename
-                                    path:
-                                        type: string
-                                        description: The file path
+                            type: object
+                            properties:
+                                items:
+                                    type: array
+                                    items:
+                                        type: object
+                                        properties:
+                                            id:
+                                                type: string
+                                                description: The data ID
+                                            filename:
+                                                type: string
+                                                description: The encrypted filename
+                                            path:
+                                                type: string
+                                                description: The file path
+                                next_cursor:
+                                    type: string
+                                    description: Cursor for the next page, null on the last page
+            400:
+                description: Bad request if limit is not a positive integer
         """
-        files = site_manager.list_all_data()
-        return files, 200
+        limit = request.args.get('limit')
+        cursor = request.args.get('cursor')
+
+        if limit is None:
+            files = services().airtable_manager.list_all_data()
+            return files, 200
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            return {"error": "limit must be a positive integer."}, 400
+        if limit <= 0:
+            return {"error": "limit must be a positive integer."}, 400
+
+        return services().airtable_manager.list_data_page(limit, cursor), 200
+
+class SearchSiteData(Resource):
+    def get(self):
+        """
+        Find site data by an exact field value without decrypting every record
+        ---
+        tags:
+        - Site Data
+        parameters:
+            - name: field
+              in: query
+              type: string
+              required: true
+              description: A path listed in BLIND_INDEX_FIELDS, e.g. data.email
+            - name: value
+              in: query
+              type: string
+              required: true
+              description: The value to match; non-string values compare as their JSON text
+        responses:
+            200:
+                description: The decrypted records whose field equals value
+                content:
+                    application/json:
+                        schema:
+                            type: object
+                            properties:
+                                items:
+                                    type: array
+                                    items:
+                                        type: object
+                                        properties:
+                                            id:
+                                                type: string
+                                                description: The data ID
+                                            data:
+                                                type: string
+                                                description: The decrypted data
+                                            notes:
+                                                type: string
+                                                description: The stored notes
+                                            timestamp:
+                                                type: number
+                                                description: When the data was stored
+            400:
+                description: Bad request if field or value is missing or field is not blind-indexed
+        """
+        field = request.args.get('field')
+        value = request.args.get('value')
+        if not field or value is None:
+            return {"error": "field and value are required."}, 400
+
+        try:
+            result = services().airtable_manager.search_site_data(field, value)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        # Decrypted data must never be stored by shared caches
+        return result, 200, {'Cache-Control': 'private, no-cache'}
 
 class DeleteSiteData(Resource):
     def delete(self, data_id):
@@ -277,20 +700,61 @@ class DeleteSiteData(Resource):
             404:
                 description: Data not found
         """
-        result = site_manager.delete_site_data(data_id)
+        result = services().airtable_manager.delete_site_data(data_id)
         if 'error' in result:
             return result, 404
         return result, 200
 
-# Register all routes
-api.add_resource(EncryptData, "/encrypt")
-api.add_resource(DecryptData, "/decrypt")
-api.add_resource(StoreSiteData, "/site-data")
-api.add_resource(RetrieveSiteData, "/site-data/<string:data_id>")
-api.add_resource(ListSiteData, "/site-data")
-api.add_resource(DeleteSiteData, "/site-data/<string:data_id>")
+# Resources and their routes
+RESOURCES = [
+    (EncryptData, "/encrypt"),
+    (DecryptData, "/decrypt"),
+    (EncryptBatch, "/encrypt/batch"),
+    (DecryptBatch, "/decrypt/batch"),
+    (StoreSiteData, "/site-data"),
+    (StoreSiteDataBulk, "/site-data/bulk"),
+    (SearchSiteData, "/site-data/search"),
+    (RetrieveSiteData, "/site-data/<string:data_id>"),
+    (ListSiteData, "/site-data"),
+    (DeleteSiteData, "/site-data/<string:data_id>"),
+]
+
+pages = Blueprint('pages', __name__)
+
+@pages.route('/metrics')
+def metrics():
+    """
+    Prometheus metrics
+    ---
+    tags:
+    - Monitoring
+    produces:
+    - text/plain
+    responses:
+        200:
+            description: Crypto, storage, Airtable and per-route latency metrics in the Prometheus text format
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@pages.route('/encryption/stats')
+def encryption_stats():
+    """
+    Compression and key-cache statistics
+    ---
+    tags:
+    - Monitoring
+    responses:
+        200:
+            description: Compress-then-encrypt counters with the achieved ratio, derived-key cache and crypto pool stats
+    """
+    site_services = services()
+    return {
+        "compression": site_services.encryptor.compression_stats(),
+        "key_cache": site_services.encryptor.key_cache_info(),
+        "crypto_pool": site_services.crypto_pool.stats()
+    }
 
-@app.route('/')
+@pages.route('/')
 def home():
     return """
     <h1>Encrypted Site Data API</h1>
@@ -299,13 +763,64 @@ def home():
     <ul>
         <li>POST /encrypt - Encrypt data</li>
         <li>POST /decrypt - Decrypt data</li>
+        <li>POST /encrypt/batch - Encrypt many values</li>
+        <li>POST /decrypt/batch - Decrypt many values</li>
         <li>POST /site-data - Store encrypted site data</li>
-        <li>GET /site-data - List all stored data</li>
+        <li>POST /site-data/bulk - Store many site data records</li>
+        <li>GET /site-data?limit=&cursor= - List stored data (paginated)</li>
+        <li>GET /site-data/search?field=&value= - Find data by a blind-indexed field</li>
         <li>GET /site-data/{id} - Retrieve specific data</li>
         <li>DELETE /site-data/{id} - Delete data</li>
+        <li>GET /metrics - Prometheus metrics</li>
+        <li>GET /encryption/stats - Compression ratio and key cache stats</li>
     </ul>
     """
 
+def create_app(config=None):
+    """Build the Flask app
+
+    config overrides Flask settings and may supply ready-made services
+    (see Services). Backends are built lazily on first use; set
+    PRELOAD_SERVICES (or APP_PRELOAD_SERVICES=1) to build the fork-safe ones
+    here instead, so gunicorn --preload shares them with every worker. SWAGGER_ENABLED
+    (or SWAGGER_ENABLED=0 in the environment) controls /apidocs, and
+    TIERED_STORAGE (or TIERED_STORAGE=1) puts a local tier in front of Airtable.
+    """
+    app = Flask(__name__)
+    app.config['SWAGGER_ENABLED'] = _env_flag('SWAGGER_ENABLED', '1')
+    app.config['PRELOAD_SERVICES'] = _env_flag('APP_PRELOAD_SERVICES', '0')
+    app.config['TIERED_STORAGE'] = _env_flag('TIERED_STORAGE', '0')
+    app.config.update(config or {})
+    app.extensions[EXTENSION] = Services(app.config)
+
+    app.before_request(start_request_timer)
+    app.after_request(record_request_latency)
+    api = Api(app)
+    for resource, route in RESOURCES:
+        api.add_resource(resource, route)
+    app.register_blueprint(pages)
+
+    if app.config['SWAGGER_ENABLED']:
+        # flasgger only builds the spec when /apidocs is requested
+        from flasgger import Swagger
+        Swagger(app)
+    if app.config['PRELOAD_SERVICES']:
+        app.extensions[EXTENSION].warm()
+    return app
+
+_default_app = None
+_default_app_lock = threading.Lock()
+
+def __getattr__(name):
+    # The module-level app (gunicorn app.routes:app) is built on first access
+    global _default_app
+    if name == 'app':
+        with _default_app_lock:
+            if _default_app is None:
+                _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
     
\ No newline at end of file
@@ -0,0 +1,87 @@
+import copy
+import threading
+from .metrics import READS_COALESCED
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share it
+
+    The first caller for a key runs the function, later callers for the same
+    key wait for it and get its result (or its exception). When a result was
+    shared, every caller gets its own deep copy, so callers may mutate it.
+    """
+
+    def __init__(self, source, share=copy.deepcopy):
+        self.source = source
+        self.share = share
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """Return func() for key, joining a call already in flight"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            READS_COALESCED.labels(self.source).inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return self.share(call.result)
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # forget() may already have let a newer call take the key
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                shared = call.waiters > 0
+            call.done.set()
+        if shared:
+            return self.share(call.result)
+        return call.result
+
+    def forget(self, key):
+        """Make later callers start a new call instead of joining the one in flight
+
+        Writers call this so readers arriving after a write never get a
+        result fetched before it.
+        """
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def stats(self):
+        """Return call, execution and coalesced counters"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls)
+            }
@@ -1,94 +1,304 @@
 import os
 import json
-from .encryption import DataEncryptor
+import tempfile
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from .encryption import DataEncryptor, envelope_etag
+from .batch import BatchProcessor
+from .cache import TTLCache
+from .singleflight import SingleFlight
+from .blind_index import BlindIndexer, LocalBlindIndex, LOCAL_INDEX_FILENAME
+from .storage import DEFAULT_DATA_DIR, FileBackend, create_backend, migrate_directory
+from .metrics import SITE_IO_SECONDS
+
+_READ_SECONDS = SITE_IO_SECONDS.labels('read')
+_WRITE_SECONDS = SITE_IO_SECONDS.labels('write')
+_LIST_SECONDS = SITE_IO_SECONDS.labels('list')
+_DELETE_SECONDS = SITE_IO_SECONDS.labels('delete')
+
+DEMO_SITE_DATA = {
+    "site_config": {
+        "name": "Encrypted Site",
+        "version": "1.0.0",
+        "description": "A site with encrypted data storage"
+    },
+    "content_data": {
+        "home": {
+            "title": "Welcome to Our Secure Site",
+            "description": "All data is encrypted for security",
+            "features": ["Secure Data", "Encrypted Storage", "Privacy Focused"]
+        },
+        "about": {
+            "title": "About Us", 
+            "content": "We believe in data privacy and security."
+        }
+    },
+    "secrets": {
+        "api_keys": {
+            "service_1": "encrypted_api_key_123",
+            "service_2": "encrypted_secret_456"
+        },
+        "config": {
+            "database_url": "encrypted_db_url",
+            "admin_email": "encrypted_admin@example.com"
+        }
+    }
+}
+
+
+def _atomic_write(path, text):
+    """Write text to path so readers see either the old or the new file"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _manifest_sections(manifest, data_dir):
+    """Section name -> manifest entry, filling in older manifests from disk"""
+    sections = manifest.get("sections")
+    if sections is not None:
+        return sections
+    sections = {}
+    for enc_file in manifest["encrypted_files"]:
+        entry = {"file": enc_file}
+        try:
+            entry["size"] = os.path.getsize(f'{data_dir}/{enc_file}')
+        except FileNotFoundError:
+            pass
+        sections[enc_file.replace('.json.enc', '')] = entry
+    return sections
+
+
+class LazySiteData(Mapping):
+    """Read-only mapping of section name to data, decrypted on first access
+
+    Names, sizes and hashes come from the manifest, so membership checks,
+    len() and info() never decrypt. Each section is decrypted at most once,
+    even when several threads ask for it together.
+    """
+
+    def __init__(self, encryptor, data_dir, sections):
+        self._encryptor = encryptor
+        self._data_dir = data_dir
+        self._sections = sections
+        self._values = {}
+        self._locks = {name: threading.Lock() for name in sections}
+
+    def __getitem__(self, name):
+        if name not in self._sections:
+            raise KeyError(name)
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        with self._locks[name]:
+            if name not in self._values:
+                with _READ_SECONDS.time():
+                    self._values[name] = self._encryptor.decrypt_file(
+                        f'{self._data_dir}/{self._sections[name]["file"]}'
+                    )
+        return self._values[name]
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self):
+        return len(self._sections)
+
+    def info(self, name):
+        """Manifest entry (file, size, hash) for a section, without decrypting it"""
+        return dict(self._sections[name])
+
+    def is_loaded(self, name):
+        return name in self._values
+
 
 class SiteManager:
-    def __init__(self):
+    def __init__(self, data_dir=None, backend=None, etag_ttl=None, blind_index_fields=None):
         self.encryptor = DataEncryptor()
-        self.data_dir = 'site/data'
+        self.data_dir = data_dir or DEFAULT_DATA_DIR
+        # Where store/retrieve/list/delete keep records; see app/storage.py
+        self.backend = backend or create_backend(self.data_dir)
+        # ETag per id so conditional GETs can answer 304 without reading the
+        # record; writes by other processes are seen once an entry expires
+        if etag_ttl is None:
+            etag_ttl = float(os.environ.get('SITE_ETAG_CACHE_TTL', 60))
+        self.validators = TTLCache(max_size=4096, ttl=etag_ttl)
+        # Per-id write counter: a read only caches its etag if no write or
+        # delete of that id happened while it was reading
+        self._versions = {}
+        self._versions_lock = threading.Lock()
+        # Concurrent reads of one id share a single read; those that need the
+        # data share a single decrypt of each envelope
+        self.reads = SingleFlight('site')
+        self.decrypts = SingleFlight('site_decrypt')
+        # Keyed equality tokens for BLIND_INDEX_FIELDS, kept in a SQLite file
+        # next to the records; opened on first use
+        self.blind_index = BlindIndexer(self.encryptor, blind_index_fields)
+        self._local_index = None
+        self._local_index_lock = threading.Lock()
+
+    def _written(self, data_id):
+        """Record a write or delete of data_id
+
+        Only drops the validator: two writes of one id can finish in either
+        order, so the next read sets it from whatever envelope was stored.
+        """
+        with self._versions_lock:
+            self._versions[data_id] = self._versions.get(data_id, 0) + 1
+            self.validators.invalidate(data_id)
+        self.reads.forget(data_id)
+
+    def _get_local_index(self):
+        with self._local_index_lock:
+            if self._local_index is None:
+                self._local_index = LocalBlindIndex(os.path.join(self.data_dir, LOCAL_INDEX_FILENAME))
+            return self._local_index
     
-    def build_site_data(self):
-        """Build and encrypt site data - for your existing demo"""
-        site_data = {
-            "site_config": {
-                "name": "Encrypted Site",
-                "version": "1.0.0",
-                "description": "A site with encrypted data storage"
-            },
-            "content_data": {
-                "home": {
-                    "title": "Welcome to Our Secure Site",
-                    "description": "All data is encrypted for security",
-                    "features": ["Secure Data", "Encrypted Storage", "Privacy Focused"]
-                },
-                "about": {
-                    "title": "About Us", 
-                    "content": "We believe in data privacy and security."
-                }
-            },
-            "secrets": {
-                "api_keys": {
-                    "service_1": "encrypted_api_key_123",
-                    "service_2": "encrypted_secret_456"
-                },
-                "config": {
-                    "database_url": "encrypted_db_url",
-                    "admin_email": "encrypted_admin@example.com"
-                }
-            }
-        }
-        
+    def build_site_data(self, site_data=None, force=False, max_workers=None):
+        """Encrypt each section of site_data into <section>.json.enc
+
+        The manifest records a keyed content hash per section; sections whose
+        hash and file are unchanged are skipped unless force is set. Changed
+        sections are encrypted in parallel and every file, manifest
+        included, is replaced atomically. Returns a summary with the
+        rebuilt, skipped and removed section names.
+        """
+        site_data = DEMO_SITE_DATA if site_data is None else site_data
+
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
-        
-        # Encrypt and save different data types
-        self._save_encrypted_data('site_config.json', site_data["site_config"])
-        self._save_encrypted_data('content_data.json', site_data["content_data"])
-        self._save_encrypted_data('secrets.json', site_data["secrets"])
-        
+
+        old_sections = self._read_manifest().get("sections", {})
+        previous = {} if force else old_sections
+        sections = {}
+        changed = []
+        for name, data in site_data.items():
+            filename = f'{name}.json.enc'
+            content_hash = self.encryptor.keyed_hash(data)
+            entry = previous.get(name)
+            if (entry and entry.get("hash") == content_hash and entry.get("file") == filename
+                    and os.path.exists(f'{self.data_dir}/{filename}')):
+                sections[name] = entry
+            else:
+                sections[name] = {"file": filename, "hash": content_hash}
+                changed.append(name)
+
+        if changed:
+            workers = max_workers or int(os.environ.get('BUILD_WORKERS', os.cpu_count() or 1))
+            # v2/v3 sections share one derived master key and only pay for
+            # HKDF + AES-GCM, so threads win; a process would spawn and run
+            # its own PBKDF2 first. v1 runs PBKDF2 per section, which
+            # processes can spread over cores.
+            per_message_kdf = self.encryptor.envelope_version == 1
+            processor = BatchProcessor(self.encryptor, max_workers=workers,
+                                       executor='process' if per_message_kdf and len(changed) > 1 and workers > 1
+                                       else 'thread')
+            try:
+                results = processor.encrypt_many([site_data[name] for name in changed])
+            finally:
+                processor.shutdown()
+            for name, result in zip(changed, results):
+                if 'error' in result:
+                    raise ValueError(f"Section {name}: {result['error']}")
+                filename = sections[name]["file"]
+                with _WRITE_SECONDS.time():
+                    _atomic_write(f'{self.data_dir}/{filename}', result["encrypted_data"])
+                sections[name]["size"] = len(result["encrypted_data"])
+
+        removed = sorted(set(old_sections) - set(sections))
+        for name in removed:
+            try:
+                os.remove(f'{self.data_dir}/{old_sections[name]["file"]}')
+            except (FileNotFoundError, KeyError):
+                pass
+
         # Create a manifest file
         manifest = {
-            "encrypted_files": [
-                "site_config.json.enc",
-                "content_data.json.enc", 
-                "secrets.json.enc"
-            ],
+            "encrypted_files": [entry["file"] for entry in sections.values()],
+            "sections": sections,
             "encryption_method": "AES-GCM",
-            "key_derivation": "PBKDF2-HMAC-SHA256"
+            "key_derivation": "PBKDF2-HMAC-SHA256",
+            "content_hash": "HMAC-SHA256"
         }
-        
-        with open(f'{self.data_dir}/manifest.json', 'w') as f:
-            json.dump(manifest, f, indent=2)
-        
-        print("✅ Site data built and encrypted successfully!")
+        _atomic_write(f'{self.data_dir}/manifest.json', json.dumps(manifest, indent=2))
+
+        summary = {
+            "rebuilt": changed,
+            "skipped": [name for name in sections if name not in changed],
+            "removed": removed
+        }
+        print(f"✅ Site data built: {len(summary['rebuilt'])} rebuilt, "
+              f"{len(summary['skipped'])} unchanged, {len(summary['removed'])} removed")
         print(f"📁 Encrypted files saved to: {self.data_dir}/")
+        return summary
+
+    def _read_manifest(self):
+        try:
+            with open(f'{self.data_dir}/manifest.json', 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
     
     def _save_encrypted_data(self, filename, data):
         """Encrypt data and save to file"""
         encrypted = self.encryptor.encrypt_data(data)
         encrypted_filename = filename.replace('.json', '.json.enc')
         
-        with open(f'{self.data_dir}/{encrypted_filename}', 'w') as f:
-            f.write(encrypted)
+        with _WRITE_SECONDS.time():
+            _atomic_write(f'{self.data_dir}/{encrypted_filename}', encrypted)
     
-    def load_site_data(self):
-        """Load and decrypt all site data"""
+    def load_site_data(self, lazy=False):
+        """Load and decrypt all site data
+
+        With lazy=True return a LazySiteData that decrypts each section on
+        first access instead of decrypting everything up front.
+        """
         try:
-            with open(f'{self.data_dir}/manifest.json', 'r') as f:
+            with _READ_SECONDS.time(), open(f'{self.data_dir}/manifest.json', 'r') as f:
                 manifest = json.load(f)
             
-            decrypted_data = {}
-            for enc_file in manifest["encrypted_files"]:
-                file_key = enc_file.replace('.json.enc', '')
-                decrypted_data[file_key] = self.encryptor.decrypt_file(
-                    f'{self.data_dir}/{enc_file}'
-                )
-            
-            return decrypted_data
+            data = LazySiteData(self.encryptor, self.data_dir, _manifest_sections(manifest, self.data_dir))
+            if lazy:
+                return data
+            return {file_key: data[file_key] for file_key in data}
         
         except FileNotFoundError:
             print("❌ No encrypted data found. Run build_site_data() first.")
             return None
+
+    def load_sections(self, names, max_workers=None):
+        """Decrypt only the named sections, in parallel; returns {name: data}
+
+        Raises KeyError for a name the manifest does not list.
+        """
+        data = self.load_site_data(lazy=True)
+        if data is None:
+            raise FileNotFoundError(f"No manifest in {self.data_dir}")
+        names = list(dict.fromkeys(names))
+        missing = [name for name in names if name not in data]
+        if missing:
+            raise KeyError(f"Unknown sections: {', '.join(missing)}")
+        if len(names) <= 1:
+            return {name: data[name] for name in names}
+
+        # Threads share the encryptor's derived-key cache, so sections
+        # written by the same build process pay for one KDF between them
+        workers = max_workers or min(len(names), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='load-sections') as pool:
+            return dict(zip(names, pool.map(data.__getitem__, names)))
     
     def view_decrypted_data(self):
         """View decrypted data (for verification)"""
@@ -99,7 +309,7 @@ class SiteManager:
         return data
 
     # NEW METHODS FOR FLASK API
-    def store_site_data(self, data_id, data, notes=None):
+    def store_site_data(self, data_id, data, notes=None, data_type='content'):
         """Store encrypted site data with notes - for Flask API"""
         site_data = {
             "data": data,
@@ -107,62 +317,142 @@ class SiteManager:
             "timestamp": os.times().elapsed
         }
         
-        # Ensure data directory exists
-        os.makedirs(self.data_dir, exist_ok=True)
-        
         # Encrypt and save
         encrypted_data = self.encryptor.encrypt_data(site_data)
         filename = f"{data_id}.enc"
         
-        with open(f'{self.data_dir}/{filename}', 'w') as f:
-            f.write(encrypted_data)
+        with _WRITE_SECONDS.time():
+            self.backend.put(data_id, encrypted_data, data_type)
+        self._written(data_id)
+        if self.blind_index.fields:
+            self._get_local_index().set(data_id, self.blind_index.tokens(site_data))
         
         return {"message": f"Data stored as {filename}", "id": data_id}
     
     def retrieve_site_data(self, data_id):
         """Retrieve and decrypt site data - for Flask API"""
-        filename = f"{data_id}.enc"
-        filepath = f'{self.data_dir}/{filename}'
-        
-        if not os.path.exists(filepath):
-            return {"error": f"Data with ID '{data_id}' not found"}
+        return self.retrieve_site_data_if_changed(data_id)[0]
+
+    def retrieve_site_data_if_changed(self, data_id, etags=()):
+        """Return (site data or error, etag), skipping read and decrypt when etag is in etags"""
+        if etags:
+            etag = self.validators.get(data_id)
+            if etag is not None and etag in etags:
+                return None, etag
+
+        encrypted_data, etag = self.reads.do(data_id, lambda: self._read(data_id))
+        if encrypted_data is None:
+            return {"error": f"Data with ID '{data_id}' not found"}, None
+        if etag in etags:
+            return None, etag
+        return self.decrypts.do((data_id, etag), lambda: self.encryptor.decrypt_data(encrypted_data)), etag
+
+    def _read(self, data_id):
+        """Read one record's envelope and cache its etag; (None, None) if it does not exist
+
+        Nothing is decrypted here, so a caller whose etag matches never pays for it.
+        """
+        with self._versions_lock:
+            version = self._versions.get(data_id, 0)
+        with _READ_SECONDS.time():
+            encrypted_data = self.backend.get(data_id)
         
-        with open(filepath, 'r') as f:
-            encrypted_data = f.read()
+        if encrypted_data is None:
+            self.validators.invalidate(data_id)
+            return None, None
         
-        decrypted_data = self.encryptor.decrypt_data(encrypted_data)
-        return decrypted_data
+        etag = envelope_etag(encrypted_data)
+        with self._versions_lock:
+            # A write since the read began owns the validator now
+            if self._versions.get(data_id, 0) == version:
+                self.validators.set(data_id, etag)
+        return encrypted_data, etag
+
+    def coalescing_stats(self):
+        """Return how many concurrent reads shared another read's fetch (and decrypt)"""
+        return dict(self.reads.stats(), decrypts=self.decrypts.stats())
+
+    def _list_entry(self, data_id):
+        return {
+            "id": data_id,
+            "filename": f"{data_id}.enc",
+            "path": self.backend.location(data_id)
+        }
     
     def list_all_data(self):
         """List all stored encrypted data files - for Flask API"""
-        if not os.path.exists(self.data_dir):
-            return []
-        
-        files = []
-        for filename in os.listdir(self.data_dir):
-            if filename.endswith('.enc') and not filename.endswith('.json.enc'):
-                data_id = filename.replace('.enc', '')
-                files.append({
-                    "id": data_id,
-                    "filename": filename,
-                    "path": f"{self.data_dir}/{filename}"
-                })
-        
-        return files
+        with _LIST_SECONDS.time():
+            data_ids = self.backend.list_ids()
+        return [self._list_entry(data_id) for data_id in data_ids]
+
+    def list_data_page(self, limit, cursor=None):
+        """List one page of stored data ids in sorted order
+
+        The cursor is the last id of the previous page; returns
+        {"items": [...], "next_cursor": str or None}.
+        """
+        limit = max(1, int(limit))
+        with _LIST_SECONDS.time():
+            data_ids, next_cursor = self.backend.list_page(limit, cursor)
+        return {"items": [self._list_entry(data_id) for data_id in data_ids], "next_cursor": next_cursor}
     
+    def search_site_data(self, field, value):
+        """Return {"items": [...]} of site data whose field equals value - for Flask API
+
+        field is a BLIND_INDEX_FIELDS path into the stored record, e.g.
+        data.email; only records whose token matches are read and decrypted.
+        """
+        self.blind_index.check_field(field)
+        data_ids = self._get_local_index().find(field, self.blind_index.token(field, value))
+        items = []
+        for data_id in data_ids:
+            encrypted_data = self.backend.get(data_id)
+            if encrypted_data is None:
+                continue
+            data = self.encryptor.decrypt_data(encrypted_data)
+            # Re-check the plaintext so a stale or colliding token never leaks a record
+            if self.blind_index.matches(data, field, value):
+                items.append(dict(data, id=data_id))
+        return {"items": items}
+
+    def rebuild_blind_index(self):
+        """Recompute the local blind index from every stored record
+
+        Tokens are keyed by the passcode, so run this after rotate_keys.py
+        or after changing BLIND_INDEX_FIELDS. Returns the number of records.
+        """
+        index = self._get_local_index()
+        data_ids = self.backend.list_ids()
+        for data_id in data_ids:
+            encrypted_data = self.backend.get(data_id)
+            if encrypted_data is None:
+                continue
+            index.set(data_id, self.blind_index.tokens(self.encryptor.decrypt_data(encrypted_data)))
+        return len(data_ids)
+
     def delete_site_data(self, data_id):
         """Delete encrypted site data - for Flask API"""
-        filename = f"{data_id}.enc"
-        filepath = f'{self.data_dir}/{filename}'
+        with _DELETE_SECONDS.time():
+            deleted = self.backend.delete(data_id)
+        self._written(data_id)
+        if self.blind_index.fields:
+            self._get_local_index().remove(data_id)
         
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        if deleted:
             return {"message": f"Data '{data_id}' deleted"}
         else:
             return {"error": f"Data with ID '{data_id}' not found"}
     
+    def migrate_from_files(self, source_dir=None, remove_files=False):
+        """One-shot copy of <id>.enc files from source_dir into this manager's backend"""
+        source_dir = source_dir or self.data_dir
+        if isinstance(self.backend, FileBackend) and self.backend.data_dir == source_dir:
+            return 0
+        migrated = migrate_directory(source_dir, self.backend, remove_files=remove_files)
+        print(f"✅ Migrated {migrated} records from {source_dir}/")
+        return migrated
+    
     def decrypt_file(self, filepath):
-        """Helper method to decrypt a file"""
-        with open(filepath, 'r') as f:
-            encrypted_data = f.read()
-        return self.encryptor.decrypt_data(encrypted_data)
\ No newline at end of file
+        """Helper method to decrypt a file (segmented or legacy single-envelope)"""
+        with _READ_SECONDS.time():
+            return self.encryptor.decrypt_file(filepath)
\ No newline at end of file
@@ -0,0 +1,305 @@
+import os
+import time
+import heapq
+import base64
+import sqlite3
+import threading
+
+from .encryption import ENVELOPE_V2_PREFIX, ENVELOPE_V3_PREFIX
+
+DEFAULT_DATA_DIR = 'site/data'
+SQLITE_FILENAME = 'site_data.db'
+LOG_DIRNAME = 'log'
+
+
+def _is_record_file(name):
+    # *.json.enc files belong to build_site_data, not to stored records
+    return name.endswith('.enc') and not name.endswith('.json.enc')
+
+
+class StorageBackend:
+    """Where SiteManager keeps encrypted records
+
+    Backends only ever see envelope strings produced by DataEncryptor;
+    encryption and decryption stay in SiteManager.
+    """
+
+    def put(self, data_id, encrypted_data, data_type='content', timestamp=None):
+        """Insert or replace one record"""
+        raise NotImplementedError
+
+    def put_many(self, records):
+        """Insert or replace (data_id, encrypted_data, data_type, timestamp) tuples"""
+        count = 0
+        for data_id, encrypted_data, data_type, timestamp in records:
+            self.put(data_id, encrypted_data, data_type, timestamp)
+            count += 1
+        return count
+
+    def get(self, data_id):
+        """Return the envelope for data_id, or None if it is not stored"""
+        raise NotImplementedError
+
+    def get_record(self, data_id):
+        """Return (envelope, data_type) for data_id, or None if it is not stored"""
+        encrypted_data = self.get(data_id)
+        if encrypted_data is None:
+            return None
+        return encrypted_data, 'content'
+
+    def delete(self, data_id):
+        """Delete one record; True if it existed"""
+        raise NotImplementedError
+
+    def list_ids(self):
+        """Return every stored id"""
+        raise NotImplementedError
+
+    def list_page(self, limit, cursor=None):
+        """Return (ids, next_cursor) for up to limit ids after cursor, in sorted order"""
+        # One extra id tells us whether another page follows
+        page = heapq.nsmallest(
+            limit + 1,
+            (data_id for data_id in self.list_ids() if cursor is None or data_id > cursor)
+        )
+        next_cursor = page[limit - 1] if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    def location(self, data_id):
+        """Human-readable location of a record, used in list results"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class FileBackend(StorageBackend):
+    """One <data_dir>/<id>.enc text file per record (the original layout)"""
+
+    def __init__(self, data_dir=DEFAULT_DATA_DIR):
+        self.data_dir = data_dir
+
+    def _path(self, data_id):
+        return f'{self.data_dir}/{data_id}.enc'
+
+    def put(self, data_id, encrypted_data, data_type='content', timestamp=None):
+        # Ensure data directory exists
+        os.makedirs(self.data_dir, exist_ok=True)
+        with open(self._path(data_id), 'w') as f:
+            f.write(encrypted_data)
+
+    def get(self, data_id):
+        try:
+            with open(self._path(data_id), 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, data_id):
+        try:
+            os.remove(self._path(data_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def list_ids(self):
+        if not os.path.exists(self.data_dir):
+            return []
+        return [name[:-len('.enc')] for name in os.listdir(self.data_dir) if _is_record_file(name)]
+
+    def list_page(self, limit, cursor=None):
+        if not os.path.exists(self.data_dir):
+            return [], None
+
+        def ids():
+            with os.scandir(self.data_dir) as entries:
+                for entry in entries:
+                    if _is_record_file(entry.name):
+                        data_id = entry.name[:-len('.enc')]
+                        if cursor is None or data_id > cursor:
+                            yield data_id
+
+        page = heapq.nsmallest(limit + 1, ids())
+        next_cursor = page[limit - 1] if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    def location(self, data_id):
+        return self._path(data_id)
+
+
+# Envelope version -> string prefix; v1 envelopes are bare base64
+_ENVELOPE_PREFIXES = {2: ENVELOPE_V2_PREFIX, 3: ENVELOPE_V3_PREFIX}
+
+
+def _envelope_to_blob(encrypted_data):
+    """Split an envelope string into (version, raw bytes) for compact storage"""
+    for version, prefix in _ENVELOPE_PREFIXES.items():
+        if encrypted_data.startswith(prefix):
+            return version, base64.b64decode(encrypted_data[len(prefix):], validate=True)
+    return 1, base64.b64decode(encrypted_data, validate=True)
+
+
+def _blob_to_envelope(version, blob):
+    return _ENVELOPE_PREFIXES.get(version, '') + base64.b64encode(blob).decode('utf-8')
+
+
+class SQLiteBackend(StorageBackend):
+    """Records in one SQLite database in WAL mode
+
+    Ciphertext is stored as raw bytes (not base64) keyed by id, with
+    created/updated timestamps and the data type indexed. Each thread gets
+    its own connection; WAL lets readers run alongside a writer, including
+    across gunicorn workers sharing the file.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS site_data (
+            id TEXT PRIMARY KEY,
+            envelope INTEGER NOT NULL,
+            ciphertext BLOB NOT NULL,
+            data_type TEXT NOT NULL DEFAULT 'content',
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS site_data_updated_at ON site_data (updated_at);
+        CREATE INDEX IF NOT EXISTS site_data_data_type ON site_data (data_type);
+    """
+
+    UPSERT = """
+        INSERT INTO site_data (id, envelope, ciphertext, data_type, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            envelope = excluded.envelope,
+            ciphertext = excluded.ciphertext,
+            data_type = excluded.data_type,
+            updated_at = excluded.updated_at
+    """
+
+    def __init__(self, path=None, timeout=5.0):
+        self.path = path or f'{DEFAULT_DATA_DIR}/{SQLITE_FILENAME}'
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; multi-row writes open their own transaction
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _row(self, data_id, encrypted_data, data_type, timestamp):
+        version, blob = _envelope_to_blob(encrypted_data)
+        timestamp = time.time() if timestamp is None else timestamp
+        return (data_id, version, blob, data_type or 'content', timestamp, timestamp)
+
+    def put(self, data_id, encrypted_data, data_type='content', timestamp=None):
+        self._connection().execute(self.UPSERT, self._row(data_id, encrypted_data, data_type, timestamp))
+
+    def put_many(self, records):
+        rows = [self._row(*record) for record in records]
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(self.UPSERT, rows)
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+        return len(rows)
+
+    def get(self, data_id):
+        row = self._connection().execute(
+            'SELECT envelope, ciphertext FROM site_data WHERE id = ?', (data_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _blob_to_envelope(row[0], row[1])
+
+    def get_record(self, data_id):
+        row = self._connection().execute(
+            'SELECT envelope, ciphertext, data_type FROM site_data WHERE id = ?', (data_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _blob_to_envelope(row[0], row[1]), row[2]
+
+    def delete(self, data_id):
+        cursor = self._connection().execute('DELETE FROM site_data WHERE id = ?', (data_id,))
+        return cursor.rowcount > 0
+
+    def list_ids(self):
+        return [row[0] for row in self._connection().execute('SELECT id FROM site_data ORDER BY id')]
+
+    def list_page(self, limit, cursor=None):
+        conn = self._connection()
+        if cursor is None:
+            rows = conn.execute('SELECT id FROM site_data ORDER BY id LIMIT ?', (limit + 1,))
+        else:
+            rows = conn.execute('SELECT id FROM site_data WHERE id > ? ORDER BY id LIMIT ?', (cursor, limit + 1))
+        page = [row[0] for row in rows]
+        next_cursor = page[limit - 1] if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    def location(self, data_id):
+        return f'sqlite:{data_id}'
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_backend(data_dir=DEFAULT_DATA_DIR, kind=None):
+    """Build the backend named by kind or SITE_STORAGE_BACKEND (file, sqlite or log)"""
+    kind = kind or os.environ.get('SITE_STORAGE_BACKEND', 'file')
+    if kind == 'file':
+        return FileBackend(data_dir)
+    if kind == 'sqlite':
+        return SQLiteBackend(os.environ.get('SITE_SQLITE_PATH', f'{data_dir}/{SQLITE_FILENAME}'))
+    if kind == 'log':
+        from .log_store import LogStructuredBackend
+        return LogStructuredBackend(os.environ.get('SITE_LOG_DIR', f'{data_dir}/{LOG_DIRNAME}'))
+    raise ValueError(f"Unsupported site storage backend: {kind}")
+
+
+def migrate_directory(data_dir, backend, remove_files=False, batch_size=500):
+    """Copy every <id>.enc record file in data_dir into backend
+
+    Safe to re-run: records are upserted, keeping each file's mtime as its
+    timestamp. With remove_files=True each file is deleted once its batch
+    is committed. Returns the number of records migrated.
+    """
+    if not os.path.exists(data_dir):
+        return 0
+
+    def flush(batch):
+        backend.put_many([record for record, _ in batch])
+        if remove_files:
+            for _, path in batch:
+                os.remove(path)
+        return len(batch)
+
+    migrated = 0
+    batch = []
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or not _is_record_file(entry.name):
+                continue
+            with open(entry.path, 'r') as f:
+                encrypted_data = f.read().strip()
+            data_id = entry.name[:-len('.enc')]
+            batch.append(((data_id, encrypted_data, 'content', entry.stat().st_mtime), entry.path))
+            if len(batch) >= batch_size:
+                migrated += flush(batch)
+                batch = []
+    if batch:
+        migrated += flush(batch)
+    return migrated
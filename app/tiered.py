@@ -0,0 +1,336 @@
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .encryption import envelope_etag
+from .site_manager import SiteManager
+from .singleflight import SingleFlight
+from .airtable_manager import _timed_pages
+from .metrics import TIERED_READS, TIERED_REFRESHES
+
+# Kept apart from site/data so cached Airtable records never mix with
+# records SiteManager stores for itself
+DEFAULT_CACHE_DIR = 'site/cache'
+STATE_FILENAME = 'tier_state.db'
+# Local copies are tagged with a passcode fingerprint derived under this
+# info, so ciphertext left over from before a key rotation reads as a miss
+HKDF_INFO_TIER_KEY_ID = b'python_api_site/tier-key-id/v1'
+# Local writes for keys in different stripes never wait on each other
+KEY_LOCK_STRIPES = 64
+
+
+class TierState:
+    """Per-key Airtable last_modified_time and when the local copy was last checked
+
+    One SQLite file next to the local records, so freshness survives a
+    restart along with the ciphertext; one connection per thread. Rows
+    written under another key_id (another passcode) are treated as absent.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tier_state (
+            id TEXT PRIMARY KEY,
+            last_modified TEXT,
+            validated_at REAL NOT NULL,
+            key_id TEXT
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path, key_id=None, timeout=5.0):
+        self.path = path
+        self.key_id = key_id
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(self.SCHEMA)
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(tier_state)')]
+        if 'key_id' not in columns:
+            # Files from before key ids were kept: every row reads as a miss
+            conn.execute('ALTER TABLE tier_state ADD COLUMN key_id TEXT')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, data_id):
+        """Return (last_modified, validated_at), or None if the key is not tracked"""
+        return self._connection().execute(
+            'SELECT last_modified, validated_at FROM tier_state WHERE id = ? AND key_id IS ?',
+            (data_id, self.key_id)
+        ).fetchone()
+
+    def set(self, data_id, last_modified, validated_at):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO tier_state (id, last_modified, validated_at, key_id) VALUES (?, ?, ?, ?)',
+            (data_id, last_modified, validated_at, self.key_id)
+        )
+
+    def remove(self, data_id):
+        self._connection().execute('DELETE FROM tier_state WHERE id = ?', (data_id,))
+
+    def ids(self):
+        return [row[0] for row in self._connection().execute('SELECT id FROM tier_state ORDER BY id')]
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class TieredManager:
+    """Local ciphertext tier in front of an AirtableManager
+
+    Airtable stays the system of record: writes go to Airtable first and
+    then through to a SiteManager backend, as the same envelope. Reads are
+    served from the local copy, which is trusted for fresh_ttl seconds after
+    it was last checked; an older copy is still served while a background
+    refresh compares it with Airtable's last_modified_time and pulls the
+    record if it changed. Only a local miss waits on Airtable. Local copies
+    and their freshness live on disk, so a restarted worker serves from
+    them straight away.
+    """
+
+    def __init__(self, airtable, site_manager=None, fresh_ttl=None, refresh_workers=None):
+        self.airtable = airtable
+        self.local = site_manager or SiteManager(data_dir=os.environ.get('TIERED_CACHE_DIR', DEFAULT_CACHE_DIR))
+        self.backend = self.local.backend
+        self.state = TierState(
+            os.path.join(self.local.data_dir, STATE_FILENAME),
+            key_id=airtable.encryptor.keyed_hash('local tier', HKDF_INFO_TIER_KEY_ID)[:32]
+        )
+        self.crypto = airtable.crypto
+        if fresh_ttl is None:
+            fresh_ttl = float(os.environ.get('TIERED_FRESH_TTL', 30))
+        self.fresh_ttl = fresh_ttl
+        self.refresh_workers = refresh_workers or int(os.environ.get('TIERED_REFRESH_WORKERS', 2))
+
+        # Concurrent misses for one key share a single pull from Airtable
+        self.reads = SingleFlight('tiered')
+        # Bumped by every local write, so a pull that started before a
+        # write never overwrites it with the older record
+        self._generations = {}
+        self._lock = threading.Lock()
+        # Serialize the disk I/O of _apply per key, outside self._lock
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+        self._refreshing = set()
+        self._refresh_pool = None
+        self.counts = {"fresh": 0, "stale": 0, "miss": 0, "refreshed": 0, "refresh_errors": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _generation(self, key):
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    def _apply(self, key, fields, generation=None):
+        """Make the local tier match Airtable's fields for key (None = deleted)
+
+        With a generation, the update is dropped if a write happened since.
+        Returns False when it was dropped.
+        """
+        # The key lock keeps the generation check and the I/O it allows in
+        # one step; self._lock is only held for the check itself
+        with self._key_lock(key):
+            with self._lock:
+                current = self._generations.get(key, 0)
+                if generation is not None and generation != current:
+                    return False
+                self._generations[key] = current + 1
+            if fields is None:
+                self.state.remove(key)
+                self.backend.delete(key)
+                self.reads.forget(key)
+                return True
+
+            last_modified = fields.get('last_modified_time')
+            state = self.state.get(key)
+            if (last_modified is None or state is None or state[0] != last_modified
+                    or self.backend.get(key) is None):
+                # Ciphertext first: a crash before the state write only
+                # costs a re-pull
+                self.backend.put(key, fields['encrypted_value'], fields.get('data_type', 'content'))
+            self.state.set(key, last_modified, time.time())
+            self.reads.forget(key)
+            return True
+
+    def _pull(self, key):
+        """Fetch key from Airtable into the local tier; returns its fields or None"""
+        generation = self._generation(key)
+        pending = self.airtable.write_queue.pending_op(key) if self.airtable.write_queue is not None else None
+        if pending is not None:
+            # Airtable has not seen this write yet; the queue is newer
+            fields = None
+            if pending['op'] == 'store':
+                fields = {
+                    'encrypted_value': pending['encrypted_value'],
+                    'data_type': pending['data_type'],
+                    'last_modified_time': None
+                }
+        else:
+            fields = self.airtable.fetch_record(key)
+        self._apply(key, fields, generation)
+        return fields
+
+    def _get_refresh_pool(self):
+        with self._lock:
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers,
+                    thread_name_prefix='tiered-refresh'
+                )
+            return self._refresh_pool
+
+    def _schedule_refresh(self, key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._get_refresh_pool().submit(self._refresh, key)
+
+    def _refresh(self, key):
+        try:
+            self.reads.do(key, lambda: self._pull(key))
+            self._count("refreshed")
+            TIERED_REFRESHES.labels('ok').inc()
+        except Exception as e:
+            # The local copy keeps serving until Airtable answers again
+            self._count("refresh_errors")
+            TIERED_REFRESHES.labels('error').inc()
+            print(f"⚠️  Tiered refresh of '{key}' failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_encrypted(self, key):
+        """Return the envelope for key from the local tier or Airtable, or None"""
+        encrypted_value = self.backend.get(key)
+        state = self.state.get(key)
+        if encrypted_value is not None and state is not None:
+            if time.time() - state[1] < self.fresh_ttl:
+                result = "fresh"
+            else:
+                result = "stale"
+                self._schedule_refresh(key)
+            self._count(result)
+            TIERED_READS.labels(result).inc()
+            return encrypted_value
+
+        self._count("miss")
+        TIERED_READS.labels('miss').inc()
+        fields = self.reads.do(key, lambda: self._pull(key))
+        return None if fields is None else fields['encrypted_value']
+
+    def sync(self):
+        """Bring the whole local tier in line with Airtable in one table scan
+
+        Useful to warm a new cache directory; returns {"updated", "removed"}.
+        """
+        self.airtable.flush_writes()
+        seen = set()
+        updated = 0
+        pages = self.airtable.table.iterate(  # ← USES pyairtable
+            fields=['key', 'encrypted_value', 'data_type', 'last_modified_time']
+        )
+        for page in _timed_pages('list', pages):
+            for record in page:
+                fields = record['fields']
+                if 'key' not in fields or 'encrypted_value' not in fields:
+                    continue
+                seen.add(fields['key'])
+                state = self.state.get(fields['key'])
+                if state is None or state[0] != fields.get('last_modified_time'):
+                    updated += 1
+                self._apply(fields['key'], fields, self._generation(fields['key']))
+        removed = [key for key in self.state.ids() if key not in seen]
+        for key in removed:
+            self._apply(key, None, self._generation(key))
+        return {"updated": updated, "removed": len(removed)}
+
+    def tier_stats(self):
+        """Return local hit/miss and refresh counters"""
+        with self._lock:
+            return dict(self.counts, fresh_ttl=self.fresh_ttl, refreshing=len(self._refreshing))
+
+    def shutdown(self):
+        """Stop the background refresh workers"""
+        with self._lock:
+            pool, self._refresh_pool = self._refresh_pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    # SiteManager-compatible interface used by the Flask routes
+    def store_site_data(self, data_id, data, notes=None):
+        """Store encrypted site data with notes in Airtable, then locally - for Flask API"""
+        site_data = {
+            "data": data,
+            "notes": notes,
+            "timestamp": time.time()
+        }
+        encrypted_data = self.crypto.encrypt_data(site_data)
+        # Pulls already under way must not land after this write
+        with self._lock:
+            self._generations[data_id] = self._generations.get(data_id, 0) + 1
+        record = self.airtable.store_encrypted(
+            data_id, encrypted_data, 'content', self.airtable._blind_index_fields(site_data)
+        )
+        self._apply(data_id, {
+            'encrypted_value': encrypted_data,
+            'data_type': 'content',
+            'last_modified_time': record['fields'].get('last_modified_time') if record else None
+        })
+        return {"message": f"Data stored as {data_id}", "id": data_id}
+
+    def store_many(self, items):
+        """Store a batch in Airtable and drop the local copies, which are pulled on next read"""
+        result = self.airtable.store_many(items)
+        for item in items:
+            self._apply(item['key'], None)
+        return result
+
+    def retrieve_site_data(self, data_id):
+        """Retrieve and decrypt site data - for Flask API"""
+        return self.retrieve_site_data_if_changed(data_id)[0]
+
+    def retrieve_site_data_if_changed(self, data_id, etags=()):
+        """Return (site data or error, etag); site data is None when etag is in etags"""
+        encrypted_data = self.get_encrypted(data_id)
+        if encrypted_data is None:
+            return {"error": f"Data with ID '{data_id}' not found"}, None
+        etag = envelope_etag(encrypted_data)
+        if etag in etags:
+            return None, etag
+        return self.crypto.decrypt_data(encrypted_data), etag
+
+    def delete_site_data(self, data_id):
+        """Delete site data from Airtable and the local tier - for Flask API"""
+        with self._lock:
+            self._generations[data_id] = self._generations.get(data_id, 0) + 1
+        result = self.airtable.delete_site_data(data_id)
+        self._apply(data_id, None)
+        return result
+
+    def search_site_data(self, field, value):
+        """Blind-index search, answered by Airtable - for Flask API"""
+        return self.airtable.search_site_data(field, value)
+
+    def list_all_data(self):
+        """List all stored data, as Airtable has it"""
+        return self.airtable.list_all_data()
+
+    def list_data_page(self, limit, cursor=None):
+        """List one page of stored data, as Airtable has it"""
+        return self.airtable.list_data_page(limit, cursor)
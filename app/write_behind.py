@@ -0,0 +1,353 @@
+import os
+import json
+import time
+import fcntl
+import threading
+from .metrics import WRITE_BEHIND_FAILURES, WRITE_BEHIND_DEAD_LETTERED
+
+# Airtable allows about 5 requests per second per base
+DEFAULT_WRITE_RATE = 5.0
+MAX_BATCH_SIZE = 10
+MAX_BACKOFF = 30.0
+# Tries of one op sent on its own before it is moved to the dead-letter journal
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter"""
+
+    def __init__(self, rate=DEFAULT_WRITE_RATE, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available, then take them"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens live in a file, shared by every process using path
+
+    Each gunicorn worker drains its own journal; sharing one bucket per base
+    keeps their combined request rate at rate instead of rate x workers.
+    The clock must be comparable across processes, hence wall time.
+    """
+
+    def __init__(self, path, rate=DEFAULT_WRITE_RATE, capacity=None, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, capacity, clock, sleep)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def acquire(self, tokens=1):
+        """Block until tokens are available in the shared file, then take them"""
+        while True:
+            with self._lock, open(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600), 'r+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    self._tokens, self._updated = (float(value) for value in f.read().split())
+                except ValueError:
+                    # New (or torn) state file: start full
+                    self._tokens, self._updated = self.capacity, self._clock()
+                # Never refill backwards if wall time stepped back
+                self._updated = min(self._updated, self._clock())
+                self._refill()
+                taken = self._tokens >= tokens
+                if taken:
+                    self._tokens -= tokens
+                else:
+                    wait = (tokens - self._tokens) / self.rate
+                f.seek(0)
+                f.truncate()
+                f.write(f'{self._tokens!r} {self._updated!r}')
+            if taken:
+                return
+            self._sleep(wait)
+
+
+class WriteBehindQueue:
+    """Durable, coalescing write queue drained in the background
+
+    Every write is appended (and fsynced) to a JSON-lines journal before it is
+    acknowledged. A worker thread drains pending writes through apply_batch,
+    at most MAX_BATCH_SIZE operations of one kind per call and paced by a
+    token bucket. A newer write to a key replaces any pending one, and each
+    successful batch appends ack lines so a restart replays only what never
+    reached the backend.
+
+    When a batch fails, its ops are retried one at a time so a record the
+    backend rejects cannot hold up the others; an op that still fails after
+    max_attempts tries on its own is acked and appended to the dead-letter
+    journal (journal_path.dead) instead of blocking every later write.
+
+    Each process locks its own journal: if journal_path is held by another
+    worker, journal_path.1, journal_path.2, ... are tried in turn. Their
+    drain threads share one rate limit through journal_path.rate, but writes
+    to one key from different processes are not ordered against each other.
+    """
+
+    def __init__(self, apply_batch, journal_path, rate=DEFAULT_WRITE_RATE, limiter=None, start=True,
+                 max_attempts=None, retry_backoff=1.0):
+        self.apply_batch = apply_batch
+        self.limiter = limiter or SharedTokenBucket(f'{journal_path}.rate', rate)
+        self.journal_path = self._lock_journal(journal_path)
+        self.dead_letter_path = f'{self.journal_path}.dead'
+        if max_attempts is None:
+            max_attempts = int(os.environ.get('AIRTABLE_WRITE_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS))
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+
+        self._pending = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self.applied = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self.last_error = None
+        # seq -> failed tries, for ops that were in a failed batch
+        self._attempts = {}
+
+        self._replay()
+        self._journal = open(self.journal_path, 'a')
+        if start:
+            self.start()
+
+    def _lock_journal(self, journal_path):
+        directory = os.path.dirname(journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        suffix = 0
+        while True:
+            path = journal_path if suffix == 0 else f'{journal_path}.{suffix}'
+            lock_file = open(f'{path}.lock', 'w')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                suffix += 1
+                continue
+            self._lock_file = lock_file
+            return path
+
+    def _replay(self):
+        """Rebuild pending writes from ops in the journal that were never acked"""
+        if not os.path.exists(self.journal_path):
+            return
+
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final line from a crash mid-append
+                    continue
+                if 'ack' in entry:
+                    op = self._pending.get(entry['key'])
+                    if op is not None and op['seq'] <= entry['ack']:
+                        del self._pending[entry['key']]
+                else:
+                    self._pending[entry['key']] = entry
+                    self._seq = max(self._seq, entry['seq'])
+
+        if self._pending:
+            print(f"↩️  Replaying {len(self._pending)} pending writes from {self.journal_path}")
+        self._rewrite_journal()
+
+    def _rewrite_journal(self):
+        """Replace the journal with just the pending ops"""
+        tmp_path = f'{self.journal_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            for op in sorted(self._pending.values(), key=lambda op: op['seq']):
+                f.write(json.dumps(op) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _append(self, entries):
+        for entry in entries:
+            self._journal.write(json.dumps(entry) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _enqueue(self, op):
+        with self._cond:
+            self._seq += 1
+            op['seq'] = self._seq
+            self._append([op])
+            replaced = self._pending.get(op['key'])
+            if replaced is not None:
+                self.coalesced += 1
+                # The newer op starts with a clean slate
+                self._attempts.pop(replaced['seq'], None)
+            self._pending[op['key']] = op
+            self._cond.notify_all()
+
+    def enqueue_store(self, key, encrypted_value, data_type='content', index_fields=None):
+        """Journal a store; it is durable once this returns"""
+        op = {
+            'op': 'store',
+            'key': key,
+            'encrypted_value': encrypted_value,
+            'data_type': data_type
+        }
+        if index_fields:
+            op['index_fields'] = index_fields
+        self._enqueue(op)
+
+    def enqueue_delete(self, key):
+        """Journal a delete; it is durable once this returns"""
+        self._enqueue({'op': 'delete', 'key': key})
+
+    def pending_op(self, key):
+        """Return the pending op for a key, if any"""
+        with self._cond:
+            return self._pending.get(key)
+
+    def depth(self):
+        """Number of keys waiting to be written"""
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        """Return queue depth and drain counters"""
+        return {
+            "depth": self.depth(),
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "dead_lettered": self.dead_lettered,
+            "retrying": len(self._attempts),
+            "last_error": self.last_error,
+            "journal": self.journal_path,
+            "dead_letter_journal": self.dead_letter_path
+        }
+
+    def _next_batch(self):
+        """Oldest pending op plus up to MAX_BATCH_SIZE - 1 more of the same kind
+
+        Ops from a failed batch go alone, to isolate the one being rejected.
+        """
+        ops = sorted(self._pending.values(), key=lambda op: op['seq'])
+        if ops[0]['seq'] in self._attempts:
+            return ops[:1]
+        kind = ops[0]['op']
+        return [op for op in ops if op['op'] == kind and op['seq'] not in self._attempts][:MAX_BATCH_SIZE]
+
+    def _acknowledge(self, batch):
+        """Ack ops that are done with (applied or dead-lettered); caller holds _cond"""
+        acks = []
+        for op in batch:
+            self._attempts.pop(op['seq'], None)
+            acks.append({'ack': op['seq'], 'key': op['key']})
+            # Leave the key pending if it was rewritten during the call
+            if self._pending.get(op['key']) is op:
+                del self._pending[op['key']]
+        self._append(acks)
+        if not self._pending:
+            self._journal.close()
+            self._rewrite_journal()
+            self._journal = open(self.journal_path, 'a')
+        self._cond.notify_all()
+
+    def _failed(self, batch, error):
+        """Count a failed try of batch; dead-letters a lone op out of attempts"""
+        self.failures += 1
+        self.last_error = str(error)
+        WRITE_BEHIND_FAILURES.inc()
+        with self._cond:
+            # Ops replaced by a newer write during the call are not retried
+            live = [op for op in batch if self._pending.get(op['key']) is op]
+            for op in live:
+                self._attempts[op['seq']] = self._attempts.get(op['seq'], 0) + 1
+            op = batch[0]
+            if len(batch) > 1 or not live or self._attempts[op['seq']] < self.max_attempts:
+                return False
+            with open(self.dead_letter_path, 'a') as f:
+                f.write(json.dumps(dict(op, error=str(error), failed_at=time.time())) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.dead_lettered += 1
+            WRITE_BEHIND_DEAD_LETTERED.inc()
+            print(f"☠️  Write-behind {op['op']} of '{op['key']}' failed {self.max_attempts} times; "
+                  f"moved to {self.dead_letter_path}: {error}")
+            self._acknowledge(batch)
+            return True
+
+    def _run(self):
+        backoff = self.retry_backoff
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                batch = self._next_batch()
+
+            self.limiter.acquire()
+            try:
+                self.apply_batch(batch)
+            except Exception as e:
+                if self._failed(batch, e):
+                    backoff = self.retry_backoff
+                    continue
+                print(f"❌ Write-behind batch failed, retrying in {backoff:.0f}s: {e}")
+                with self._cond:
+                    self._cond.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = self.retry_backoff
+
+            with self._cond:
+                self.applied += len(batch)
+                self._acknowledge(batch)
+
+    def start(self):
+        """Start the background drain thread"""
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='airtable-write-behind', daemon=True)
+            self._thread.start()
+
+    def flush(self, timeout=None):
+        """Block until every pending write is applied; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self, drain=True, timeout=None):
+        """Stop the worker, by default after draining the queue"""
+        if drain:
+            self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
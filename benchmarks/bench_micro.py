@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the encryption and site-data hot paths
+
+    python benchmarks/bench_micro.py --json bench.json
+    python benchmarks/bench_micro.py --compare bench.json --threshold 0.15
+
+Covers DataEncryptor.encrypt_data/decrypt_data across payload sizes and
+input types, SiteManager.store_site_data/retrieve_site_data/list_all_data
+across store sizes, and build_site_data/load_site_data. Results are JSON;
+--compare exits non-zero when a metric's mean time regresses past the
+threshold relative to a baseline file.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import argparse
+import tempfile
+import contextlib
+
+# Add the project root so app imports when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_PAYLOAD_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_SITE_SIZES = [10, 100, 1_000, 10_000]
+
+
+def format_size(size):
+    for unit, scale in (('MB', 1_000_000), ('KB', 1_000)):
+        if size >= scale:
+            return f"{size // scale}{unit}"
+    return f"{size}B"
+
+
+def measure(func, min_time=0.2, max_iterations=10_000):
+    """Call func repeatedly for at least min_time and return per-call timings"""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_iterations and (len(timings) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    mean = sum(timings) / len(timings)
+    return {
+        "iterations": len(timings),
+        "mean_s": mean,
+        "min_s": min(timings),
+        "ops_per_s": 1.0 / mean if mean else 0.0
+    }
+
+
+def make_payload(kind, size):
+    if kind == 'str':
+        return 'x' * size
+    # Roughly size bytes of JSON spread over many small fields
+    field = 'y' * 40
+    return {f"k{i}": field for i in range(max(1, size // 50))}
+
+
+def bench_encryption(results, payload_sizes, min_time):
+    from app.encryption import DataEncryptor
+
+    encryptor = DataEncryptor()
+    for kind in ('str', 'dict'):
+        for size in payload_sizes:
+            payload = make_payload(kind, size)
+            ciphertext = encryptor.encrypt_data(payload)
+            label = f"{kind}/{format_size(size)}"
+            results[f"encrypt_data/{label}"] = measure(lambda: encryptor.encrypt_data(payload), min_time)
+            results[f"decrypt_data/{label}"] = measure(lambda: encryptor.decrypt_data(ciphertext), min_time)
+
+
+def bench_site_manager(results, site_sizes, min_time, backend='file'):
+    from app.site_manager import SiteManager
+    from app.storage import create_backend
+
+    # File backend metrics keep their original names so old baselines still compare
+    suffix = '' if backend == 'file' else f'/{backend}'
+    for count in site_sizes:
+        tmp_dir = tempfile.mkdtemp(prefix='bench_site_')
+        try:
+            manager = SiteManager(data_dir=tmp_dir, backend=create_backend(tmp_dir, backend))
+
+            start = time.perf_counter()
+            for i in range(count):
+                manager.store_site_data(f"item_{i:06d}", f"value {i}", notes="bench")
+            elapsed = time.perf_counter() - start
+            results[f"store_site_data/{count}{suffix}"] = {
+                "iterations": count,
+                "mean_s": elapsed / count,
+                "min_s": elapsed / count,
+                "ops_per_s": count / elapsed if elapsed else 0.0
+            }
+
+            middle = f"item_{count // 2:06d}"
+            results[f"retrieve_site_data/{count}{suffix}"] = measure(lambda: manager.retrieve_site_data(middle), min_time)
+            results[f"list_all_data/{count}{suffix}"] = measure(manager.list_all_data, min_time, max_iterations=200)
+            results[f"list_data_page/{count}{suffix}"] = measure(lambda: manager.list_data_page(50), min_time, max_iterations=200)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+def bench_build(results, min_time):
+    from app.site_manager import SiteManager
+
+    tmp_dir = tempfile.mkdtemp(prefix='bench_build_')
+    try:
+        manager = SiteManager(data_dir=tmp_dir)
+        # build/load print progress; keep benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            # force=True re-encrypts every section; without it, builds after
+            # the first skip all sections as unchanged
+            results["build_site_data"] = measure(
+                lambda: manager.build_site_data(force=True), min_time, max_iterations=200
+            )
+            results["build_site_data/noop"] = measure(manager.build_site_data, min_time, max_iterations=200)
+            results["load_site_data"] = measure(manager.load_site_data, min_time, max_iterations=200)
+            results["load_sections/1"] = measure(
+                lambda: manager.load_sections(['site_config']), min_time, max_iterations=200
+            )
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def compare_results(baseline, current, threshold, patterns=None):
+    """Return (name, baseline_mean, current_mean, change) for every regression past threshold"""
+    regressions = []
+    for name, base in baseline.get("metrics", {}).items():
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            continue
+        now = current.get("metrics", {}).get(name)
+        if now is None or not base.get("mean_s"):
+            continue
+        change = now["mean_s"] / base["mean_s"] - 1.0
+        if change > threshold:
+            regressions.append((name, base["mean_s"], now["mean_s"], change))
+    return regressions
+
+
+def missing_metrics(baseline, current, patterns=None):
+    """Return compared baseline metrics absent from current, plus --metric globs that matched nothing"""
+    produced = current.get("metrics", {})
+    missing = [
+        name for name in baseline.get("metrics", {})
+        if (not patterns or any(fnmatch.fnmatch(name, p) for p in patterns)) and name not in produced
+    ]
+    for pattern in patterns or ():
+        if not any(fnmatch.fnmatch(name, pattern) for name in produced):
+            missing.append(pattern)
+    return missing
+
+
+def print_results(metrics):
+    print(f"{'metric':<34} {'iters':>7} {'mean':>12} {'ops/s':>12}")
+    for name, m in metrics.items():
+        print(f"{name:<34} {m['iterations']:>7} {m['mean_s'] * 1e6:>10.1f}µs {m['ops_per_s']:>12.1f}")
+
+
+def parse_sizes(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for encryption and site-data hot paths")
+    parser.add_argument('--payload-sizes', type=parse_sizes, default=DEFAULT_PAYLOAD_SIZES,
+                        help="Comma-separated payload sizes in bytes")
+    parser.add_argument('--site-sizes', type=parse_sizes, default=DEFAULT_SITE_SIZES,
+                        help="Comma-separated stored item counts (up to 100000)")
+    parser.add_argument('--site-backend', choices=['file', 'sqlite', 'log'], default='file',
+                        help="SiteManager storage backend to benchmark")
+    parser.add_argument('--min-time', type=float, default=0.2, help="Seconds to spend on each metric")
+    parser.add_argument('--only', choices=['encryption', 'site', 'build'], action='append',
+                        help="Run only these groups (repeatable)")
+    parser.add_argument('--json', dest='json_path', help="Write results as JSON to this path")
+    parser.add_argument('--compare', help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Allowed slowdown before a metric counts as a regression (0.10 = 10%%)")
+    parser.add_argument('--metric', action='append',
+                        help="Glob of metric names to compare (repeatable; default all)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('LOCAL_PASSCODE_FOR_SITE_DATA', 'benchmark_passcode')
+
+    groups = args.only or ['encryption', 'site', 'build']
+    metrics = {}
+    if 'encryption' in groups:
+        bench_encryption(metrics, args.payload_sizes, args.min_time)
+    if 'site' in groups:
+        bench_site_manager(metrics, args.site_sizes, args.min_time, args.site_backend)
+    if 'build' in groups:
+        bench_build(metrics, args.min_time)
+
+    results = {
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+        "metrics": metrics
+    }
+    print_results(metrics)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📁 Results written to {args.json_path}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.threshold, args.metric)
+        # A renamed or broken benchmark must not pass by producing nothing
+        missing = missing_metrics(baseline, results, args.metric)
+        if missing:
+            print(f"\n❌ {len(missing)} metric(s) expected but not produced (narrow with --metric):")
+            for name in missing:
+                print(f"   {name}")
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) regressed more than {args.threshold:.0%}:")
+            for name, before, after, change in regressions:
+                print(f"   {name}: {before * 1e6:.1f}µs -> {after * 1e6:.1f}µs (+{change:.0%})")
+        if missing or regressions:
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
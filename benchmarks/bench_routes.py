@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the Flask API
+
+Starts benchmarks/fake_airtable.py in-process, serves create_app() on a
+local threaded WSGI server pointed at it, and drives every endpoint with
+concurrent keep-alive clients. Reports requests/sec and p50/p95/p99 latency.
+
+    python benchmarks/bench_routes.py --requests 200 --concurrency 8 --latency 0.05
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Add the project root so app and benchmarks import when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_airtable import FakeAirtableServer
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(name, latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "endpoint": name,
+        "requests": len(latencies),
+        "errors": sum(1 for status in statuses if status >= 400),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000
+    }
+
+
+class RouteBenchmark:
+    def __init__(self, base_url, requests_per_endpoint, concurrency):
+        self.base_url = base_url
+        self.requests_per_endpoint = requests_per_endpoint
+        self.concurrency = concurrency
+        self._local = threading.local()
+
+    def _session(self):
+        # One keep-alive session per client thread
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def run(self, name, make_request):
+        """Send requests_per_endpoint requests built by make_request(i)"""
+        def one(i):
+            method, path, body = make_request(i)
+            start = time.perf_counter()
+            response = self._session().request(method, self.base_url + path, json=body)
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            results = list(pool.map(one, range(self.requests_per_endpoint)))
+        elapsed = time.perf_counter() - start
+        return summarize(name, [r[0] for r in results], [r[1] for r in results], elapsed)
+
+
+def scenarios(ciphertext, batch_size):
+    """(name, request builder) for every endpoint, in an order that leaves data to read"""
+    return [
+        ("POST /encrypt", lambda i: ('POST', '/encrypt', {"data": f"benchmark payload {i}"})),
+        ("POST /decrypt", lambda i: ('POST', '/decrypt', {"encrypted_data": ciphertext})),
+        ("POST /encrypt/batch", lambda i: (
+            'POST', '/encrypt/batch', {"items": [f"item {i}-{j}" for j in range(batch_size)]}
+        )),
+        ("POST /decrypt/batch", lambda i: (
+            'POST', '/decrypt/batch', {"items": [ciphertext] * batch_size}
+        )),
+        ("POST /site-data", lambda i: ('POST', '/site-data', {
+            "data_id": f"bench_{i}", "data": f"value {i}", "notes": "benchmark"
+        })),
+        ("POST /site-data/bulk", lambda i: ('POST', '/site-data/bulk', {"items": [
+            {"data_id": f"bulk_{i}_{j}", "data": f"value {j}"} for j in range(batch_size)
+        ]})),
+        ("GET /site-data/<id>", lambda i: ('GET', f'/site-data/bench_{i}', None)),
+        ("GET /site-data?limit=50", lambda i: ('GET', '/site-data?limit=50', None)),
+        ("GET /site-data", lambda i: ('GET', '/site-data', None)),
+        ("DELETE /site-data/<id>", lambda i: ('DELETE', f'/site-data/bench_{i}', None)),
+    ]
+
+
+def print_table(results):
+    print(f"{'endpoint':<26} {'reqs':>6} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        print(f"{r['endpoint']:<26} {r['requests']:>6} {r['errors']:>6} {r['rps']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app.routes against a local fake Airtable")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent client threads")
+    parser.add_argument('--batch-size', type=int, default=10, help="Items per batch/bulk request")
+    parser.add_argument('--latency', type=float, default=0.0, help="Fake Airtable latency per request (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Fake Airtable random extra latency (s)")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Fake Airtable requests/sec before 429 (0 = off)")
+    parser.add_argument('--json', dest='json_path', help="Also write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    fake = FakeAirtableServer(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit).start()
+
+    os.environ.setdefault('LOCAL_PASSCODE_FOR_SITE_DATA', 'benchmark_passcode')
+    os.environ['AIRTABLE_KEY'] = 'benchmark_key'
+    os.environ['AIRTABLE_BASE_ID'] = 'appBenchmark'
+    os.environ['AIRTABLE_ENDPOINT_URL'] = fake.url
+
+    # Import only after the environment points at the fake server
+    from werkzeug.serving import make_server
+    from app.routes import create_app, EXTENSION
+
+    app = create_app()
+    encryptor = app.extensions[EXTENSION].encryptor
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print("⏱️  Benchmarking Flask API")
+    print(f"   app: {base_url}  fake airtable: {fake.url}")
+    print(f"   {args.requests} requests/endpoint, concurrency {args.concurrency}, "
+          f"airtable latency {args.latency * 1000:.0f} ms, rate limit {args.rate_limit or 'off'}\n")
+
+    bench = RouteBenchmark(base_url, args.requests, args.concurrency)
+    results = []
+    try:
+        ciphertext = encryptor.encrypt_data("benchmark ciphertext")
+        for name, make_request in scenarios(ciphertext, args.batch_size):
+            results.append(bench.run(name, make_request))
+    finally:
+        server.shutdown()
+        fake_stats = fake.state.stats()
+        fake.stop()
+
+    print_table(results)
+    print(f"\n🧪 Fake Airtable: {fake_stats['requests']} requests, {fake_stats['rate_limited']} rate limited")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({"config": vars(args), "results": results, "airtable": fake_stats}, f, indent=2)
+        print(f"📁 Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Flask app
+
+Each run is a fresh interpreter, like a new gunicorn worker or a Render
+cold start. Reports the time to import app.routes, to build the app with
+create_app(), and to answer the first /encrypt request, for lazy services
+and for services built up front (PRELOAD_SERVICES).
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line of timings
+PROBE = """
+import sys, json, time
+start = time.perf_counter()
+from app.routes import create_app
+imported = time.perf_counter()
+app = create_app({'PRELOAD_SERVICES': %(preload)r, 'SWAGGER_ENABLED': %(swagger)r})
+created = time.perf_counter()
+response = app.test_client().post('/encrypt', json={'data': 'cold start'})
+assert response.status_code == 200, response.status_code
+first = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'create_app_s': created - imported,
+    'first_request_s': first - created,
+    'pyairtable_loaded': 'pyairtable' in sys.modules
+}))
+"""
+
+
+def probe(preload, swagger):
+    env = dict(os.environ)
+    env.setdefault('LOCAL_PASSCODE_FOR_SITE_DATA', 'benchmark_passcode')
+    env.setdefault('AIRTABLE_KEY', 'benchmark_key')
+    env.setdefault('AIRTABLE_BASE_ID', 'appBenchmark')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE % {'preload': preload, 'swagger': swagger}],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    keys = ('import_s', 'create_app_s', 'first_request_s')
+    result = {key: min(sample[key] for sample in samples) for key in keys}
+    result['total_s'] = sum(result[key] for key in keys)
+    result['pyairtable_loaded'] = samples[-1]['pyairtable_loaded']
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import and first-request time in fresh interpreters")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters per mode (best run is reported)")
+    parser.add_argument('--no-swagger', action='store_true', help="Build the app with SWAGGER_ENABLED off")
+    parser.add_argument('--json', dest='json_path', help="Also write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    swagger = not args.no_swagger
+    results = {}
+    for mode, preload in (('lazy', False), ('preload', True)):
+        results[mode] = summarize([probe(preload, swagger) for _ in range(args.runs)])
+
+    print(f"{'mode':<9} {'import':>9} {'create_app':>11} {'1st request':>12} {'total':>9}  pyairtable")
+    for mode, r in results.items():
+        print(f"{mode:<9} {r['import_s'] * 1000:>7.1f}ms {r['create_app_s'] * 1000:>9.1f}ms "
+              f"{r['first_request_s'] * 1000:>10.1f}ms {r['total_s'] * 1000:>7.1f}ms  "
+              f"{'loaded' if r['pyairtable_loaded'] else 'not loaded'}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📁 Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
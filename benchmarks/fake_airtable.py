@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the subset of the Airtable REST API used by pyairtable
+and AsyncAirtableManager: list (with filterByFormula / fields / pageSize /
+offset), get, create, update, upsert, delete and their batch forms.
+
+Formulas support field equality ({key}='value') combined with OR(...) or
+AND(...), which is what pyairtable.formulas.match() produces.
+
+    python benchmarks/fake_airtable.py --port 8765 --latency 0.05 --rate-limit 5
+
+then point the app at it with AIRTABLE_ENDPOINT_URL=http://127.0.0.1:8765
+"""
+import re
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SIZE = 10
+EQUALITY = re.compile(r"\{([^}]+)\}\s*=\s*'((?:[^'\\]|\\.)*)'")
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def _record_id():
+    return 'rec' + ''.join(random.choices(string.ascii_letters + string.digits, k=14))
+
+
+def _formula_matches(formula, fields):
+    conditions = [
+        (field, value.replace("\\'", "'").replace('\\\\', '\\'))
+        for field, value in EQUALITY.findall(formula)
+    ]
+    if not conditions:
+        return True
+    results = [str(fields.get(field, '')) == value for field, value in conditions]
+    if formula.lstrip().upper().startswith('AND('):
+        return all(results)
+    return any(results)
+
+
+class FakeAirtable:
+    """In-memory Airtable state shared by all request handler threads"""
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=0, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.tables = defaultdict(dict)
+        self.lock = threading.Lock()
+        self.request_counts = defaultdict(int)
+        self.rate_limited = 0
+        self._recent = defaultdict(deque)
+
+    def throttle(self, base_id):
+        """Return True if this request should get a 429"""
+        if self.error_rate and random.random() < self.error_rate:
+            return True
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            recent = self._recent[base_id]
+            while recent and recent[0] <= now - 1.0:
+                recent.popleft()
+            if len(recent) >= self.rate_limit:
+                return True
+            recent.append(now)
+        return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": dict(self.request_counts),
+                "rate_limited": self.rate_limited,
+                "records": sum(len(t) for t in self.tables.values())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.tables.clear()
+            self.request_counts.clear()
+            self.rate_limited = 0
+
+    # Record operations; callers hold self.lock
+
+    def _create(self, table, fields):
+        now = _now()
+        record = {
+            'id': _record_id(),
+            'createdTime': now,
+            'fields': dict(fields, created_time=now, last_modified_time=now)
+        }
+        table[record['id']] = record
+        return record
+
+    def _update(self, record, fields, replace=False):
+        kept = {k: record['fields'][k] for k in ('created_time',) if k in record['fields']}
+        if replace:
+            record['fields'] = dict(kept, **fields)
+        else:
+            record['fields'].update(fields)
+        record['fields']['last_modified_time'] = _now()
+        return record
+
+    def list(self, table, options):
+        formula = options.get('filterByFormula')
+        records = [
+            r for r in table.values()
+            if not formula or _formula_matches(formula, r['fields'])
+        ]
+        for sort in reversed(options.get('sort', [])):
+            records.sort(
+                key=lambda r: str(r['fields'].get(sort['field'], '')),
+                reverse=sort.get('direction') == 'desc'
+            )
+        if options.get('maxRecords'):
+            records = records[:int(options['maxRecords'])]
+
+        start = int(options.get('offset') or 0)
+        size = min(int(options.get('pageSize') or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        fields = options.get('fields')
+        page = []
+        for record in records[start:start + size]:
+            if fields:
+                record = dict(record, fields={k: v for k, v in record['fields'].items() if k in fields})
+            page.append(record)
+
+        body = {'records': page}
+        if start + size < len(records):
+            body['offset'] = str(start + size)
+        return body
+
+
+class FakeAirtableHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeAirtable/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send(self, status, body=None, headers=None):
+        payload = json.dumps(body if body is not None else {}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, error_type, message=''):
+        self._send(status, {'error': {'type': error_type, 'message': message}})
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _query_options(self, query):
+        params = parse_qs(query)
+        options = {k: v[0] for k, v in params.items() if not k.endswith('[]') and '[' not in k}
+        if 'fields[]' in params:
+            options['fields'] = params['fields[]']
+        if 'records[]' in params:
+            options['records'] = params['records[]']
+        sorts = defaultdict(dict)
+        for name, values in params.items():
+            match = re.match(r'sort\[(\d+)\]\[(\w+)\]', name)
+            if match:
+                sorts[int(match.group(1))][match.group(2)] = values[0]
+        if sorts:
+            options['sort'] = [sorts[i] for i in sorted(sorts)]
+        return options
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip('/').split('/')]
+        if len(parts) < 3 or parts[0] != 'v0':
+            self._body()
+            return self._error(404, 'NOT_FOUND')
+
+        base_id, table_name = parts[1], parts[2]
+        rest = parts[3:]
+        state = self.state
+        # Always drain the body so the keep-alive connection stays in sync
+        body = self._body() if method in ('POST', 'PATCH', 'PUT') else {}
+
+        if state.latency or state.jitter:
+            time.sleep(state.latency + random.uniform(0, state.jitter))
+
+        with state.lock:
+            state.request_counts[method] += 1
+
+        if state.throttle(base_id):
+            with state.lock:
+                state.rate_limited += 1
+            return self._send(429, {
+                'errors': [{'error': 'RATE_LIMIT_REACHED', 'message': 'Rate limit exceeded. Please try again later'}]
+            }, headers={'Retry-After': '1'})
+
+        options = self._query_options(url.query)
+
+        with state.lock:
+            table = state.tables[(base_id, table_name)]
+
+            if method == 'GET' and not rest:
+                return self._send(200, state.list(table, options))
+
+            if method == 'POST' and rest == ['listRecords']:
+                return self._send(200, state.list(table, body))
+
+            if method == 'GET' and len(rest) == 1:
+                record = table.get(rest[0])
+                if record is None:
+                    return self._error(404, 'NOT_FOUND')
+                return self._send(200, record)
+
+            if method == 'POST' and not rest:
+                if 'records' in body:
+                    if len(body['records']) > MAX_BATCH_SIZE:
+                        return self._error(422, 'INVALID_RECORDS', 'Too many records')
+                    return self._send(200, {
+                        'records': [state._create(table, r.get('fields', {})) for r in body['records']]
+                    })
+                return self._send(200, state._create(table, body.get('fields', {})))
+
+            if method in ('PATCH', 'PUT') and len(rest) == 1:
+                record = table.get(rest[0])
+                if record is None:
+                    return self._error(404, 'NOT_FOUND')
+                return self._send(200, state._update(record, body.get('fields', {}), method == 'PUT'))
+
+            if method in ('PATCH', 'PUT') and not rest:
+                records = body.get('records', [])
+                if len(records) > MAX_BATCH_SIZE:
+                    return self._error(422, 'INVALID_RECORDS', 'Too many records')
+                upsert = body.get('performUpsert')
+                result = {'records': []}
+                if upsert:
+                    result['createdRecords'] = []
+                    result['updatedRecords'] = []
+                for item in records:
+                    fields = item.get('fields', {})
+                    if 'id' in item:
+                        record = table.get(item['id'])
+                        if record is None:
+                            return self._error(404, 'NOT_FOUND')
+                        result['records'].append(state._update(record, fields, method == 'PUT'))
+                        continue
+                    merge_on = (upsert or {}).get('fieldsToMergeOn', [])
+                    existing = [
+                        r for r in table.values()
+                        if merge_on and all(r['fields'].get(f) == fields.get(f) for f in merge_on)
+                    ]
+                    if existing:
+                        result['records'].append(state._update(existing[0], fields, method == 'PUT'))
+                        result['updatedRecords'].append(existing[0]['id'])
+                    elif upsert:
+                        record = state._create(table, fields)
+                        result['records'].append(record)
+                        result['createdRecords'].append(record['id'])
+                    else:
+                        return self._error(422, 'INVALID_RECORDS', 'Record id required')
+                return self._send(200, result)
+
+            if method == 'DELETE' and len(rest) == 1:
+                if table.pop(rest[0], None) is None:
+                    return self._error(404, 'NOT_FOUND')
+                return self._send(200, {'id': rest[0], 'deleted': True})
+
+            if method == 'DELETE' and not rest:
+                record_ids = options.get('records', [])
+                if len(record_ids) > MAX_BATCH_SIZE:
+                    return self._error(422, 'INVALID_RECORDS', 'Too many records')
+                missing = [record_id for record_id in record_ids if record_id not in table]
+                if missing:
+                    return self._error(404, 'NOT_FOUND')
+                for record_id in record_ids:
+                    del table[record_id]
+                return self._send(200, {'records': [{'id': i, 'deleted': True} for i in record_ids]})
+
+        return self._error(404, 'NOT_FOUND')
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class FakeAirtableServer:
+    """Run a FakeAirtable on a background thread
+
+        with FakeAirtableServer(latency=0.05) as server:
+            os.environ['AIRTABLE_ENDPOINT_URL'] = server.url
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, **options):
+        self.state = FakeAirtable(**options)
+        self.httpd = ThreadingHTTPServer((host, port), FakeAirtableHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-airtable', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake Airtable REST server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per second per base before 429 (0 = off)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args(argv)
+
+    server = FakeAirtableServer(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter,
+        rate_limit=args.rate_limit, error_rate=args.error_rate
+    )
+    print(f"🧪 Fake Airtable listening on {server.url}")
+    print(f"   export AIRTABLE_ENDPOINT_URL={server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
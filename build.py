@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 """
 Build script for encrypted site data
+
+Only sections whose content changed since the last build are re-encrypted;
+pass --force to rebuild everything.
 """
+import argparse
 from app.site_manager import SiteManager
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build encrypted site data")
+    parser.add_argument('--force', action='store_true', help="Re-encrypt every section, changed or not")
+    parser.add_argument('--workers', type=int, help="Encryption workers (default: BUILD_WORKERS or CPU count)")
+    args = parser.parse_args(argv)
+
     print("🔐 Building encrypted site data...")
     
     site_manager = SiteManager()
-    site_manager.build_site_data()
+    summary = site_manager.build_site_data(force=args.force, max_workers=args.workers)
+    print(f"   rebuilt: {', '.join(summary['rebuilt']) or '-'}")
+    print(f"   skipped: {', '.join(summary['skipped']) or '-'}")
+    if summary['removed']:
+        print(f"   removed: {', '.join(summary['removed'])}")
     
     # Verify the data can be decrypted
     print("\n🔓 Verifying encryption...")
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Migrate stored site data from site/data/<id>.enc files into a SQLite database
+
+    python migrate_site_data.py                      # site/data -> site/data/site_data.db
+    python migrate_site_data.py --db /var/lib/site.db --remove-files
+
+Then run the API with SITE_STORAGE_BACKEND=sqlite (and SITE_SQLITE_PATH if
+--db was given). Re-running is safe; records are upserted.
+"""
+import argparse
+from app.site_manager import SiteManager
+from app.storage import DEFAULT_DATA_DIR, SQLITE_FILENAME, SQLiteBackend
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate .enc site data files into SQLite")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Directory holding <id>.enc files")
+    parser.add_argument('--db', help=f"SQLite database path (default <data-dir>/{SQLITE_FILENAME})")
+    parser.add_argument('--remove-files', action='store_true', help="Delete each .enc file once migrated")
+    args = parser.parse_args()
+
+    print("🔐 Migrating encrypted site data to SQLite...")
+    backend = SQLiteBackend(args.db or f'{args.data_dir}/{SQLITE_FILENAME}')
+    site_manager = SiteManager(data_dir=args.data_dir, backend=backend)
+    site_manager.migrate_from_files(remove_files=args.remove_files)
+    print(f"📁 {len(backend.list_ids())} records now in {backend.path}")
+
+if __name__ == '__main__':
+    main()
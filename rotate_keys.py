@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Re-encrypt stored site data under a new LOCAL_PASSCODE_FOR_SITE_DATA
+
+    export OLD_PASSCODE_FOR_SITE_DATA=... NEW_PASSCODE_FOR_SITE_DATA=...
+    python rotate_keys.py --target site --checkpoint rotation.log
+    python rotate_keys.py --target airtable --checkpoint rotation.log --workers 8
+
+Passcodes are read from the environment, never the command line (the old
+one defaults to LOCAL_PASSCODE_FOR_SITE_DATA). Re-running with the same
+--checkpoint resumes where a killed run stopped. Once a target has no
+unreadable records its blind index is rebuilt under the new passcode
+(skip with --no-reindex). Afterwards set LOCAL_PASSCODE_FOR_SITE_DATA to
+the new passcode and run build.py, which re-encrypts every section since
+their content hashes change with the key.
+"""
+import os
+import sys
+import argparse
+from app.rotation import (KeyRotation, SiteRotationTarget, AirtableRotationTarget, DEFAULT_BATCH_SIZE,
+                          rebuild_blind_index)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-encrypt stored data from an old passcode to a new one")
+    parser.add_argument('--target', choices=['site', 'airtable', 'all'], default='all',
+                        help="Which store to rotate")
+    parser.add_argument('--data-dir', help="SiteManager data directory (default site/data)")
+    parser.add_argument('--checkpoint', help="Progress log; re-run with the same path to resume")
+    parser.add_argument('--workers', type=int, help="Re-encryption workers (default: ROTATION_WORKERS or CPU count)")
+    parser.add_argument('--executor', choices=['thread', 'process'], help="Worker pool type (default process)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Records per read/write batch")
+    parser.add_argument('--no-reindex', action='store_true',
+                        help="Do not rebuild the blind-index tokens after rotating")
+    args = parser.parse_args(argv)
+
+    old_passcode = os.environ.get('OLD_PASSCODE_FOR_SITE_DATA') or os.environ.get('LOCAL_PASSCODE_FOR_SITE_DATA')
+    new_passcode = os.environ.get('NEW_PASSCODE_FOR_SITE_DATA')
+    if not old_passcode or not new_passcode:
+        print("❌ Set OLD_PASSCODE_FOR_SITE_DATA (or LOCAL_PASSCODE_FOR_SITE_DATA) and NEW_PASSCODE_FOR_SITE_DATA")
+        return 2
+
+    # The managers build their own encryptors from the environment; the
+    # rotation itself only uses the passcodes passed to KeyRotation
+    os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = old_passcode
+    managers = {}
+    if args.target in ('site', 'all'):
+        from app.site_manager import SiteManager
+        managers['site'] = lambda: SiteManager(data_dir=args.data_dir)
+    if args.target in ('airtable', 'all'):
+        from app.airtable_manager import AirtableManager
+        managers['airtable'] = AirtableManager
+    targets = []
+    if 'site' in managers:
+        targets.append(SiteRotationTarget(managers['site']()))
+    if 'airtable' in managers:
+        targets.append(AirtableRotationTarget(managers['airtable']()))
+
+    rotation = KeyRotation(old_passcode, new_passcode, max_workers=args.workers,
+                           executor=args.executor, batch_size=args.batch_size)
+    failed = False
+    rotated = []
+    try:
+        for target in targets:
+            print(f"🔑 Rotating {target.name} records...")
+            summary = rotation.run(
+                target, args.checkpoint,
+                progress=lambda s: print(f"   {s['rotated']} rotated, {s['skipped']} resumed past", end='\r')
+            )
+            print(f"\n✅ {target.name}: {summary['rotated']} rotated, {summary['already_current']} already current, "
+                  f"{summary['skipped']} skipped via checkpoint")
+            for data_id, error in summary['errors'].items():
+                failed = True
+                print(f"❌ {data_id}: {error}")
+            if not summary['errors']:
+                rotated.append(target.name)
+    finally:
+        rotation.shutdown()
+
+    if not args.no_reindex and rotated:
+        # Blind-index tokens are keyed by the passcode, so they are
+        # recomputed by managers that use the new one
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = new_passcode
+        for name in rotated:
+            count = rebuild_blind_index(name, managers[name](), args.checkpoint)
+            if count is None:
+                print(f"✅ {name}: blind index already rebuilt (checkpoint)")
+            else:
+                print(f"✅ {name}: blind index rebuilt for {count} records")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
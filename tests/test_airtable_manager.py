@@ -0,0 +1,333 @@
+import unittest
+import os
+import re
+import sys
+import itertools
+import types
+import shutil
+import tempfile
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from requests import Response
+from requests.exceptions import HTTPError
+
+from app.airtable_manager import AirtableManager
+
+class FakeTable:
+    """In-memory stand-in for pyairtable.Table that counts API calls"""
+
+    def __init__(self, page_size=100):
+        self.records = {}
+        self.calls = []
+        self.page_size = page_size
+        self._ids = itertools.count(1)
+        self.api = self
+        self.urls = types.SimpleNamespace(records='records', records_post='records/listRecords')
+
+    def _not_found(self):
+        response = Response()
+        response.status_code = 404
+        return HTTPError("404 Not Found", response=response)
+
+    def _project(self, record, fields):
+        if not fields:
+            return {'id': record['id'], 'fields': dict(record['fields'])}
+        return {
+            'id': record['id'],
+            'fields': {k: v for k, v in record['fields'].items() if k in fields}
+        }
+
+    def _filter(self, formula):
+        records = list(self.records.values())
+        if formula:
+            conditions = re.findall(r"\{([^}]+)\}='((?:[^'\\]|\\.)*)'", str(formula))
+            conditions = [(field, value.replace("\\'", "'")) for field, value in conditions]
+            records = [
+                r for r in records
+                if any(r['fields'].get(field) == value for field, value in conditions)
+            ]
+        return records
+
+    def iterate(self, formula=None, fields=None, **options):
+        self.calls.append('iterate')
+        records = self._filter(formula)
+        for i in range(0, len(records), self.page_size):
+            yield [self._project(r, fields) for r in records[i:i + self.page_size]]
+
+    def request(self, method, url, fallback=None, options=None):
+        self.calls.append('request')
+        options = options or {}
+        records = self._filter(options.get('formula'))
+        start = int(options.get('offset', 0))
+        size = options.get('page_size', self.page_size)
+        body = {'records': [self._project(r, options.get('fields')) for r in records[start:start + size]]}
+        if start + size < len(records):
+            body['offset'] = str(start + size)
+        return body
+
+    def all(self, formula=None, fields=None, **options):
+        self.calls.append('all')
+        return [self._project(r, fields) for r in self._filter(formula)]
+
+    def get(self, record_id):
+        self.calls.append('get')
+        if record_id not in self.records:
+            raise self._not_found()
+        return self._project(self.records[record_id], None)
+
+    def create(self, fields):
+        self.calls.append('create')
+        record_id = f"rec{next(self._ids):014d}"
+        self.records[record_id] = {'id': record_id, 'fields': dict(fields)}
+        return self._project(self.records[record_id], None)
+
+    def update(self, record_id, fields):
+        self.calls.append('update')
+        if record_id not in self.records:
+            raise self._not_found()
+        self.records[record_id]['fields'].update(fields)
+        return self._project(self.records[record_id], None)
+
+    def delete(self, record_id):
+        self.calls.append('delete')
+        if record_id not in self.records:
+            raise self._not_found()
+        del self.records[record_id]
+        return {'id': record_id, 'deleted': True}
+
+    def batch_upsert(self, records, key_fields):
+        self.calls.append('batch_upsert')
+        assert len(records) <= 10
+        result = {'createdRecords': [], 'updatedRecords': [], 'records': []}
+        for record in records:
+            fields = record['fields']
+            existing = [
+                r for r in self.records.values()
+                if all(r['fields'].get(k) == fields[k] for k in key_fields)
+            ]
+            if existing:
+                existing[0]['fields'].update(fields)
+                result['updatedRecords'].append(existing[0]['id'])
+                result['records'].append(self._project(existing[0], None))
+            else:
+                record_id = f"rec{next(self._ids):014d}"
+                self.records[record_id] = {'id': record_id, 'fields': dict(fields)}
+                result['createdRecords'].append(record_id)
+                result['records'].append(self._project(self.records[record_id], None))
+        return result
+
+    def batch_delete(self, record_ids):
+        self.calls.append('batch_delete')
+        assert len(record_ids) <= 10
+        for record_id in record_ids:
+            del self.records[record_id]
+        return [{'id': record_id, 'deleted': True} for record_id in record_ids]
+
+class TestAirtableManager(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        os.environ['AIRTABLE_KEY'] = 'test_key'
+        os.environ['AIRTABLE_BASE_ID'] = 'appTest'
+        self.manager = AirtableManager()
+        self.table = FakeTable()
+        self.manager.table = self.table
+
+    def test_store_get_delete_use_single_calls(self):
+        self.manager.load_index()
+        self.table.calls.clear()
+
+        self.manager.store_data('site_config', {"name": "Site"})
+        self.manager.store_data('site_config', {"name": "Site v2"})
+        self.assertEqual(self.table.calls, ['all', 'create', 'update'])
+
+        self.table.calls.clear()
+        self.assertEqual(self.manager.get_data('site_config'), {"name": "Site v2"})
+        self.assertTrue(self.manager.delete_data('site_config'))
+        self.assertEqual(self.table.calls, ['get', 'delete'])
+        self.assertEqual(self.table.records, {})
+
+    def test_index_loaded_from_scan(self):
+        self.table.create({'key': 'existing', 'encrypted_value': self.manager.encryptor.encrypt_data("x")})
+        self.table.calls.clear()
+
+        self.assertEqual(self.manager.get_data('existing'), "x")
+        self.assertEqual(self.table.calls, ['iterate', 'get'])
+
+    def test_stale_index_entry_is_dropped(self):
+        self.manager.store_data('gone', "value")
+        self.table.records.clear()
+
+        self.assertIsNone(self.manager.get_data('gone'))
+        self.manager.store_data('gone', "again")
+        self.assertEqual(self.manager.get_data('gone'), "again")
+
+    def test_store_many_and_delete_many_batch_requests(self):
+        self.manager.store_data('existing', "old")
+        self.table.calls.clear()
+
+        items = [{'key': f'key_{i}', 'data': {"n": i}} for i in range(25)]
+        items.append({'key': 'existing', 'data': "new"})
+        result = self.manager.store_many(items)
+
+        self.assertEqual(len(result['created']), 25)
+        self.assertEqual(result['updated'], ['existing'])
+        self.assertEqual(self.table.calls, ['batch_upsert'] * 3)
+        self.assertEqual(self.manager.get_data('key_7'), {"n": 7})
+        self.assertEqual(self.manager.get_data('existing'), "new")
+
+        self.table.calls.clear()
+        result = self.manager.delete_many([f'key_{i}' for i in range(25)] + ['unknown'])
+        self.assertEqual(len(result['deleted']), 25)
+        self.assertEqual(result['missing'], ['unknown'])
+        self.assertEqual(self.table.calls, ['all'] + ['batch_delete'] * 3)
+        self.assertEqual(len(self.table.records), 1)
+
+    def test_read_through_cache_and_invalidation(self):
+        self.manager.store_data('site_config', {"name": "Site"})
+        self.table.calls.clear()
+
+        first = self.manager.get_data('site_config')
+        first["name"] = "mutated by caller"
+        self.assertEqual(self.manager.get_data('site_config'), {"name": "Site"})
+        self.assertEqual(self.table.calls, ['get'])
+        self.assertEqual(self.manager.cache_stats()['hits'], 1)
+
+        self.manager.store_data('site_config', {"name": "Site v2"})
+        self.assertEqual(self.manager.get_data('site_config'), {"name": "Site v2"})
+
+        self.manager.delete_data('site_config')
+        self.assertIsNone(self.manager.get_data('site_config'))
+
+    def test_read_racing_a_write_does_not_cache_old_value(self):
+        self.manager.store_data('site_config', "old")
+        fetch_record = self.manager.fetch_record
+
+        def slow_fetch(key):
+            fields = fetch_record(key)
+            # The write lands after this read fetched but before it fills the cache
+            self.manager.store_data('site_config', "new")
+            return fields
+
+        self.manager.fetch_record = slow_fetch
+        self.assertEqual(self.manager.get_data('site_config'), "old")
+        self.manager.fetch_record = fetch_record
+
+        self.assertEqual(self.manager.get_data('site_config'), "new")
+        data, etag = self.manager.get_data_if_changed('site_config')
+        self.assertEqual(self.manager.get_data_if_changed('site_config', {etag}), (None, etag))
+
+    def test_conditional_get_skips_fetch_and_decrypt(self):
+        self.manager.store_data('site_config', {"name": "Site"})
+        data, etag = self.manager.get_data_if_changed('site_config')
+        self.assertEqual(data, {"name": "Site"})
+        self.manager.cache.clear()
+        self.table.calls.clear()
+
+        self.assertEqual(self.manager.get_data_if_changed('site_config', {etag}), (None, etag))
+        self.assertEqual(self.table.calls, [])
+
+        self.manager.store_data('site_config', {"name": "Site"})
+        data, new_etag = self.manager.get_data_if_changed('site_config', {etag})
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(data, {"name": "Site"})
+
+        self.manager.delete_data('site_config')
+        self.assertEqual(self.manager.get_data_if_changed('site_config', {new_etag}), (None, None))
+
+    def test_matching_etag_after_validator_expiry_skips_decrypt(self):
+        self.manager.store_data('site_config', {"name": "Site"})
+        _, etag = self.manager.get_data_if_changed('site_config')
+        self.manager.cache.clear()
+        self.manager.validators.clear()
+
+        decrypts = []
+        decrypt_data = self.manager.crypto.decrypt_data
+        self.manager.crypto.decrypt_data = lambda value: decrypts.append(value) or decrypt_data(value)
+        self.assertEqual(self.manager.get_data_if_changed('site_config', {etag}), (None, etag))
+        self.assertEqual(decrypts, [])
+        # The fetch refilled the validator
+        self.assertEqual(self.manager.validators.get('site_config'), etag)
+
+    def test_ciphertext_only_cache(self):
+        manager = AirtableManager(cache_ciphertext_only=True)
+        manager.table = self.table
+        manager.store_data('secret', "plaintext")
+        manager.get_data('secret')
+
+        cached = manager.cache.get('secret')
+        self.assertNotEqual(cached, "plaintext")
+        self.assertEqual(manager.get_data('secret'), "plaintext")
+
+    def test_write_behind_reads_own_writes(self):
+        tmp_dir = tempfile.mkdtemp()
+        manager = AirtableManager(write_behind=True, journal_path=os.path.join(tmp_dir, 'writes.jsonl'), write_rate=1000)
+        manager.table = self.table
+        try:
+            manager.write_queue.stop(drain=False)
+            manager.store_data('site_config', {"name": "queued"})
+            self.assertEqual(self.table.records, {})
+            self.assertEqual(manager.get_data('site_config'), {"name": "queued"})
+            self.assertEqual(manager.write_queue_stats()['depth'], 1)
+
+            manager.write_queue.start()
+            self.assertTrue(manager.flush_writes(timeout=5))
+            self.assertIn('batch_upsert', self.table.calls)
+            self.assertEqual(manager.get_data('site_config'), {"name": "queued"})
+        finally:
+            manager.write_queue.stop()
+            shutil.rmtree(tmp_dir)
+
+    def test_list_data_page_projects_key_field(self):
+        for i in range(5):
+            self.table.create({'key': f'key_{i}', 'encrypted_value': 'v2:ciphertext'})
+
+        first = self.manager.list_data_page(limit=2)
+        self.assertEqual([item['id'] for item in first['items']], ['key_0', 'key_1'])
+        second = self.manager.list_data_page(limit=2, cursor=first['next_cursor'])
+        third = self.manager.list_data_page(limit=2, cursor=second['next_cursor'])
+        self.assertEqual([item['id'] for item in third['items']], ['key_4'])
+        self.assertIsNone(third['next_cursor'])
+
+    def test_iter_all_data_across_pages(self):
+        self.table.page_size = 3
+        for i in range(10):
+            self.table.create({
+                'key': f'key_{i}',
+                'encrypted_value': self.manager.encryptor.encrypt_data({"n": i}),
+                'data_type': 'config'
+            })
+
+        streamed = list(self.manager.iter_all_data(max_in_flight=2))
+        self.assertEqual([key for key, _ in streamed], [f'key_{i}' for i in range(10)])
+        self.assertEqual(streamed[4][1]['data'], {"n": 4})
+
+        all_data = self.manager.get_all_data()
+        self.assertEqual(all_data['key_9']['type'], 'config')
+        self.assertEqual(len(all_data), 10)
+
+    def test_search_finds_single_and_bulk_stored_records(self):
+        from app.routes import create_app
+        manager = AirtableManager(blind_index_fields=['data.email'])
+        manager.table = self.table
+        client = create_app({'AIRTABLE_MANAGER': manager, 'SWAGGER_ENABLED': False}).test_client()
+        client.post('/site-data', json={"data_id": "single", "data": {"email": "a@example.com"}})
+        client.post('/site-data/bulk', json={"items": [
+            {"data_id": "bulk_a", "data": {"email": "a@example.com"}},
+            {"data_id": "bulk_b", "data": {"email": "b@example.com"}}
+        ]})
+        self.assertEqual(len({r['fields']['bidx_data.email'] for r in self.table.records.values()}), 2)
+
+        self.table.calls.clear()
+        response = client.get('/site-data/search', query_string={'field': 'data.email', 'value': 'a@example.com'})
+        self.assertEqual([item['id'] for item in response.get_json()['items']], ['bulk_a', 'single'])
+        self.assertEqual(self.table.calls, ['all'])
+
+    def tearDown(self):
+        for name in ('LOCAL_PASSCODE_FOR_SITE_DATA', 'AIRTABLE_KEY', 'AIRTABLE_BASE_ID'):
+            if name in os.environ:
+                del os.environ[name]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.routes import create_app, EXTENSION
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestAppFactory(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+
+    def test_import_needs_no_airtable_environment(self):
+        env = {k: v for k, v in os.environ.items() if not k.startswith('AIRTABLE_')}
+        script = (
+            "import sys\n"
+            "from app import app\n"
+            "client = app.test_client()\n"
+            "assert client.post('/encrypt', json={'data': 'x'}).status_code == 200\n"
+            "assert client.get('/site-data/x').status_code == 500\n"
+            "print('pyairtable' in sys.modules)\n"
+        )
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        # Only the Airtable request imported pyairtable
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'True')
+
+    def test_services_built_on_first_use(self):
+        app = create_app({'SWAGGER_ENABLED': False})
+        services = app.extensions[EXTENSION]
+        self.assertEqual(services._built, {})
+
+        response = app.test_client().post('/encrypt', json={"data": "lazy"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('crypto_pool', services._built)
+        self.assertNotIn('airtable_manager', services._built)
+
+    def test_config_supplies_services(self):
+        manager = object()
+        app = create_app({'AIRTABLE_MANAGER': manager, 'SWAGGER_ENABLED': False})
+        self.assertIs(app.extensions[EXTENSION].airtable_manager, manager)
+        self.assertNotIn('/apidocs/', [rule.rule for rule in app.url_map.iter_rules()])
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs os.fork")
+    def test_preloaded_app_writes_behind_in_forked_worker(self):
+        from benchmarks.fake_airtable import FakeAirtableServer
+        tmp_dir = tempfile.mkdtemp()
+        names = ('AIRTABLE_KEY', 'AIRTABLE_BASE_ID', 'AIRTABLE_ENDPOINT_URL',
+                 'AIRTABLE_WRITE_BEHIND', 'AIRTABLE_JOURNAL_PATH')
+        try:
+            with FakeAirtableServer() as server:
+                os.environ.update({
+                    'AIRTABLE_KEY': 'test_key',
+                    'AIRTABLE_BASE_ID': 'appTest',
+                    'AIRTABLE_ENDPOINT_URL': server.url,
+                    'AIRTABLE_WRITE_BEHIND': '1',
+                    'AIRTABLE_JOURNAL_PATH': f'{tmp_dir}/writes.jsonl'
+                })
+                app = create_app({'PRELOAD_SERVICES': True, 'SWAGGER_ENABLED': False})
+                services = app.extensions[EXTENSION]
+                # No drain thread or journal lock in the master
+                self.assertNotIn('airtable_manager', services._built)
+
+                pid = os.fork()
+                if pid == 0:
+                    # Worker: its own manager and drain thread
+                    try:
+                        manager = services.airtable_manager
+                        manager.store_data('homepage', "Welcome")
+                        os._exit(0 if manager.flush_writes(timeout=5) else 1)
+                    except BaseException:
+                        os._exit(2)
+                _, status = os.waitpid(pid, 0)
+                self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+                stored = [r['fields'].get('key') for t in server.state.tables.values() for r in t.values()]
+                self.assertEqual(stored, ['homepage'])
+        finally:
+            for name in names:
+                os.environ.pop(name, None)
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
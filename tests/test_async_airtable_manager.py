@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import asyncio
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.async_airtable_manager import AsyncAirtableManager
+from app.airtable_manager import AirtableManager
+from benchmarks.fake_airtable import FakeAirtableServer
+
+class TestAsyncAirtableManager(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        os.environ['AIRTABLE_KEY'] = 'test_key'
+        os.environ['AIRTABLE_BASE_ID'] = 'appTest'
+        self.server = FakeAirtableServer().start()
+
+    def _manager(self):
+        return AsyncAirtableManager(endpoint_url=self.server.url)
+
+    def test_store_get_many_and_delete(self):
+        async def scenario():
+            async with self._manager() as manager:
+                items = [{'key': f'key_{i}', 'data': {"n": i}} for i in range(12)]
+                result = await manager.store_many(items)
+                self.assertEqual(len(result['created']), 12)
+
+                data = await manager.get_many(['key_1', 'key_11', 'unknown'])
+                self.assertEqual(data, {'key_1': {"n": 1}, 'key_11': {"n": 11}})
+
+                all_data = await manager.get_all_data()
+                self.assertEqual(len(all_data), 12)
+                self.assertEqual(all_data['key_5']['data'], {"n": 5})
+
+                self.assertTrue(await manager.delete_data('key_0'))
+                self.assertIsNone(await manager.get_data('key_0'))
+                self.assertEqual(len(await manager.list_all_data()), 11)
+
+        asyncio.run(scenario())
+
+    def test_retries_rate_limited_requests(self):
+        self.server.state.rate_limit = 2
+
+        async def scenario():
+            async with self._manager() as manager:
+                await manager.store_many([{'key': f'key_{i}', 'data': f'value {i}'} for i in range(30)])
+                self.assertEqual(len(await manager.get_all_data()), 30)
+
+        asyncio.run(scenario())
+        self.assertGreater(self.server.state.rate_limited, 0)
+
+    def test_stores_are_blind_indexed(self):
+        os.environ['AIRTABLE_ENDPOINT_URL'] = self.server.url
+        searcher = AirtableManager(blind_index_fields=['data.email'])
+
+        def found(email):
+            return [item['id'] for item in searcher.search_site_data('data.email', email)['items']]
+
+        async def scenario():
+            async with AsyncAirtableManager(endpoint_url=self.server.url, blind_index_fields=['data.email']) as manager:
+                await manager.store_data('u1', {"data": {"email": "a@example.com"}})
+                await manager.store_many([{'key': 'u2', 'data': {"data": {"email": "a@example.com"}}}])
+                self.assertEqual(found('a@example.com'), ['u1', 'u2'])
+
+                # An update replaces the token, so the old value stops matching
+                await manager.store_data('u1', {"data": {"email": "b@example.com"}})
+                self.assertEqual(found('a@example.com'), ['u2'])
+                self.assertEqual(found('b@example.com'), ['u1'])
+
+        asyncio.run(scenario())
+
+    def tearDown(self):
+        self.server.stop()
+        for name in ('LOCAL_PASSCODE_FOR_SITE_DATA', 'AIRTABLE_KEY', 'AIRTABLE_BASE_ID', 'AIRTABLE_ENDPOINT_URL'):
+            if name in os.environ:
+                del os.environ[name]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.encryption import DataEncryptor
+from app.batch import BatchProcessor
+
+class TestBatchProcessor(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        self.encryptor = DataEncryptor()
+
+    def test_thread_pool_round_trip_preserves_order(self):
+        processor = BatchProcessor(self.encryptor, max_workers=4, executor='thread')
+        items = [f"value {i}" for i in range(20)]
+
+        encrypted = processor.encrypt_many(items)
+        decrypted = processor.decrypt_many([r["encrypted_data"] for r in encrypted])
+
+        self.assertEqual([r["decrypted_data"] for r in decrypted], items)
+        processor.shutdown()
+
+    def test_process_pool_round_trip(self):
+        processor = BatchProcessor(self.encryptor, max_workers=2, executor='process')
+        items = ["a", "b", "c", "d"]
+
+        encrypted = processor.encrypt_many(items)
+        decrypted = processor.decrypt_many([r["encrypted_data"] for r in encrypted])
+
+        self.assertEqual([r["decrypted_data"] for r in decrypted], items)
+        processor.shutdown()
+
+    def test_per_item_errors(self):
+        processor = BatchProcessor(self.encryptor, max_workers=2)
+        good = self.encryptor.encrypt_data("ok")
+
+        results = processor.decrypt_many([good, "not-valid", ""])
+
+        self.assertEqual(results[0], {"decrypted_data": "ok"})
+        self.assertIn("error", results[1])
+        self.assertIn("error", results[2])
+        processor.shutdown()
+
+    def tearDown(self):
+        # Clean up environment variable
+        if 'LOCAL_PASSCODE_FOR_SITE_DATA' in os.environ:
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+
+if __name__ == '__main__':
+    unittest.main()
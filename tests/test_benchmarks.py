@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_micro import compare_results, missing_metrics, measure
+
+class TestBenchmarkCompare(unittest.TestCase):
+    def test_flags_only_regressions_past_threshold(self):
+        baseline = {"metrics": {
+            "encrypt_data/str/100B": {"mean_s": 1.0},
+            "decrypt_data/str/100B": {"mean_s": 1.0},
+            "load_site_data": {"mean_s": 1.0}
+        }}
+        current = {"metrics": {
+            "encrypt_data/str/100B": {"mean_s": 1.05},
+            "decrypt_data/str/100B": {"mean_s": 1.5},
+            "load_site_data": {"mean_s": 3.0}
+        }}
+
+        regressions = compare_results(baseline, current, 0.10)
+        self.assertEqual([r[0] for r in regressions], ["decrypt_data/str/100B", "load_site_data"])
+
+        regressions = compare_results(baseline, current, 0.10, patterns=["*_data/str/*"])
+        self.assertEqual([r[0] for r in regressions], ["decrypt_data/str/100B"])
+
+    def test_reports_missing_metrics(self):
+        baseline = {"metrics": {"encrypt_data/str/100B": {"mean_s": 1.0}, "load_site_data": {"mean_s": 1.0}}}
+        current = {"metrics": {"encrypt_data/str/100B": {"mean_s": 1.0}}}
+
+        self.assertEqual(missing_metrics(baseline, current), ["load_site_data"])
+        self.assertEqual(missing_metrics(baseline, current, patterns=["encrypt_*"]), [])
+        self.assertEqual(missing_metrics(baseline, current, patterns=["renamed_*"]), ["renamed_*"])
+
+    def test_measure_reports_timings(self):
+        result = measure(lambda: None, min_time=0.01, max_iterations=50)
+        self.assertLessEqual(result["iterations"], 50)
+        self.assertGreater(result["ops_per_s"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
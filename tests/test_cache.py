@@ -0,0 +1,42 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+
+        self.clock.now = 11
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_lru_eviction(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,13 @@
 import unittest
 import os
+import struct
 import sys
 import json
 
 # Add the parent directory to Python path so we can import from app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.encryption import DataEncryptor
+from app.encryption import DataEncryptor, COMPRESSION_STATS
 
 class TestEncryption(unittest.TestCase):
     def setUp(self):
@@ -25,6 +26,76 @@ class TestEncryption(unittest.TestCase):
         decrypted = self.encryptor.decrypt_data(encrypted)
         self.assertEqual(original, decrypted)
 
+    def test_decrypt_v1_envelope(self):
+        original = {"legacy": True}
+        encrypted = self.encryptor.encrypt_data(original, envelope_version=1)
+        self.assertFalse(encrypted.startswith('v2:'))
+        decrypted = DataEncryptor().decrypt_data(encrypted)
+        self.assertEqual(original, decrypted)
+
+    def test_v2_envelope_from_other_process(self):
+        encrypted = DataEncryptor().encrypt_data("cross-process")
+        self.assertTrue(encrypted.startswith('v2:'))
+        self.assertEqual("cross-process", self.encryptor.decrypt_data(encrypted))
+
+    def test_v2_derives_master_key_once(self):
+        for i in range(5):
+            encrypted = self.encryptor.encrypt_data(f"message {i}")
+            self.assertEqual(f"message {i}", self.encryptor.decrypt_data(encrypted))
+        self.assertEqual(self.encryptor.key_cache_info()["misses"], 1)
+
+    def test_key_cache_is_bounded(self):
+        encryptor = DataEncryptor(envelope_version=1, key_cache_size=2)
+        blobs = [encryptor.encrypt_data(str(i)) for i in range(4)]
+        self.assertEqual(encryptor.key_cache_info()["size"], 2)
+        self.assertEqual(encryptor.decrypt_data(blobs[-1]), 3)
+        self.assertEqual(encryptor.key_cache_info()["hits"], 1)
+
+    def test_compressed_envelope_round_trip(self):
+        encryptor = DataEncryptor(compression='zlib', compression_min_bytes=64)
+        original = {"rows": ["repeated site content"] * 200}
+        encrypted = encryptor.encrypt_data(original)
+        self.assertTrue(encrypted.startswith('v3:'))
+        self.assertLess(len(encrypted), len(self.encryptor.encrypt_data(original)))
+        # Any encryptor reads it, whatever its own compression setting
+        self.assertEqual(original, self.encryptor.decrypt_data(encrypted))
+
+    def test_compression_skips_small_and_incompressible(self):
+        COMPRESSION_STATS.reset()
+        encryptor = DataEncryptor(compression='zlib', compression_min_bytes=64)
+        small = encryptor.encrypt_data("short")
+        noisy = encryptor.encrypt_data(os.urandom(512))
+        self.assertTrue(small.startswith('v2:'))
+        self.assertTrue(noisy.startswith('v2:'))
+        self.assertEqual(encryptor.decrypt_data(small), "short")
+        self.assertTrue(encryptor.encrypt_data("abc" * 200).startswith('v3:'))
+
+        stats = encryptor.compression_stats()
+        self.assertEqual(stats["skipped_small"], 1)
+        self.assertEqual(stats["skipped_incompressible"], 1)
+        self.assertEqual(stats["compressed"], 1)
+        self.assertGreater(stats["ratio"], 1.0)
+        self.assertEqual(stats["codec"], 'zlib')
+
+    def test_compressed_envelope_authenticates_codec(self):
+        import base64
+        encryptor = DataEncryptor(compression='zlib', compression_min_bytes=0)
+        encrypted = encryptor.encrypt_data("x" * 1000)
+        raw = bytearray(base64.b64decode(encrypted[3:]))
+        raw[0] = 2
+        with self.assertRaises(Exception):
+            encryptor.decrypt_data('v3:' + base64.b64encode(bytes(raw)).decode())
+
+    def test_unknown_compression_rejected(self):
+        with self.assertRaises(ValueError):
+            DataEncryptor(compression='lz4')
+
+    def test_keyed_hash_is_stable_and_keyed(self):
+        digest = self.encryptor.keyed_hash({"b": 1, "a": [1, 2]})
+        self.assertEqual(DataEncryptor().keyed_hash({"a": [1, 2], "b": 1}), digest)
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'another_passcode'
+        self.assertNotEqual(DataEncryptor().keyed_hash({"a": [1, 2], "b": 1}), digest)
+
     def test_encrypt_decrypt_file(self):
         # Create test input file
         test_data = {"test": "data", "secret": "password123"}
@@ -45,6 +116,54 @@ class TestEncryption(unittest.TestCase):
         if os.path.exists('test_encrypted.enc'):
             os.remove('test_encrypted.enc')
 
+    def test_stream_round_trip_binary(self):
+        payload = os.urandom(10000)
+        chunks = [payload[i:i + 777] for i in range(0, len(payload), 777)]
+
+        encrypted = list(self.encryptor.encrypt_stream(chunks, segment_size=1024))
+        decrypted = b''.join(self.encryptor.decrypt_stream(encrypted))
+
+        self.assertEqual(payload, decrypted)
+
+    def test_stream_detects_truncation(self):
+        payload = os.urandom(4096)
+        encrypted = b''.join(self.encryptor.encrypt_stream([payload], segment_size=1024))
+
+        # Drop the final segment; the remaining last segment is not marked final
+        truncated = encrypted[:-(1024 + 16)]
+        with self.assertRaises(Exception):
+            b''.join(self.encryptor.decrypt_stream([truncated]))
+
+    def test_stream_rejects_oversized_segment_header(self):
+        encrypted = b''.join(self.encryptor.encrypt_stream([b'x' * 100], segment_size=1024))
+        forged = encrypted[:5] + struct.pack('>I', 2 ** 32 - 1) + encrypted[9:]
+        with self.assertRaises(ValueError):
+            next(self.encryptor.decrypt_stream([forged]))
+
+    def test_encrypt_decrypt_file_to_path(self):
+        payload = os.urandom(200000)
+        with open('test_input.bin', 'wb') as f:
+            f.write(payload)
+
+        self.encryptor.encrypt_file('test_input.bin', 'test_encrypted.enc', segment_size=4096)
+        self.encryptor.decrypt_file('test_encrypted.enc', 'test_output.bin')
+
+        with open('test_output.bin', 'rb') as f:
+            self.assertEqual(payload, f.read())
+
+        for path in ('test_input.bin', 'test_encrypted.enc', 'test_output.bin'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def test_decrypt_legacy_text_file(self):
+        with open('test_legacy.enc', 'w') as f:
+            f.write(self.encryptor.encrypt_data({"legacy": "file"}))
+
+        self.assertEqual({"legacy": "file"}, self.encryptor.decrypt_file('test_legacy.enc'))
+
+        if os.path.exists('test_legacy.enc'):
+            os.remove('test_legacy.enc')
+
     def tearDown(self):
         # Clean up environment variable
         if 'LOCAL_PASSCODE_FOR_SITE_DATA' in os.environ:
@@ -0,0 +1,126 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_airtable import FakeAirtableServer
+from app.airtable_manager import AirtableManager
+from app.metrics import AIRTABLE_RATE_LIMITED, AIRTABLE_RETRIES, AIRTABLE_REQUEST_SECONDS
+
+class TestFakeAirtable(unittest.TestCase):
+    """Drive the real pyairtable client against the local fake server"""
+
+    def setUp(self):
+        self.server = FakeAirtableServer().start()
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        os.environ['AIRTABLE_KEY'] = 'test_key'
+        os.environ['AIRTABLE_BASE_ID'] = 'appTest'
+        os.environ['AIRTABLE_ENDPOINT_URL'] = self.server.url
+        self.manager = AirtableManager()
+
+    def test_manager_round_trip(self):
+        self.manager.store_data("it's quoted", {"name": "Site"})
+        self.manager.store_data("it's quoted", {"name": "Site v2"})
+        self.manager.store_many([{'key': f'key_{i}', 'data': f'value {i}'} for i in range(15)])
+
+        self.assertEqual(self.manager.get_data("it's quoted"), {"name": "Site v2"})
+        self.assertEqual(len(self.manager.get_all_data()), 16)
+
+        page = self.manager.list_data_page(limit=10)
+        self.assertEqual(len(page['items']), 10)
+        self.assertIsNotNone(page['next_cursor'])
+
+        result = self.manager.delete_many([f'key_{i}' for i in range(15)])
+        self.assertEqual(len(result['deleted']), 15)
+        self.assertTrue(self.manager.delete_data("it's quoted"))
+        self.assertEqual(self.manager.list_all_data(), [])
+
+    def test_site_data_interface(self):
+        self.manager.store_site_data('homepage', "Welcome", notes="hero")
+        self.assertEqual(self.manager.retrieve_site_data('homepage')['notes'], "hero")
+        self.assertIn('message', self.manager.delete_site_data('homepage'))
+        self.assertIn('error', self.manager.retrieve_site_data('homepage'))
+
+    def test_retrieve_route_conditional_get(self):
+        from app.routes import create_app
+        client = create_app({'AIRTABLE_MANAGER': self.manager, 'SWAGGER_ENABLED': False}).test_client()
+        client.post('/site-data', json={"data_id": "homepage", "data": "Welcome"})
+
+        response = client.get('/site-data/homepage')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+
+        requests_before = sum(self.server.state.stats()['requests'].values())
+        response = client.get('/site-data/homepage', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(sum(self.server.state.stats()['requests'].values()), requests_before)
+
+        client.post('/site-data', json={"data_id": "homepage", "data": "Welcome back"})
+        response = client.get('/site-data/homepage', headers={'If-None-Match': f'W/{etag}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data'], "Welcome back")
+
+    def test_blind_index_search(self):
+        from app.routes import create_app
+        manager = AirtableManager(blind_index_fields=['data.email'])
+        manager.store_site_data('u1', {"email": "a@example.com"})
+        manager.store_many([
+            {'key': 'u2', 'data': {"data": {"email": "b@example.com"}}},
+            {'key': 'u3', 'data': {"data": {"email": "a@example.com"}}}
+        ])
+
+        # Only the token column is stored, never the value
+        stored = [r['fields'] for t in self.server.state.tables.values() for r in t.values()]
+        self.assertNotIn('a@example.com', str(stored))
+        self.assertEqual(len({fields['bidx_data.email'] for fields in stored}), 2)
+
+        client = create_app({'AIRTABLE_MANAGER': manager, 'SWAGGER_ENABLED': False}).test_client()
+        response = client.get('/site-data/search', query_string={'field': 'data.email', 'value': 'a@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.get_json()['items']], ['u1', 'u3'])
+        self.assertEqual(response.get_json()['items'][0]['data'], {"email": "a@example.com"})
+
+        self.assertEqual(client.get('/site-data/search', query_string={'field': 'data.name', 'value': 'x'}).status_code, 400)
+        self.assertEqual(client.get('/site-data/search', query_string={'field': 'data.email'}).status_code, 400)
+
+    def test_bulk_store_matches_single_store_shape(self):
+        from app.routes import create_app
+        client = create_app({'AIRTABLE_MANAGER': self.manager, 'SWAGGER_ENABLED': False}).test_client()
+        client.post('/site-data', json={"data_id": "single", "data": {"email": "a@example.com"}, "notes": "n"})
+        response = client.post('/site-data/bulk', json={"items": [
+            {"data_id": "bulk_item", "data": {"email": "a@example.com"}, "notes": "n"}
+        ]})
+        self.assertEqual(response.status_code, 200)
+
+        single = client.get('/site-data/single').get_json()
+        bulk = client.get('/site-data/bulk_item').get_json()
+        self.assertEqual(sorted(bulk), sorted(single))
+        self.assertEqual(bulk['data'], single['data'])
+        self.assertEqual(bulk['notes'], "n")
+
+    def test_rate_limited_requests_are_retried(self):
+        rate_limited = AIRTABLE_RATE_LIMITED.labels().value
+        retries = AIRTABLE_RETRIES.labels().value
+        creates = AIRTABLE_REQUEST_SECONDS.labels('create').snapshot()[2]
+
+        self.server.state.rate_limit = 3
+        for i in range(8):
+            self.manager.store_data(f'key_{i}', f'value {i}')
+        self.assertGreater(self.server.state.rate_limited, 0)
+        self.assertEqual(len(self.manager.list_all_data()), 8)
+
+        self.assertEqual(AIRTABLE_RATE_LIMITED.labels().value - rate_limited, self.server.state.rate_limited)
+        self.assertEqual(AIRTABLE_RETRIES.labels().value - retries, self.server.state.rate_limited)
+        self.assertEqual(AIRTABLE_REQUEST_SECONDS.labels('create').snapshot()[2] - creates, 8)
+
+    def tearDown(self):
+        self.server.stop()
+        for name in ('LOCAL_PASSCODE_FOR_SITE_DATA', 'AIRTABLE_KEY', 'AIRTABLE_BASE_ID', 'AIRTABLE_ENDPOINT_URL'):
+            if name in os.environ:
+                del os.environ[name]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.encryption import DataEncryptor
+from app.log_store import LogStructuredBackend
+
+class TestLogStructuredBackend(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        self.encryptor = DataEncryptor()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.tmp_dir, 'log')
+        self.stores = []
+
+    def _open(self, **options):
+        options.setdefault('start_compactor', False)
+        store = LogStructuredBackend(self.log_dir, **options)
+        self.stores.append(store)
+        return store
+
+    def _reopen(self, store, **options):
+        store.close()
+        self.stores.remove(store)
+        return self._open(**options)
+
+    def test_put_get_delete_and_reopen(self):
+        store = self._open()
+        values = {f'key_{i}': self.encryptor.encrypt_data(f'value {i}') for i in range(20)}
+        for key, value in values.items():
+            store.put(key, value)
+        store.put('key_0', values['key_1'])
+        self.assertTrue(store.delete('key_2'))
+        self.assertFalse(store.delete('key_2'))
+
+        self.assertEqual(store.get('key_0'), values['key_1'])
+        self.assertIsNone(store.get('key_2'))
+
+        store = self._reopen(store)
+        self.assertEqual(store.get('key_0'), values['key_1'])
+        self.assertEqual(store.get('key_5'), values['key_5'])
+        self.assertIsNone(store.get('key_2'))
+        self.assertEqual(len(store.list_ids()), 19)
+        self.assertEqual(store.list_page(5, 'key_17'), (['key_18', 'key_19', 'key_3', 'key_4', 'key_5'], 'key_5'))
+
+    def test_segments_roll_and_load_from_footers(self):
+        store = self._open(segment_bytes=1024)
+        value = self.encryptor.encrypt_data('x' * 100)
+        for i in range(50):
+            store.put(f'key_{i}', value)
+        self.assertGreater(store.stats()['segments'], 5)
+
+        store = self._reopen(store, segment_bytes=1024)
+        self.assertEqual(len(store.list_ids()), 50)
+        self.assertEqual(store.get('key_0'), value)
+
+    def test_torn_tail_is_truncated(self):
+        store = self._open()
+        value = self.encryptor.encrypt_data('value')
+        store.put('a', value)
+        store.put('b', value)
+        path = store._active.path
+        store.close()
+        self.stores.remove(store)
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        store = self._open()
+        self.assertEqual(store.get('a'), value)
+        self.assertIsNone(store.get('b'))
+        store.put('c', value)
+        store = self._reopen(store)
+        self.assertEqual(sorted(store.list_ids()), ['a', 'c'])
+
+    def test_compaction_drops_dead_records(self):
+        store = self._open(segment_bytes=2048)
+        for round_ in range(5):
+            for i in range(20):
+                store.put(f'key_{i}', self.encryptor.encrypt_data(f'value {i} round {round_}'))
+        for i in range(10):
+            store.delete(f'key_{i}')
+        before = store.stats()
+        self.assertGreater(store.garbage_ratio(), 0.5)
+
+        store.compact()
+        after = store.stats()
+        self.assertLess(after['bytes'], before['bytes'] / 2)
+        self.assertEqual(after['compactions'], 1)
+        self.assertEqual(self.encryptor.decrypt_data(store.get('key_15')), 'value 15 round 4')
+
+        # Deleted keys stay deleted and the newest values win after a restart
+        store = self._reopen(store, segment_bytes=2048)
+        self.assertEqual(sorted(store.list_ids()), sorted(f'key_{i}' for i in range(10, 20)))
+        self.assertEqual(self.encryptor.decrypt_data(store.get('key_19')), 'value 19 round 4')
+
+    def test_writes_during_compaction(self):
+        store = self._open(segment_bytes=4096)
+        value = self.encryptor.encrypt_data('old')
+        for i in range(200):
+            store.put(f'key_{i % 50}', value)
+        new_value = self.encryptor.encrypt_data('new')
+
+        def write():
+            for i in range(50):
+                store.put(f'key_{i}', new_value)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        store.compact()
+        writer.join()
+
+        for i in range(50):
+            self.assertEqual(store.get(f'key_{i}'), new_value)
+        store = self._reopen(store, segment_bytes=4096)
+        for i in range(50):
+            self.assertEqual(store.get(f'key_{i}'), new_value)
+
+    def test_directory_is_locked_to_one_process(self):
+        self._open()
+        with self.assertRaises(RuntimeError):
+            # flock is per open file, so a second open in-process conflicts too
+            LogStructuredBackend(self.log_dir, start_compactor=False)
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        shutil.rmtree(self.tmp_dir)
+        if 'LOCAL_PASSCODE_FOR_SITE_DATA' in os.environ:
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.metrics import MetricsRegistry, REGISTRY
+from app.encryption import DataEncryptor
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+
+    def test_render_text_format(self):
+        registry = MetricsRegistry()
+        requests = registry.counter('demo_requests_total', 'Requests', ['operation'])
+        latency = registry.histogram('demo_seconds', 'Latency', ['operation'], buckets=(0.1, 1.0))
+
+        requests.labels('get').inc()
+        requests.labels(operation='get').inc(2)
+        latency.labels('get').observe(0.05)
+        latency.labels('get').observe(0.5)
+        latency.labels('get').observe(5)
+
+        text = registry.render()
+        self.assertIn('# TYPE demo_requests_total counter', text)
+        self.assertIn('demo_requests_total{operation="get"} 3', text)
+        self.assertIn('demo_seconds_bucket{operation="get",le="0.1"} 1', text)
+        self.assertIn('demo_seconds_bucket{operation="get",le="1"} 2', text)
+        self.assertIn('demo_seconds_bucket{operation="get",le="+Inf"} 3', text)
+        self.assertIn('demo_seconds_count{operation="get"} 3', text)
+
+        # Re-registering returns the same metric; a conflicting one is refused
+        self.assertIs(registry.counter('demo_requests_total', 'Requests', ['operation']), requests)
+        with self.assertRaises(ValueError):
+            registry.histogram('demo_requests_total', 'Requests', ['operation'])
+
+    def test_encryptor_records_kdf_and_aead(self):
+        aead = REGISTRY.get('encryption_aead_seconds').labels('decrypt')
+        decrypted = REGISTRY.get('encryption_bytes_total').labels('decrypt')
+        before_count = aead.snapshot()[2]
+        before_bytes = decrypted.value
+
+        encryptor = DataEncryptor()
+        encryptor.decrypt_data(encryptor.encrypt_data("hello"))
+
+        self.assertEqual(aead.snapshot()[2], before_count + 1)
+        self.assertEqual(decrypted.value, before_bytes + len("hello"))
+        self.assertIn('encryption_kdf_seconds_count{kdf="pbkdf2"}', REGISTRY.render())
+
+    def tearDown(self):
+        if 'LOCAL_PASSCODE_FOR_SITE_DATA' in os.environ:
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+import asyncio
+import threading
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.encryption import DataEncryptor
+from app.offload import CryptoPool, PoolFull
+
+
+class BlockingEncryptor:
+    """Encryptor whose decrypt waits until released, to fill the pool"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def decrypt_data(self, encrypted_data):
+        self.release.wait(5)
+        return encrypted_data
+
+
+class TestCryptoPool(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+
+    def test_round_trip(self):
+        pool = CryptoPool(DataEncryptor(), max_workers=2, max_queue=4)
+        encrypted = pool.encrypt_data({"value": 1})
+        self.assertEqual(pool.decrypt_data(encrypted), {"value": 1})
+        self.assertEqual(pool.stats()["completed"], 2)
+        pool.shutdown()
+
+    def test_rejects_when_queue_full(self):
+        encryptor = BlockingEncryptor()
+        pool = CryptoPool(encryptor, max_workers=1, max_queue=1, retry_after=3)
+        futures = [pool.submit('decrypt_data', 'a'), pool.submit('decrypt_data', 'b')]
+
+        with self.assertRaises(PoolFull) as ctx:
+            pool.submit('decrypt_data', 'c')
+        self.assertEqual(ctx.exception.retry_after, 3)
+        self.assertEqual(pool.stats()["rejected"], 1)
+
+        encryptor.release.set()
+        self.assertEqual([f.result() for f in futures], ['a', 'b'])
+        # Slots are returned once work finishes
+        self.assertEqual(pool.call('decrypt_data', 'd'), 'd')
+        pool.shutdown()
+
+    def test_run_from_event_loop(self):
+        pool = CryptoPool(DataEncryptor(), max_workers=2)
+        encrypted = pool.encrypt_data("async")
+
+        async def main():
+            return await asyncio.gather(*(pool.run('decrypt_data', encrypted) for _ in range(4)))
+
+        self.assertEqual(asyncio.run(main()), ["async"] * 4)
+        pool.shutdown()
+
+    def test_decrypt_route_returns_503_when_full(self):
+        from app.routes import create_app
+        encryptor = BlockingEncryptor()
+        pool = CryptoPool(encryptor, max_workers=1, max_queue=0, retry_after=2)
+        client = create_app({'CRYPTO_POOL': pool, 'SWAGGER_ENABLED': False}).test_client()
+        try:
+            busy = pool.submit('decrypt_data', 'held')
+            response = client.post('/decrypt', json={"encrypted_data": "x"})
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.headers['Retry-After'], '2')
+            encryptor.release.set()
+            busy.result()
+        finally:
+            pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_airtable import FakeAirtableServer
+from app.airtable_manager import AirtableManager
+from app.encryption import DataEncryptor
+from app.rotation import KeyRotation, SiteRotationTarget, AirtableRotationTarget, rebuild_blind_index
+from app.site_manager import SiteManager
+from app.storage import SQLiteBackend
+import rotate_keys
+
+OLD = 'test_passcode_123'
+NEW = 'rotated_passcode_456'
+
+
+class CrashAfterWrites(SiteRotationTarget):
+    """Writes normally, then dies once `writes` batches have been stored"""
+
+    def __init__(self, site_manager, writes):
+        super().__init__(site_manager)
+        self.writes = writes
+
+    def write(self, records):
+        super().write(records)
+        self.writes -= 1
+        if self.writes < 0:
+            raise KeyboardInterrupt
+
+
+class TestKeyRotation(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = OLD
+        self.tmp_dir = tempfile.mkdtemp()
+        self.rotation = KeyRotation(OLD, NEW, max_workers=2, executor='thread', batch_size=2)
+
+    def tearDown(self):
+        self.rotation.shutdown()
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = OLD
+        shutil.rmtree(self.tmp_dir)
+
+    def _manager(self):
+        return SiteManager(data_dir=self.tmp_dir, backend=SQLiteBackend(f'{self.tmp_dir}/site.db'))
+
+    def test_site_rotation_keeps_data_and_type(self):
+        manager = self._manager()
+        for i in range(5):
+            manager.store_site_data(f'id_{i}', {"value": i}, data_type='config' if i == 0 else 'content')
+
+        summary = self.rotation.run(SiteRotationTarget(manager))
+        self.assertEqual(summary['rotated'], 5)
+        self.assertEqual(summary['errors'], {})
+
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = NEW
+        rotated = self._manager()
+        self.assertEqual(rotated.retrieve_site_data('id_3')['data'], {"value": 3})
+        self.assertEqual(rotated.backend.get_record('id_0')[1], 'config')
+
+    def test_resume_from_checkpoint(self):
+        manager = self._manager()
+        for i in range(7):
+            manager.store_site_data(f'id_{i}', f"value {i}")
+        checkpoint = f'{self.tmp_dir}/rotation.log'
+
+        # Dies after writing the second batch but before checkpointing it
+        with self.assertRaises(KeyboardInterrupt):
+            self.rotation.run(CrashAfterWrites(manager, writes=1), checkpoint)
+
+        summary = self.rotation.run(SiteRotationTarget(manager), checkpoint)
+        self.assertEqual(summary['skipped'], 2)
+        self.assertEqual(summary['already_current'], 2)
+        self.assertEqual(summary['rotated'], 3)
+
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = NEW
+        rotated = self._manager()
+        self.assertEqual([rotated.retrieve_site_data(f'id_{i}')['data'] for i in range(7)],
+                         [f"value {i}" for i in range(7)])
+
+    def test_unreadable_records_are_reported(self):
+        manager = self._manager()
+        manager.store_site_data('good', "ok")
+        manager.backend.put('foreign', DataEncryptor(passcode='someone_else').encrypt_data("x"))
+
+        summary = self.rotation.run(SiteRotationTarget(manager))
+        self.assertEqual(summary['rotated'], 1)
+        self.assertEqual(list(summary['errors']), ['foreign'])
+
+    def test_rotate_keys_rebuilds_blind_index(self):
+        manager = SiteManager(data_dir=self.tmp_dir, blind_index_fields=['data.email'])
+        manager.store_site_data('alice', {"email": "a@example.com"})
+        checkpoint = f'{self.tmp_dir}/rotation.log'
+
+        os.environ['OLD_PASSCODE_FOR_SITE_DATA'] = OLD
+        os.environ['NEW_PASSCODE_FOR_SITE_DATA'] = NEW
+        os.environ['BLIND_INDEX_FIELDS'] = 'data.email'
+        try:
+            status = rotate_keys.main(['--target', 'site', '--data-dir', self.tmp_dir,
+                                       '--checkpoint', checkpoint, '--executor', 'thread'])
+        finally:
+            for name in ('OLD_PASSCODE_FOR_SITE_DATA', 'NEW_PASSCODE_FOR_SITE_DATA', 'BLIND_INDEX_FIELDS'):
+                del os.environ[name]
+        self.assertEqual(status, 0)
+
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = NEW
+        rotated = SiteManager(data_dir=self.tmp_dir, blind_index_fields=['data.email'])
+        found = rotated.search_site_data('data.email', 'a@example.com')
+        self.assertEqual([record['id'] for record in found['items']], ['alice'])
+        # A resumed run does not rebuild again
+        self.assertIsNone(rebuild_blind_index('site', rotated, checkpoint))
+
+    def test_airtable_rotation(self):
+        with FakeAirtableServer() as server:
+            os.environ['AIRTABLE_KEY'] = 'test_key'
+            os.environ['AIRTABLE_BASE_ID'] = 'appTest'
+            os.environ['AIRTABLE_ENDPOINT_URL'] = server.url
+            manager = AirtableManager()
+            manager.store_many([{'key': f'key_{i}', 'data': {"n": i}} for i in range(12)])
+
+            summary = self.rotation.run(AirtableRotationTarget(manager))
+            self.assertEqual(summary['rotated'], 12)
+
+            os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = NEW
+            self.assertEqual(AirtableManager().get_data('key_7'), {"n": 7})
+
+
+if __name__ == '__main__':
+    unittest.main()
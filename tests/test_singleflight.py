@@ -0,0 +1,161 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.singleflight import SingleFlight
+from app.site_manager import SiteManager
+from app.storage import SQLiteBackend
+from app.encryption import envelope_etag
+from app.metrics import READS_COALESCED
+
+class SlowBackend(SQLiteBackend):
+    """Holds every get until released, counting them"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.release = threading.Event()
+        self.gets = 0
+
+    def get(self, data_id):
+        self.gets += 1
+        self.release.wait(5)
+        return super().get(data_id)
+
+class TestSingleFlight(unittest.TestCase):
+    def _run_concurrently(self, count, target):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight('test')
+        release = threading.Event()
+        started = threading.Event()
+        results = []
+
+        def fetch():
+            started.set()
+            release.wait(5)
+            return {"value": 1}
+
+        leader = self._run_concurrently(1, lambda: results.append(flight.do('k', fetch)))
+        started.wait(5)
+        followers = self._run_concurrently(4, lambda: results.append(flight.do('k', fetch)))
+        while flight.stats()['coalesced'] < 4:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in leader + followers:
+            thread.join()
+
+        self.assertEqual(results, [{"value": 1}] * 5)
+        # Every caller got its own copy
+        self.assertEqual(len({id(result) for result in results}), 5)
+        self.assertEqual(flight.stats(), {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0})
+
+    def test_errors_reach_every_caller_and_are_not_cached(self):
+        flight = SingleFlight('test')
+        with self.assertRaises(KeyError):
+            flight.do('k', lambda: {}['missing'])
+        self.assertEqual(flight.do('k', lambda: 2), 2)
+        self.assertEqual(flight.stats()['executions'], 2)
+
+    def test_site_manager_reads_coalesce(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            backend = SlowBackend(f'{tmp_dir}/site.db')
+            backend.release.set()
+            manager = SiteManager(data_dir=tmp_dir, backend=backend)
+            manager.store_site_data('homepage', {"title": "Welcome"})
+            backend.release.clear()
+            backend.gets = 0
+            coalesced = READS_COALESCED.labels('site').value
+
+            results = []
+            threads = self._run_concurrently(8, lambda: results.append(manager.retrieve_site_data('homepage')))
+            while manager.coalescing_stats()['calls'] < 8:
+                threading.Event().wait(0.001)
+            backend.release.set()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual([result['data'] for result in results], [{"title": "Welcome"}] * 8)
+            self.assertEqual(backend.gets, 1)
+            self.assertEqual(manager.coalescing_stats()['coalesced'], 7)
+            self.assertEqual(READS_COALESCED.labels('site').value - coalesced, 7)
+        finally:
+            shutil.rmtree(tmp_dir)
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+
+    def test_site_read_racing_a_write_keeps_new_etag(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            backend = SQLiteBackend(f'{tmp_dir}/site.db')
+            manager = SiteManager(data_dir=tmp_dir, backend=backend)
+            manager.store_site_data('homepage', "old")
+            manager.validators.clear()
+            get = backend.get
+
+            def racing_get(data_id):
+                envelope = get(data_id)
+                # The write lands after this read fetched but before it caches the etag
+                backend.get = get
+                manager.store_site_data('homepage', "new")
+                return envelope
+
+            backend.get = racing_get
+            old, old_etag = manager.retrieve_site_data_if_changed('homepage')
+            self.assertEqual(old['data'], "old")
+
+            # The old etag must not answer 304 for the new record
+            data, etag = manager.retrieve_site_data_if_changed('homepage', {old_etag})
+            self.assertNotEqual(etag, old_etag)
+            self.assertEqual(data['data'], "new")
+        finally:
+            shutil.rmtree(tmp_dir)
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+    def test_concurrent_stores_leave_no_stale_etag(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            backend = SQLiteBackend(f'{tmp_dir}/site.db')
+            manager = SiteManager(data_dir=tmp_dir, backend=backend)
+            put = backend.put
+            first_put = threading.Event()
+            release = threading.Event()
+            envelopes = []
+
+            def slow_first_put(data_id, envelope, *args):
+                put(data_id, envelope, *args)
+                envelopes.append(envelope)
+                if not first_put.is_set():
+                    first_put.set()
+                    # The second store runs start to finish here
+                    release.wait(5)
+
+            backend.put = slow_first_put
+            first = threading.Thread(target=manager.store_site_data, args=('homepage', "first"))
+            first.start()
+            self.assertTrue(first_put.wait(5))
+            manager.store_site_data('homepage', "second")
+            release.set()
+            first.join()
+
+            # "second" is stored, so the first envelope's etag must not answer 304
+            data, etag = manager.retrieve_site_data_if_changed('homepage', {envelope_etag(envelopes[0])})
+            self.assertEqual(data['data'], "second")
+            self.assertEqual(etag, envelope_etag(envelopes[1]))
+        finally:
+            shutil.rmtree(tmp_dir)
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+
+if __name__ == '__main__':
+    unittest.main()
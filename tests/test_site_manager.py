@@ -2,6 +2,7 @@ import unittest
 import os
 import sys
 import shutil
+import tempfile
 
 # Add the parent directory to Python path so we can import from app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -33,6 +34,134 @@ class TestSiteManager(unittest.TestCase):
         self.assertEqual(data['site_config']['name'], 'Encrypted Site')
         self.assertEqual(data['content_data']['home']['title'], 'Welcome to Our Secure Site')  # Fixed key
 
+    def test_incremental_build(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manager = SiteManager(data_dir=tmp_dir)
+            sections = {"a": {"v": 1}, "b": {"v": 2}, "c": {"v": 3}}
+            summary = manager.build_site_data(sections, max_workers=2)
+            self.assertEqual(sorted(summary["rebuilt"]), ['a', 'b', 'c'])
+            with open(f'{tmp_dir}/b.json.enc') as f:
+                before = f.read()
+
+            sections["a"] = {"v": 10}
+            summary = manager.build_site_data(sections)
+            self.assertEqual(summary["rebuilt"], ['a'])
+            self.assertEqual(summary["skipped"], ['b', 'c'])
+            with open(f'{tmp_dir}/b.json.enc') as f:
+                self.assertEqual(f.read(), before)
+
+            del sections["c"]
+            summary = manager.build_site_data(sections, force=True)
+            self.assertEqual(summary["rebuilt"], ['a', 'b'])
+            self.assertEqual(summary["removed"], ['c'])
+            self.assertFalse(os.path.exists(f'{tmp_dir}/c.json.enc'))
+            self.assertEqual(manager.load_site_data(), {"a": {"v": 10}, "b": {"v": 2}})
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_lazy_load_and_load_sections(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manager = SiteManager(data_dir=tmp_dir)
+            manager.build_site_data({"a": {"v": 1}, "b": {"v": 2}, "c": "three"})
+
+            data = manager.load_site_data(lazy=True)
+            self.assertEqual(sorted(data), ['a', 'b', 'c'])
+            self.assertIn('b', data)
+            self.assertGreater(data.info('b')['size'], 0)
+            self.assertFalse(data.is_loaded('b'))
+            self.assertEqual(data['b'], {"v": 2})
+            self.assertTrue(data.is_loaded('b'))
+            self.assertFalse(data.is_loaded('a'))
+
+            self.assertEqual(manager.load_sections(['c', 'a']), {"c": "three", "a": {"v": 1}})
+            with self.assertRaises(KeyError):
+                manager.load_sections(['missing'])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_blind_index_search(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            manager = SiteManager(data_dir=tmp_dir, blind_index_fields=['data.email', 'data.age'])
+            manager.store_site_data('u1', {"email": "a@example.com", "age": 30})
+            manager.store_site_data('u2', {"email": "b@example.com", "age": 30})
+            manager.store_site_data('u3', "no fields")
+
+            found = manager.search_site_data('data.email', 'a@example.com')['items']
+            self.assertEqual([item['id'] for item in found], ['u1'])
+            self.assertEqual(found[0]['data']['age'], 30)
+            self.assertEqual(len(manager.search_site_data('data.age', '30')['items']), 2)
+
+            # Overwrites and deletes keep the index in step
+            manager.store_site_data('u1', {"email": "c@example.com"})
+            manager.delete_site_data('u2')
+            self.assertEqual(manager.search_site_data('data.email', 'a@example.com')['items'], [])
+            self.assertEqual(manager.search_site_data('data.age', '30')['items'], [])
+            with self.assertRaises(ValueError):
+                manager.search_site_data('notes', 'x')
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_list_data_page_cursor(self):
+        for data_id in ['c', 'a', 'e', 'b', 'd']:
+            self.site_manager.store_site_data(data_id, f"value {data_id}")
+        self.site_manager.build_site_data()
+
+        seen = []
+        cursor = None
+        while True:
+            page = self.site_manager.list_data_page(2, cursor)
+            seen.extend(item['id'] for item in page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, ['a', 'b', 'c', 'd', 'e'])
+
+    def test_conditional_retrieve(self):
+        self.site_manager.store_site_data('homepage', "Welcome")
+        data, etag = self.site_manager.retrieve_site_data_if_changed('homepage')
+        self.assertEqual(data['data'], "Welcome")
+
+        # A cached validator answers without reading the record
+        os.remove('site/data/homepage.enc')
+        self.assertEqual(self.site_manager.retrieve_site_data_if_changed('homepage', {etag}), (None, etag))
+
+        self.site_manager.store_site_data('homepage', "Welcome back")
+        data, new_etag = self.site_manager.retrieve_site_data_if_changed('homepage', {etag})
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(data['data'], "Welcome back")
+
+    def test_matching_etag_after_validator_expiry_skips_decrypt(self):
+        self.site_manager.store_site_data('homepage', "Welcome")
+        _, etag = self.site_manager.retrieve_site_data_if_changed('homepage')
+        self.site_manager.validators.clear()
+
+        decrypts = []
+        decrypt_data = self.site_manager.encryptor.decrypt_data
+        self.site_manager.encryptor.decrypt_data = lambda value: decrypts.append(value) or decrypt_data(value)
+        self.assertEqual(self.site_manager.retrieve_site_data_if_changed('homepage', {etag}), (None, etag))
+        self.assertEqual(decrypts, [])
+        self.assertEqual(self.site_manager.retrieve_site_data('homepage')['data'], "Welcome")
+        self.assertEqual(len(decrypts), 1)
+
+    def test_decrypt_file_reads_both_formats(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            encryptor = self.site_manager.encryptor
+            with open(f'{tmp_dir}/plain.json', 'w') as f:
+                f.write('{"format": "segmented"}')
+            encryptor.encrypt_file(f'{tmp_dir}/plain.json', f'{tmp_dir}/stream.enc')
+            with open(f'{tmp_dir}/legacy.enc', 'w') as f:
+                f.write(encryptor.encrypt_data({"format": "legacy"}))
+
+            self.assertEqual(self.site_manager.decrypt_file(f'{tmp_dir}/stream.enc'), {"format": "segmented"})
+            self.assertEqual(self.site_manager.decrypt_file(f'{tmp_dir}/legacy.enc'), {"format": "legacy"})
+        finally:
+            shutil.rmtree(tmp_dir)
+
     def tearDown(self):
         # Clean up
         if os.path.exists('site/data'):
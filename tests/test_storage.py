@@ -0,0 +1,96 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.encryption import DataEncryptor
+from app.site_manager import SiteManager
+from app.storage import FileBackend, SQLiteBackend, migrate_directory
+
+class TestStorageBackends(unittest.TestCase):
+    def setUp(self):
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def _sqlite_manager(self):
+        return SiteManager(data_dir=self.tmp_dir, backend=SQLiteBackend(f'{self.tmp_dir}/site.db'))
+
+    def test_sqlite_round_trip(self):
+        manager = self._sqlite_manager()
+        for data_id in ['c', 'a', 'e', 'b', 'd']:
+            manager.store_site_data(data_id, {"value": data_id}, notes="n")
+        manager.store_site_data('a', {"value": "a2"})
+
+        self.assertEqual(manager.retrieve_site_data('a')['data'], {"value": "a2"})
+        self.assertIn('error', manager.retrieve_site_data('missing'))
+        self.assertEqual(sorted(item['id'] for item in manager.list_all_data()), ['a', 'b', 'c', 'd', 'e'])
+
+        page = manager.list_data_page(2)
+        self.assertEqual([item['id'] for item in page['items']], ['a', 'b'])
+        page = manager.list_data_page(2, page['next_cursor'])
+        self.assertEqual([item['id'] for item in page['items']], ['c', 'd'])
+
+        self.assertIn('message', manager.delete_site_data('c'))
+        self.assertIn('error', manager.delete_site_data('c'))
+
+    def test_sqlite_ciphertext_stored_as_raw_blob(self):
+        backend = SQLiteBackend(f'{self.tmp_dir}/site.db')
+        encrypted = SiteManager(data_dir=self.tmp_dir, backend=backend).encryptor.encrypt_data("secret")
+        backend.put('key', encrypted)
+        self.assertEqual(backend.get('key'), encrypted)
+
+        blob, = backend._connection().execute('SELECT ciphertext FROM site_data').fetchone()
+        self.assertIsInstance(blob, bytes)
+        self.assertLess(len(blob), len(encrypted))
+
+    def test_sqlite_keeps_compressed_envelopes(self):
+        backend = SQLiteBackend(f'{self.tmp_dir}/site.db')
+        encryptor = DataEncryptor(compression='zlib', compression_min_bytes=0)
+        encrypted = encryptor.encrypt_data("compressible " * 100)
+        self.assertTrue(encrypted.startswith('v3:'))
+        backend.put('key', encrypted)
+        self.assertEqual(backend.get('key'), encrypted)
+        self.assertEqual(backend._connection().execute('SELECT envelope FROM site_data').fetchone()[0], 3)
+
+    def test_sqlite_concurrent_writers(self):
+        backend = SQLiteBackend(f'{self.tmp_dir}/site.db')
+        encrypted = SiteManager(data_dir=self.tmp_dir, backend=backend).encryptor.encrypt_data("x")
+
+        def write(worker):
+            for i in range(50):
+                backend.put(f'{worker}_{i}', encrypted)
+
+        threads = [threading.Thread(target=write, args=(w,)) for w in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(backend.list_ids()), 200)
+
+    def test_migrate_enc_directory(self):
+        file_manager = SiteManager(data_dir=self.tmp_dir, backend=FileBackend(self.tmp_dir))
+        for i in range(7):
+            file_manager.store_site_data(f'item_{i}', f'value {i}')
+        file_manager.build_site_data()
+
+        manager = self._sqlite_manager()
+        self.assertEqual(manager.migrate_from_files(remove_files=True), 7)
+        self.assertEqual(len(manager.list_all_data()), 7)
+        self.assertEqual(manager.retrieve_site_data('item_3')['data'], 'value 3')
+        self.assertEqual(file_manager.list_all_data(), [])
+        # build_site_data's own files are left alone
+        self.assertTrue(os.path.exists(f'{self.tmp_dir}/secrets.json.enc'))
+        self.assertEqual(migrate_directory(self.tmp_dir, manager.backend), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+        if 'LOCAL_PASSCODE_FOR_SITE_DATA' in os.environ:
+            del os.environ['LOCAL_PASSCODE_FOR_SITE_DATA']
+
+if __name__ == '__main__':
+    unittest.main()
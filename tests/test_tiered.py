@@ -0,0 +1,138 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_airtable import FakeAirtableServer
+from app.airtable_manager import AirtableManager
+from app.site_manager import SiteManager
+from app.rotation import KeyRotation, AirtableRotationTarget
+from app.tiered import TieredManager
+
+class TestTieredManager(unittest.TestCase):
+    """Local tier in front of the real pyairtable client and the fake server"""
+
+    def setUp(self):
+        self.server = FakeAirtableServer().start()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'test_passcode_123'
+        os.environ['AIRTABLE_KEY'] = 'test_key'
+        os.environ['AIRTABLE_BASE_ID'] = 'appTest'
+        os.environ['AIRTABLE_ENDPOINT_URL'] = self.server.url
+        self.airtable = AirtableManager(cache_size=0)
+        self.tiered = self._tiered(fresh_ttl=60)
+
+    def _tiered(self, fresh_ttl):
+        return TieredManager(self.airtable, SiteManager(data_dir=self.tmp_dir), fresh_ttl=fresh_ttl)
+
+    def _requests(self):
+        return sum(self.server.state.stats()['requests'].values())
+
+    def test_reads_served_locally_and_survive_restart(self):
+        self.tiered.store_site_data('homepage', "Welcome", notes="hero")
+        self.assertIsNotNone(self.tiered.backend.get('homepage'))
+
+        before = self._requests()
+        self.assertEqual(self.tiered.retrieve_site_data('homepage')['data'], "Welcome")
+        self.assertEqual(self._requests(), before)
+
+        restarted = self._tiered(fresh_ttl=60)
+        self.assertEqual(restarted.retrieve_site_data('homepage')['notes'], "hero")
+        self.assertEqual(self._requests(), before)
+        self.assertEqual(restarted.tier_stats()['fresh'], 1)
+
+    def test_miss_pulls_from_airtable(self):
+        self.airtable.store_site_data('homepage', "Written elsewhere")
+        self.assertEqual(self.tiered.retrieve_site_data('homepage')['data'], "Written elsewhere")
+        self.assertIsNotNone(self.tiered.backend.get('homepage'))
+        self.assertIn('error', self.tiered.retrieve_site_data('missing'))
+        self.assertEqual(self.tiered.tier_stats()['miss'], 2)
+
+    def test_stale_copy_served_then_refreshed(self):
+        tiered = self._tiered(fresh_ttl=0)
+        tiered.store_site_data('homepage', "v1")
+        self.airtable.store_site_data('homepage', "v2")
+
+        # Stale copy now, fresh one once the background refresh lands
+        self.assertEqual(tiered.retrieve_site_data('homepage')['data'], "v1")
+        tiered.shutdown()
+        self.assertEqual(tiered.retrieve_site_data('homepage')['data'], "v2")
+        tiered.shutdown()
+        self.assertEqual(tiered.tier_stats()['refreshed'], 2)
+
+        # A record deleted in Airtable is dropped locally on refresh
+        self.airtable.delete_data('homepage')
+        tiered.retrieve_site_data('homepage')
+        tiered.shutdown()
+        self.assertIsNone(tiered.backend.get('homepage'))
+
+    def test_delete_and_sync(self):
+        self.tiered.store_site_data('a', "A")
+        self.tiered.store_site_data('b', "B")
+        self.assertIn('message', self.tiered.delete_site_data('a'))
+        self.assertIsNone(self.tiered.backend.get('a'))
+        self.assertIn('error', self.tiered.retrieve_site_data('a'))
+
+        self.airtable.store_site_data('c', "C")
+        self.airtable.delete_data('b')
+        self.assertEqual(self.tiered.sync(), {"updated": 1, "removed": 1})
+        self.assertEqual(self.tiered.state.ids(), ['c'])
+
+    def test_slow_local_write_does_not_block_other_keys(self):
+        other = next(k for k in (f'key_{i}' for i in range(100))
+                     if self.tiered._key_lock(k) is not self.tiered._key_lock('slow'))
+        put = self.tiered.backend.put
+        started, release = threading.Event(), threading.Event()
+
+        def slow_put(data_id, *args):
+            if data_id == 'slow':
+                started.set()
+                release.wait(5)
+            return put(data_id, *args)
+
+        self.tiered.backend.put = slow_put
+        writer = threading.Thread(target=self.tiered.store_site_data, args=('slow', "S"))
+        writer.start()
+        try:
+            self.assertTrue(started.wait(5))
+            self.tiered.store_site_data(other, "O")
+            self.assertEqual(self.tiered.retrieve_site_data(other)['data'], "O")
+            self.assertEqual(self.tiered.tier_stats()['fresh'], 1)
+            self.assertTrue(writer.is_alive())
+        finally:
+            release.set()
+            writer.join()
+        self.assertEqual(self.tiered.retrieve_site_data('slow')['data'], "S")
+
+    def test_copies_from_before_key_rotation_are_misses(self):
+        self.tiered.store_site_data('homepage', "Welcome")
+        rotation = KeyRotation('test_passcode_123', 'rotated_passcode_456', executor='thread')
+        try:
+            rotation.run(AirtableRotationTarget(self.airtable))
+        finally:
+            rotation.shutdown()
+
+        os.environ['LOCAL_PASSCODE_FOR_SITE_DATA'] = 'rotated_passcode_456'
+        self.airtable = AirtableManager(cache_size=0)
+        restarted = self._tiered(fresh_ttl=60)
+        self.assertEqual(restarted.retrieve_site_data('homepage')['data'], "Welcome")
+        self.assertEqual(restarted.tier_stats()['miss'], 1)
+        # The re-pulled copy is current again
+        self.assertEqual(restarted.retrieve_site_data('homepage')['data'], "Welcome")
+        self.assertEqual(restarted.tier_stats()['fresh'], 1)
+
+    def tearDown(self):
+        self.tiered.shutdown()
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+        for name in ('LOCAL_PASSCODE_FOR_SITE_DATA', 'AIRTABLE_KEY', 'AIRTABLE_BASE_ID', 'AIRTABLE_ENDPOINT_URL'):
+            if name in os.environ:
+                del os.environ[name]
+
+if __name__ == '__main__':
+    unittest.main()
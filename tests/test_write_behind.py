@@ -0,0 +1,142 @@
+import unittest
+import os
+import json
+import sys
+import shutil
+import tempfile
+
+# Add the parent directory to Python path so we can import from app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.write_behind import TokenBucket, SharedTokenBucket, WriteBehindQueue
+
+class RecordingBackend:
+    def __init__(self):
+        self.batches = []
+
+    def apply(self, ops):
+        self.batches.append([(op['op'], op['key']) for op in ops])
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waits_when_empty(self):
+        now = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=5, capacity=1, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        self.assertAlmostEqual(sum(slept), 0.2)
+
+    def test_shared_bucket_limits_processes_together(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            now = [1000.0]
+            slept = []
+
+            def sleep(seconds):
+                slept.append(seconds)
+                now[0] += seconds
+
+            # Two workers, as two buckets on one state file
+            path = os.path.join(tmp_dir, 'writes.jsonl.rate')
+            first, second = (SharedTokenBucket(path, rate=5, capacity=1, clock=lambda: now[0], sleep=sleep)
+                             for _ in range(2))
+            first.acquire()
+            second.acquire()
+            first.acquire()
+            self.assertAlmostEqual(sum(slept), 0.4)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.journal = os.path.join(self.tmp_dir, 'writes.jsonl')
+        self.backend = RecordingBackend()
+
+    def test_coalesces_and_batches(self):
+        queue = WriteBehindQueue(self.backend.apply, self.journal, rate=1000, start=False)
+
+        queue.enqueue_store('first', 'v2:a')
+        for i in range(12):
+            queue.enqueue_store(f'key_{i}', 'v2:x')
+        queue.enqueue_store('key_0', 'v2:y')
+        queue.enqueue_delete('key_1')
+
+        self.assertEqual(queue.stats()['coalesced'], 2)
+        queue.start()
+        self.assertTrue(queue.flush(timeout=5))
+        queue.stop()
+
+        applied = [op for batch in self.backend.batches for op in batch]
+        self.assertEqual(applied.count(('store', 'key_0')), 1)
+        self.assertIn(('delete', 'key_1'), applied)
+        self.assertTrue(all(len(batch) <= 10 for batch in self.backend.batches))
+        self.assertEqual(queue.depth(), 0)
+
+    def test_replays_unacknowledged_writes(self):
+        queue = WriteBehindQueue(self.backend.apply, self.journal, start=False)
+        queue.enqueue_store('site_config', 'v2:old')
+        queue.enqueue_store('site_config', 'v2:new')
+        queue.enqueue_delete('gone')
+        queue._lock_file.close()
+
+        restarted = WriteBehindQueue(self.backend.apply, self.journal, rate=1000, start=False)
+        self.assertEqual(restarted.depth(), 2)
+        self.assertEqual(restarted.pending_op('site_config')['encrypted_value'], 'v2:new')
+        restarted.start()
+        self.assertTrue(restarted.flush(timeout=5))
+        restarted.stop()
+
+        applied = [op for batch in self.backend.batches for op in batch]
+        self.assertEqual(sorted(applied), [('delete', 'gone'), ('store', 'site_config')])
+
+    def test_rejected_record_is_isolated_and_dead_lettered(self):
+        def apply(ops):
+            if any(op['key'] == 'bad' for op in ops):
+                raise ValueError("422 INVALID_VALUE_FOR_COLUMN")
+            self.backend.apply(ops)
+
+        queue = WriteBehindQueue(apply, self.journal, rate=1000, start=False, max_attempts=3, retry_backoff=0.01)
+        queue.enqueue_store('bad', 'v2:x')
+        for i in range(5):
+            queue.enqueue_store(f'key_{i}', 'v2:x')
+        queue.start()
+        self.assertTrue(queue.flush(timeout=5))
+        queue.stop()
+
+        applied = sorted(op for batch in self.backend.batches for op in batch)
+        self.assertEqual(applied, [('store', f'key_{i}') for i in range(5)])
+        self.assertEqual(queue.stats()['dead_lettered'], 1)
+        with open(queue.dead_letter_path) as f:
+            dead = [json.loads(line) for line in f]
+        self.assertEqual([entry['key'] for entry in dead], ['bad'])
+        self.assertIn('422', dead[0]['error'])
+
+        # Dead-lettered ops are acked, so a restart does not replay them
+        queue._lock_file.close()
+        self.assertEqual(WriteBehindQueue(apply, self.journal, start=False).depth(), 0)
+
+    def test_rewritten_key_drops_retry_count(self):
+        def apply(ops):
+            raise ValueError("503 Service Unavailable")
+
+        queue = WriteBehindQueue(apply, self.journal, rate=1000, start=False)
+        queue.enqueue_store('homepage', 'v2:old')
+        queue.enqueue_store('other', 'v2:x')
+        queue._failed(queue._next_batch(), ValueError("503"))
+        self.assertEqual(queue.stats()['retrying'], 2)
+
+        queue.enqueue_store('homepage', 'v2:new')
+        self.assertEqual(queue.stats()['retrying'], 1)
+        queue._lock_file.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+if __name__ == '__main__':
+    unittest.main()